@@ -1,18 +1,48 @@
+from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app import tracing
+from app.cache import response_cache
 from app.config import settings
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models.users import User
 from app.schemas.users import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# Namespace cache thông tin người dùng theo subject (username) của token
+PRINCIPAL_CACHE_NAMESPACE = "principal"
+
+def _principal_cache_enabled() -> bool:
+    """
+    Cache thông tin đăng nhập chỉ bật khi invalidate_principal tới được mọi
+    worker (backend dùng chung, hoặc chỉ một worker), để người dùng bị xóa
+    hoặc hạ quyền mất quyền ngay. Thay đổi ngoài API (sửa trực tiếp trong
+    database) có hiệu lực sau tối đa PRINCIPAL_CACHE_TTL_SECONDS.
+    """
+    if settings.PRINCIPAL_CACHE_TTL_SECONDS <= 0:
+        return False
+    return response_cache.backend.shared or settings.WEB_CONCURRENCY <= 1
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    Thông tin tối thiểu của người dùng đang đăng nhập (id, quyền), đủ cho
+    kiểm tra quyền ở các endpoint. Cần dữ liệu đầy đủ thì truy vấn User theo id.
+    """
+    id: str
+    username: str
+    is_active: bool
+    is_admin: bool
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Tạo JWT token"""
     to_encode = data.copy()
@@ -45,22 +75,91 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     )
 
     token_data = verify_token(token, credentials_exception)
-    user = db.query(User).filter(User.username == token_data.username).first()
-    if user is None:
+    
+    # Dùng thông tin đã cache (TTL ngắn) để tránh truy vấn DB ở mọi request
+    cached = None
+    if _principal_cache_enabled():
+        cached = response_cache.get(PRINCIPAL_CACHE_NAMESPACE, token_data.username)
+    if cached is not None:
+        principal = Principal(**cached)
+        tracing.note_user(principal)
+        return principal
+    
+    row = db.query(User.id, User.username, User.is_active, User.is_admin).filter(
+        User.username == token_data.username
+    ).first()
+    if row is None:
         raise credentials_exception
-    return user
+    
+    principal = Principal(id=row.id, username=row.username, is_active=row.is_active, is_admin=row.is_admin)
+    if _principal_cache_enabled():
+        response_cache.set(
+            PRINCIPAL_CACHE_NAMESPACE, token_data.username, asdict(principal),
+            settings.PRINCIPAL_CACHE_TTL_SECONDS
+        )
+    tracing.note_user(principal)
+    return principal
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """Như get_current_user, cho endpoint async (không chiếm thread của threadpool)"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
 
-def get_current_active_user(current_user: User = Depends(get_current_user)):
+    token_data = verify_token(token, credentials_exception)
+    
+    cached = None
+    if _principal_cache_enabled():
+        cached = await response_cache.aget(PRINCIPAL_CACHE_NAMESPACE, token_data.username)
+    if cached is not None:
+        principal = Principal(**cached)
+        tracing.note_user(principal)
+        return principal
+    
+    row = (await db.execute(
+        select(User.id, User.username, User.is_active, User.is_admin).where(User.username == token_data.username)
+    )).first()
+    if row is None:
+        raise credentials_exception
+    
+    principal = Principal(id=row.id, username=row.username, is_active=row.is_active, is_admin=row.is_admin)
+    if _principal_cache_enabled():
+        await response_cache.aset(
+            PRINCIPAL_CACHE_NAMESPACE, token_data.username, asdict(principal),
+            settings.PRINCIPAL_CACHE_TTL_SECONDS
+        )
+    tracing.note_user(principal)
+    return principal
+
+def invalidate_principal(username: str):
+    """Xóa thông tin đã cache khi người dùng bị sửa hoặc xóa"""
+    response_cache.delete(PRINCIPAL_CACHE_NAMESPACE, username)
+
+async def invalidate_principal_async(username: str):
+    """Như invalidate_principal, cho endpoint async"""
+    await response_cache.adelete(PRINCIPAL_CACHE_NAMESPACE, username)
+
+def get_current_active_user(current_user: Principal = Depends(get_current_user)):
     """Kiểm tra user đang hoạt động"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-def get_current_admin_user(current_user: User = Depends(get_current_active_user)):
+async def get_current_active_user_async(current_user: Principal = Depends(get_current_user_async)):
+    """Như get_current_active_user, cho endpoint async"""
+    return get_current_active_user(current_user)
+
+def get_current_admin_user(current_user: Principal = Depends(get_current_active_user)):
     """Kiểm tra user có quyền admin"""
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to perform this action"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_current_admin_user_async(current_user: Principal = Depends(get_current_active_user_async)):
+    """Như get_current_admin_user, cho endpoint async"""
+    return get_current_admin_user(current_user)
@@ -1,35 +1,46 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import utils, oauth2
 from app.config import settings
-from app.database import get_db
+from app.database import get_async_db
 from app.models.users import User
+from app.ratelimit import limit_by_ip
 from app.schemas.users import Token
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
-@router.post("/login", response_model=Token)
-def login_for_access_token(
+@router.post("/login", response_model=Token, dependencies=[Depends(limit_by_ip("login", "RATE_LIMIT_LOGIN_PER_IP"))])
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Đăng nhập và lấy token
+    
+    Endpoint async: bcrypt chạy trong process pool, request chờ trên event
+    loop thay vì giữ một thread của threadpool.
     """
     # Tìm user theo username
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = (await db.execute(select(User).where(User.username == form_data.username))).scalars().first()
     
     # Kiểm tra user tồn tại và mật khẩu đúng
-    if not user or not utils.verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = await utils.verify_and_update_async(form_data.password, user.hashed_password) if user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Hash dùng số vòng bcrypt cũ: băm lại với cấu hình hiện tại
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
     # Kiểm tra user đang hoạt động
     if not user.is_active:
         raise HTTPException(
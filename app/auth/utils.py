@@ -1,13 +1,89 @@
-import bcrypt
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from passlib.context import CryptContext
 
+from app.config import settings
+
 # Sử dụng passlib để băm và xác thực mật khẩu
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+# Băm bcrypt tốn 100-300 ms CPU mỗi lần: chạy trong process pool riêng có giới
+# hạn. Endpoint gọi hàm băm là async và chờ kết quả trên event loop, nên một
+# đợt đăng nhập dồn dập không giữ thread nào của threadpool (các endpoint
+# đồng bộ khác vẫn chạy được) và không chiếm hết CPU của API.
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Số tác vụ băm đang chờ (đang chạy + đang xếp hàng) trong worker này; chỉ
+# đọc/ghi trên event loop nên không cần khóa
+_pending = 0
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: không fork một process đang chạy nhiều thread
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+def shutdown_executor():
+    """Dừng process pool (khi tắt ứng dụng)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+async def _run(fn, *args):
+    """
+    Chạy hàm băm trong process pool. Khi đã có PASSWORD_HASH_WORKERS x
+    PASSWORD_HASH_QUEUE_FACTOR tác vụ đang chờ thì trả 503 ngay thay vì xếp
+    hàng thêm.
+    """
+    global _pending
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return await run_in_threadpool(fn, *args)
+    if _pending >= settings.PASSWORD_HASH_WORKERS * settings.PASSWORD_HASH_QUEUE_FACTOR:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+    _pending += 1
+    try:
+        return await asyncio.wrap_future(_get_executor().submit(fn, *args))
+    finally:
+        _pending -= 1
+
+def _verify_and_update(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def _hash(password):
+    return pwd_context.hash(password)
 
 def verify_password(plain_password, hashed_password):
-    """Kiểm tra mật khẩu"""
-    return pwd_context.verify(plain_password, hashed_password)
+    """Kiểm tra mật khẩu (ngoài request: script, seed dữ liệu)"""
+    return _verify_and_update(plain_password, hashed_password)[0]
 
 def get_password_hash(password):
-    """Băm mật khẩu"""
-    return pwd_context.hash(password)
\ No newline at end of file
+    """Băm mật khẩu (ngoài request: script, seed dữ liệu)"""
+    return _hash(password)
+
+async def verify_and_update_async(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """
+    Kiểm tra mật khẩu; nếu đúng và hash dùng tham số cũ (số vòng bcrypt khác
+    BCRYPT_ROUNDS) thì trả kèm hash mới để lưu lại.
+    """
+    return await _run(_verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    """Băm mật khẩu trong process pool (cho endpoint async)"""
+    return await _run(_hash, password)
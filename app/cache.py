@@ -0,0 +1,206 @@
+"""
+Cache cho các response đọc nhiều, ghi ít (đề bài, trang danh sách bài toán).
+
+Backend có thể thay thế:
+    memory  LRU trong bộ nhớ mỗi worker (mặc định)
+    redis   dùng chung giữa các worker (cần package redis)
+
+Giá trị được lưu là dữ liệu đã sẵn sàng trả về dạng JSON. Việc vô hiệu hóa
+dùng phiên bản namespace: tăng phiên bản làm mọi khóa cũ không còn được đọc,
+các mục cũ tự hết hạn theo TTL.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - tùy chọn
+    redis = None
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+class MemoryBackend:
+    """LRU có TTL trong bộ nhớ của process"""
+
+    # Thao tác chỉ giữ khóa trong chốc lát, gọi trực tiếp được từ event loop
+    blocking = False
+    # Riêng từng worker: invalidate không tới được worker khác
+    shared = False
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: int):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        # Bộ đếm phiên bản không nằm trong LRU để không bị đẩy ra ngoài
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._counters.clear()
+
+class RedisBackend:
+    """Backend Redis: cache và phiên bản namespace dùng chung giữa các worker"""
+
+    # Mỗi thao tác là một lượt gọi mạng
+    blocking = True
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "cache:"):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: int):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key: str) -> int:
+        return self.client.incr(self.prefix + "v:" + key)
+
+    def counter(self, key: str) -> int:
+        return int(self.client.get(self.prefix + "v:" + key) or 0)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+class Cache:
+    """
+    Cache theo namespace, có thống kê hit/miss cho từng namespace.
+
+    Khóa thực tế gồm namespace, phiên bản hiện tại của namespace và khóa con,
+    nên invalidate(namespace) có chi phí O(1).
+    """
+
+    def __init__(self, backend, default_ttl: int = 60):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{namespace}:{self.backend.counter(namespace)}:{key}"
+
+    def _count(self, namespace: str, hit: bool):
+        with self._stats_lock:
+            stats = self._stats.setdefault(namespace, [0, 0])
+            stats[0 if hit else 1] += 1
+
+    def get(self, namespace: str, key: str):
+        value = self.backend.get(self._key(namespace, key))
+        self._count(namespace, value is not None)
+        return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[int] = None):
+        self.backend.set(self._key(namespace, key), value, ttl or self.default_ttl)
+
+    async def aget(self, namespace: str, key: str):
+        """Như get(), cho endpoint async: backend qua mạng chạy ngoài event loop"""
+        if self.backend.blocking:
+            return await run_in_threadpool(self.get, namespace, key)
+        return self.get(namespace, key)
+
+    async def aset(self, namespace: str, key: str, value: Any, ttl: Optional[int] = None):
+        """Như set(), cho endpoint async"""
+        if self.backend.blocking:
+            return await run_in_threadpool(self.set, namespace, key, value, ttl)
+        return self.set(namespace, key, value, ttl)
+
+    async def adelete(self, namespace: str, key: str):
+        """Như delete(), cho endpoint async"""
+        if self.backend.blocking:
+            return await run_in_threadpool(self.delete, namespace, key)
+        return self.delete(namespace, key)
+
+    async def ainvalidate(self, namespace: str):
+        """Như invalidate(), cho endpoint async"""
+        if self.backend.blocking:
+            return await run_in_threadpool(self.invalidate, namespace)
+        return self.invalidate(namespace)
+
+    def get_or_set(self, namespace: str, key: str, build: Callable[[], Any], ttl: Optional[int] = None):
+        """Đọc từ cache, nếu không có thì gọi build() và lưu kết quả (trừ None)"""
+        value = self.get(namespace, key)
+        if value is None:
+            value = build()
+            if value is not None:
+                self.set(namespace, key, value, ttl)
+        return value
+
+    def delete(self, namespace: str, key: str):
+        self.backend.delete(self._key(namespace, key))
+
+    def invalidate(self, namespace: str):
+        """Vô hiệu hóa toàn bộ namespace"""
+        self.backend.incr(namespace)
+
+    def version(self, namespace: str) -> int:
+        """Phiên bản hiện tại của namespace (tăng sau mỗi lần invalidate)"""
+        return self.backend.counter(namespace)
+
+    def stats(self) -> dict:
+        """Số hit/miss và tỉ lệ hit theo namespace (của worker hiện tại)"""
+        with self._stats_lock:
+            snapshot = {namespace: tuple(counts) for namespace, counts in self._stats.items()}
+        result = {}
+        for namespace, (hits, misses) in snapshot.items():
+            total = hits + misses
+            result[namespace] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / total, 4) if total else 0.0,
+            }
+        return result
+
+def create_backend(name: str):
+    if name == "memory":
+        return MemoryBackend(settings.CACHE_MAX_ENTRIES)
+    if name == "redis":
+        return RedisBackend(settings.CACHE_URL)
+    raise ValueError(f"Unknown cache backend: {name}")
+
+response_cache = Cache(create_backend(settings.CACHE_BACKEND), settings.CACHE_TTL_SECONDS)
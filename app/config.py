@@ -7,9 +7,129 @@ load_dotenv()
 
 class Settings(BaseSettings):
     DATABASE_URL: str = os.getenv("DATABASE_URL", "mysql+pymysql://root@localhost:3306/coding_platform")
+    # Các bản sao chỉ đọc (phân cách bằng dấu phẩy), rỗng = đọc từ primary
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    # Pool kết nối của mỗi engine (mỗi worker uvicorn có pool riêng: tổng số
+    # kết nối tới database = số worker x (DB_POOL_SIZE + DB_MAX_OVERFLOW))
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Sau một request ghi, các request đọc của client đó dùng primary trong
+    # bấy nhiêu giây (tránh đọc bản sao chưa kịp đồng bộ)
+    READ_YOUR_WRITES_SECONDS: int = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+    # Thống kê SQL mỗi request (header Server-Timing và log). Request vượt một
+    # trong hai ngưỡng được ghi log mức WARNING, còn lại mức DEBUG
+    SQL_STATS_ENABLED: bool = os.getenv("SQL_STATS_ENABLED", "true").lower() == "true"
+    SQL_WARN_QUERIES: int = int(os.getenv("SQL_WARN_QUERIES", "50"))
+    SQL_WARN_MS: float = float(os.getenv("SQL_WARN_MS", "500"))
+    # Chỉ bật khi phát triển: cảnh báo khi một câu SQL lặp lại quá N lần
+    # trong một request (dấu hiệu N+1), 0 = tắt
+    N_PLUS_ONE_THRESHOLD: int = int(os.getenv("N_PLUS_ONE_THRESHOLD", "0"))
+    
+    # Metrics Prometheus: thư mục các worker ghi bản chụp để /metrics cộng
+    # dồn (rỗng = chỉ số liệu của worker phục vụ request), chu kỳ ghi, và
+    # token yêu cầu trong header Authorization: Bearer (rỗng = không yêu cầu)
+    METRICS_DIR: str = os.getenv("METRICS_DIR", "storage/metrics")
+    METRICS_FLUSH_SECONDS: float = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+    # Ghi trace request đã làm sạch để phát lại (benchmarks/replay_trace.py):
+    # thư mục ghi (rỗng = tắt) và tỉ lệ request được ghi
+    TRACE_DIR: str = os.getenv("TRACE_DIR", "")
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+    # Số bản biên dịch được giữ trong cache của judge (mỗi worker)
+    JUDGE_COMPILE_CACHE_SIZE: int = int(os.getenv("JUDGE_COMPILE_CACHE_SIZE", "1024"))
+    # Engine async (mặc định suy ra từ DATABASE_URL: aiomysql / aiosqlite)
+    ASYNC_DATABASE_URL: Optional[str] = os.getenv("ASYNC_DATABASE_URL")
+    ASYNC_DB_POOL_SIZE: int = int(os.getenv("ASYNC_DB_POOL_SIZE", "20"))
+    ASYNC_DB_MAX_OVERFLOW: int = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "40"))
+    ASYNC_DB_POOL_TIMEOUT: float = float(os.getenv("ASYNC_DB_POOL_TIMEOUT", "10"))
     SECRET_KEY: str = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    # Băm mật khẩu: số vòng bcrypt, số process băm (0 = băm trong threadpool
+    # của API) và số tác vụ chờ tối đa mỗi process (vượt quá thì trả 503)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_QUEUE_FACTOR: int = int(os.getenv("PASSWORD_HASH_QUEUE_FACTOR", "4"))
+    # Thời gian cache thông tin người dùng đăng nhập (0 = tắt). Với backend
+    # memory và nhiều worker (WEB_CONCURRENCY > 1, như uvicorn/gunicorn đọc)
+    # cache này bị tắt: xóa/hạ quyền người dùng chỉ vô hiệu hóa được cache
+    # của worker xử lý request đó
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    
+    # Lưu trữ dữ liệu test
+    TEST_DATA_DIR: str = os.getenv("TEST_DATA_DIR", "storage/test_data")
+    # Dữ liệu test nhỏ hơn ngưỡng này được lưu trực tiếp trong database
+    TEST_DATA_INLINE_LIMIT: int = int(os.getenv("TEST_DATA_INLINE_LIMIT", str(64 * 1024)))
+    MAX_TEST_FILE_SIZE: int = int(os.getenv("MAX_TEST_FILE_SIZE", str(256 * 1024 * 1024)))
+    
+    # Cache response: "memory" (LRU mỗi worker) hoặc "redis" (dùng chung)
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_URL: str = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+    CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", "30"))
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    
+    # Giới hạn tần suất (token bucket), dạng "N/second|minute|hour|day", rỗng = tắt.
+    # Backend "memory" (mỗi worker) hoặc "sqlite" (dùng chung các worker trên một máy)
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_SQLITE_PATH: str = os.getenv("RATE_LIMIT_SQLITE_PATH", "storage/ratelimit.db")
+    RATE_LIMIT_LOGIN_PER_IP: str = os.getenv("RATE_LIMIT_LOGIN_PER_IP", "20/minute")
+    RATE_LIMIT_REGISTER_PER_IP: str = os.getenv("RATE_LIMIT_REGISTER_PER_IP", "5/minute")
+    RATE_LIMIT_SUBMISSION_PER_USER: str = os.getenv("RATE_LIMIT_SUBMISSION_PER_USER", "10/minute")
+    RATE_LIMIT_SUBMISSION_PER_IP: str = os.getenv("RATE_LIMIT_SUBMISSION_PER_IP", "60/minute")
+    
+    # Kiểm soát hàng đợi chấm bài: số bài judge xử lý được mỗi giây và thời
+    # gian chờ tối đa chấp nhận được; vượt quá thì từ chối bài nộp mới (429)
+    JUDGE_DRAIN_RATE: float = float(os.getenv("JUDGE_DRAIN_RATE", "5"))
+    JUDGE_QUEUE_SLA_SECONDS: float = float(os.getenv("JUDGE_QUEUE_SLA_SECONDS", "60"))
+    
+    # Email: "console" chỉ ghi log, "smtp" gửi qua SMTP_HOST. Dispatcher nền
+    # nhận batch từ outbox và gửi qua tối đa EMAIL_SMTP_CONNECTIONS kết nối
+    # SMTP dùng lại (mỗi worker), thử lại với thời gian chờ tăng gấp đôi
+    EMAIL_BACKEND: str = os.getenv("EMAIL_BACKEND", "console")
+    EMAIL_FROM: str = os.getenv("EMAIL_FROM", "noreply@codingplatform.com")
+    SMTP_HOST: str = os.getenv("SMTP_HOST", "localhost")
+    SMTP_PORT: int = int(os.getenv("SMTP_PORT", "587"))
+    SMTP_USERNAME: str = os.getenv("SMTP_USERNAME", "")
+    SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
+    SMTP_STARTTLS: bool = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+    SMTP_TIMEOUT: float = float(os.getenv("SMTP_TIMEOUT", "30"))
+    EMAIL_DISPATCHER_ENABLED: bool = os.getenv("EMAIL_DISPATCHER_ENABLED", "true").lower() == "true"
+    EMAIL_SMTP_CONNECTIONS: int = int(os.getenv("EMAIL_SMTP_CONNECTIONS", "4"))
+    EMAIL_BATCH_SIZE: int = int(os.getenv("EMAIL_BATCH_SIZE", "200"))
+    EMAIL_POLL_SECONDS: float = float(os.getenv("EMAIL_POLL_SECONDS", "2"))
+    EMAIL_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+    EMAIL_RETRY_BASE_SECONDS: float = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+    EMAIL_RETRY_MAX_SECONDS: float = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+    # Gửi email kết quả cho mỗi bài nộp được chấm
+    EMAIL_SUBMISSION_RESULTS: bool = os.getenv("EMAIL_SUBMISSION_RESULTS", "false").lower() == "true"
+    # Rating của người dùng ở cuộc thi được tính rating đầu tiên
+    RATING_INITIAL: int = int(os.getenv("RATING_INITIAL", "1500"))
+    # Việc tính rating bị bỏ dở (worker chết) được nhận lại sau chừng này giây
+    RATING_CLAIM_TIMEOUT_SECONDS: int = int(os.getenv("RATING_CLAIM_TIMEOUT_SECONDS", "1800"))
+    # Bảng xếp hạng: số người đầu bảng được cache và thời gian sống của cache;
+    # danh sách rating dùng để tra thứ hạng được nạp lại sau LEADERBOARD_REFRESH_SECONDS
+    LEADERBOARD_TOP_N: int = int(os.getenv("LEADERBOARD_TOP_N", "100"))
+    LEADERBOARD_CACHE_TTL_SECONDS: int = int(os.getenv("LEADERBOARD_CACHE_TTL_SECONDS", "300"))
+    LEADERBOARD_REFRESH_SECONDS: float = float(os.getenv("LEADERBOARD_REFRESH_SECONDS", "60"))
+    # Địa chỉ giao diện web, dùng cho liên kết trong email
+    APP_BASE_URL: str = os.getenv("APP_BASE_URL", "http://localhost:3000")
+    
+    # Outbox sự kiện: relay nền (mỗi worker), transport bên ngoài
+    # ("none", "file" ghi vào EVENT_SINK_PATH, "webhook" POST tới EVENT_WEBHOOK_URL)
+    EVENT_RELAY_ENABLED: bool = os.getenv("EVENT_RELAY_ENABLED", "true").lower() == "true"
+    EVENT_TRANSPORT: str = os.getenv("EVENT_TRANSPORT", "none")
+    EVENT_SINK_PATH: str = os.getenv("EVENT_SINK_PATH", "storage/events.jsonl")
+    EVENT_WEBHOOK_URL: str = os.getenv("EVENT_WEBHOOK_URL", "")
+    EVENT_BATCH_SIZE: int = int(os.getenv("EVENT_BATCH_SIZE", "500"))
+    EVENT_POLL_SECONDS: float = float(os.getenv("EVENT_POLL_SECONDS", "1"))
+    EVENT_RETRY_BASE_SECONDS: float = float(os.getenv("EVENT_RETRY_BASE_SECONDS", "5"))
+    EVENT_RETRY_MAX_SECONDS: float = float(os.getenv("EVENT_RETRY_MAX_SECONDS", "300"))
+    # Subscriber lỗi quá số lần này thì sự kiện bị đánh dấu failed
+    EVENT_MAX_ATTEMPTS: int = int(os.getenv("EVENT_MAX_ATTEMPTS", "8"))
     
     class Config:
         env_file = ".env"
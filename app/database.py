@@ -1,21 +1,183 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import Column, Integer, create_engine, exc, literal_column
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.types import BINARY, TypeDecorator
 from app.config import settings
+import itertools
+import os
+import threading
+import time
 import uuid
 
-# Tạo engine kết nối đến database
-engine = create_engine(settings.DATABASE_URL)
+class _WaitStatsMixin:
+    """Ghi lại số lần lấy kết nối, thời gian chờ và số lần hết thời gian chờ của pool"""
+
+    def __init__(self, *args, max_overflow=10, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        self.max_overflow_limit = max_overflow
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self._checkouts += 1
+                self._timeouts += timed_out
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+
+    def counters(self):
+        """Giá trị thô: số kết nối đang dùng, sức chứa và các bộ đếm tích lũy"""
+        with self._stats_lock:
+            checkouts, timeouts, wait_total = self._checkouts, self._timeouts, self._wait_total
+        return {
+            "checked_out": self.checkedout(),
+            "capacity": self.size() + max(0, self.max_overflow_limit),
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_seconds": wait_total,
+        }
+
+    def stats(self):
+        with self._stats_lock:
+            checkouts, timeouts, wait_total, wait_max = self._checkouts, self._timeouts, self._wait_total, self._wait_max
+        capacity = self.size() + max(0, self.max_overflow_limit)
+        return {
+            "size": self.size(),
+            "max_overflow": self.max_overflow_limit,
+            "checked_out": self.checkedout(),
+            "saturation": round(self.checkedout() / capacity, 3) if capacity > 0 else None,
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_avg_ms": round(wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+            "wait_max_ms": round(wait_max * 1000, 3),
+        }
+
+class InstrumentedQueuePool(_WaitStatsMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_WaitStatsMixin, AsyncAdaptedQueuePool):
+    pass
+
+def _engine_options(url: str, pool_size: int, max_overflow: int, pool_timeout: float, is_async: bool = False):
+    """Tham số pool cho một engine (SQLite trong bộ nhớ giữ pool mặc định)"""
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
+def _sync_engine(url: str):
+    return create_engine(url, **_engine_options(
+        url, settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW, settings.DB_POOL_TIMEOUT
+    ))
+
+def _replica_urls():
+    return [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+# Tạo engine kết nối đến database (primary: mọi thao tác ghi) và các bản sao chỉ đọc
+engine = _sync_engine(settings.DATABASE_URL)
+replica_engines = [_sync_engine(url) for url in _replica_urls()]
 
 # Tạo session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Cookie đánh dấu client vừa ghi: giá trị là thời điểm (Unix) hết hạn đọc từ primary
+READ_YOUR_WRITES_COOKIE = "db_primary_until"
+_replica_counter = itertools.count()
+
+def wants_primary(request: Request) -> bool:
+    """Client vừa ghi dữ liệu nên cần đọc từ primary"""
+    try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def _pick_replica(request: Request, count: int):
+    """Chỉ số bản sao dùng cho request đọc (luân phiên), None = dùng primary"""
+    if count == 0 or wants_primary(request):
+        return None
+    return next(_replica_counter) % count
+
 # Base class cho các models
 Base = declarative_base()
 
+def uuid7(timestamp_ms: int = None):
+    """
+    Tạo UUID phiên bản 7 (RFC 9562): 48 bit đầu là thời gian Unix (ms).
+
+    Các id được sinh gần nhau về thời gian sẽ nằm cạnh nhau trong clustered
+    index của InnoDB, nên insert luôn ghi vào cuối cây thay vì rải khắp nơi.
+    timestamp_ms cho phép sinh id của dữ liệu cũ (ví dụ khi tạo dữ liệu benchmark).
+    """
+    if timestamp_ms is None:
+        timestamp_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76                          # version
+    value |= ((rand >> 62) & 0xFFF) << 64       # rand_a (12 bit)
+    value |= 0b10 << 62                         # variant RFC 4122
+    value |= rand & 0x3FFF_FFFF_FFFF_FFFF       # rand_b (62 bit)
+    return uuid.UUID(int=value)
+
 # Hàm tiện ích để tạo UUID
 def generate_uuid():
-    return str(uuid.uuid4())
+    return str(uuid7())
+
+class BinaryUUID(TypeDecorator):
+    """
+    UUID lưu dưới dạng BINARY(16) trong database.
+
+    Python và API vẫn làm việc với chuỗi UUID chuẩn, kiểu này chuyển đổi
+    khi ghi/đọc. Chuỗi không phải UUID hợp lệ được bind thành NULL, nên
+    điều kiện lọc theo id đó sẽ không khớp dòng nào.
+    """
+    impl = BINARY(16)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, uuid.UUID):
+            return value.bytes
+        try:
+            return uuid.UUID(str(value)).bytes
+        except ValueError:
+            return None
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return str(uuid.UUID(bytes=bytes(value)))
+
+def version_column(name: str = "version"):
+    """
+    Cột phiên bản dùng làm ETag: tự tăng trong SQL ở mọi câu UPDATE của dòng
+    (kể cả UPDATE hàng loạt như bộ đếm), không cần đọc giá trị cũ.
+    """
+    return Column(name, Integer, nullable=False, default=1, server_default="1",
+                  onupdate=literal_column(name) + 1)
 
 # Hàm để cung cấp session cho các API
 def get_db():
@@ -23,4 +185,84 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db(request: Request):
+    """
+    Session cho các API chỉ đọc: dùng một bản sao nếu có, trừ khi client vừa
+    ghi dữ liệu (xem READ_YOUR_WRITES_COOKIE).
+    """
+    index = _pick_replica(request, len(replica_engines))
+    db = SessionLocal(bind=engine if index is None else replica_engines[index])
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Engine async cho các endpoint đọc nhiều (async def), tạo khi dùng lần đầu
+# để ứng dụng vẫn chạy được khi chưa cài driver async
+_async_engines = {}
+_async_session_factory = None
+
+def async_database_url(url: str) -> str:
+    """Đổi URL driver đồng bộ sang driver async tương ứng"""
+    for sync_prefix, async_prefix in (
+        ("mysql+pymysql://", "mysql+aiomysql://"),
+        ("mysql://", "mysql+aiomysql://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+def get_async_engine(replica: int = None):
+    """Engine async của primary hoặc của bản sao thứ `replica`"""
+    global _async_session_factory
+    key = "primary" if replica is None else f"replica{replica}"
+    if key not in _async_engines:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        if replica is None:
+            url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+        else:
+            url = async_database_url(_replica_urls()[replica])
+        _async_engines[key] = create_async_engine(url, **_engine_options(
+            url, settings.ASYNC_DB_POOL_SIZE, settings.ASYNC_DB_MAX_OVERFLOW,
+            settings.ASYNC_DB_POOL_TIMEOUT, is_async=True
+        ))
+        if _async_session_factory is None:
+            _async_session_factory = async_sessionmaker(autoflush=False, expire_on_commit=False)
+    return _async_engines[key]
+
+async def get_async_db():
+    bind = get_async_engine()
+    async with _async_session_factory(bind=bind) as db:
+        yield db
+
+async def get_async_read_db(request: Request):
+    """Như get_read_db, cho các API async"""
+    bind = get_async_engine(_pick_replica(request, len(replica_engines)))
+    async with _async_session_factory(bind=bind) as db:
+        yield db
+
+def _all_engines():
+    engines = {"primary": engine}
+    engines.update((f"replica{i}", replica) for i, replica in enumerate(replica_engines))
+    engines.update((f"async-{key}", async_engine.sync_engine) for key, async_engine in _async_engines.items())
+    return engines
+
+def pool_stats():
+    """Trạng thái pool kết nối của các engine trong worker hiện tại"""
+    stats = {"pid": os.getpid(), "engines": {}}
+    for name, target in _all_engines().items():
+        pool = target.pool
+        stats["engines"][name] = pool.stats() if isinstance(pool, _WaitStatsMixin) else {"pool": type(pool).__name__}
+    return stats
+
+def pool_counters():
+    """Bộ đếm thô của các pool có đo đạc (dùng cho /metrics)"""
+    return {
+        name: target.pool.counters()
+        for name, target in _all_engines().items()
+        if isinstance(target.pool, _WaitStatsMixin)
+    }
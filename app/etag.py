@@ -0,0 +1,49 @@
+"""
+HTTP conditional request (ETag / If-None-Match) cho các endpoint đọc.
+
+ETag được tạo từ cột phiên bản của dòng dữ liệu (và các phần phụ thuộc
+người xem), nên endpoint chỉ cần một truy vấn nhỏ theo khóa chính để trả
+304 trước khi tải và serialize toàn bộ response.
+"""
+import hashlib
+
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+
+# Response phụ thuộc người dùng đăng nhập: không dùng chung ở proxy
+CACHE_CONTROL = "private, no-cache"
+
+def make_etag(*parts) -> str:
+    """ETag mạnh từ các phần (loại tài nguyên, id, phiên bản, ...)"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Kiểm tra If-None-Match (so sánh yếu theo RFC 9110)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {value.strip().removeprefix("W/") for value in header.split(",")}
+    return etag in candidates
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
+
+def etag_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Authorization"}
+
+def set_etag(response: Response, etag: str):
+    response.headers.update(etag_headers(etag))
+
+def bump_version(db: Session, model, row_id, column=None):
+    """
+    Tăng phiên bản của một dòng khi dữ liệu con thay đổi (test case, bài toán
+    của cuộc thi, điểm người tham gia). Tăng bằng biểu thức SQL nên an toàn
+    khi chạy song song. Không commit.
+    """
+    column = column if column is not None else model.version
+    db.query(model).filter(model.id == row_id).update(
+        {column: column + 1}, synchronize_session=False
+    )
@@ -0,0 +1,52 @@
+"""
+Sự kiện miền qua transactional outbox.
+
+publish() chỉ thêm một dòng vào outbox_events trong session của người gọi,
+nên sự kiện được ghi (hoặc bị hủy) cùng commit với thay đổi trạng thái.
+Relay nền (app.services.event_relay) đọc outbox theo batch, gọi các
+subscriber đã đăng ký bằng @subscribe rồi gửi batch ra transport bên ngoài.
+
+Mỗi sự kiện được giao ít nhất một lần (có thể lặp khi relay lỗi giữa
+chừng); bên nhận dùng "id" để loại trùng. Subscriber chạy một lần cho cả
+cụm (ở worker nhận batch), không phải ở mọi worker.
+
+Các topic:
+- user.created: user_id
+- contest.registered: contest_id, user_id
+- submission.judged: submission_id, user_id, problem_id, contest_id,
+  language, status, execution_time_ms, points
+- contest.rated: contest_id, participants
+"""
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+from sqlalchemy.orm import Session
+
+from app.models.events import OutboxEvent
+
+USER_CREATED = "user.created"
+CONTEST_REGISTERED = "contest.registered"
+SUBMISSION_JUDGED = "submission.judged"
+CONTEST_RATED = "contest.rated"
+
+_subscribers: Dict[str, List[Callable]] = defaultdict(list)
+
+def publish(db: Session, topic: str, payload: dict) -> OutboxEvent:
+    """Ghi sự kiện vào outbox (người gọi commit cùng thay đổi của mình)"""
+    event = OutboxEvent(topic=topic, payload=payload)
+    db.add(event)
+    return event
+
+def subscribe(topic: str):
+    """
+    Đăng ký handler(db, event) cho topic. Handler chạy trong một savepoint
+    của transaction đánh dấu batch đã giao; handler lỗi thì thay đổi của nó
+    bị hủy và sự kiện được thử lại (chỉ các handler chưa thành công).
+    """
+    def decorator(handler: Callable):
+        _subscribers[topic].append(handler)
+        return handler
+    return decorator
+
+def subscribers(topic: str) -> List[Callable]:
+    return _subscribers.get(topic, [])
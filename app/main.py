@@ -1,8 +1,17 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.orm import Session
 
-from app.database import engine
+from app import metrics, tracing
+from app.config import settings
+from app.database import engine, get_read_db, pool_stats
+from app.cache import response_cache
+from app.auth.oauth2 import get_current_admin_user
+from app.auth.utils import shutdown_executor
+from app.middleware import MetricsMiddleware, QueryStatsMiddleware, ReadYourWritesMiddleware, TraceCaptureMiddleware
+from app.pagination import NEXT_CURSOR_HEADER
+from app.services import email_dispatcher, event_relay, judge_queue_service
 from app.models import users, problems, contests, submissions
 from app.auth.router import router as auth_router
 from app.routers.users import router as users_router
@@ -31,7 +40,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TraceCaptureMiddleware)
 
 # Thêm các routers
 app.include_router(auth_router)
@@ -40,6 +54,42 @@ app.include_router(problems_router)
 app.include_router(contests_router)
 app.include_router(submissions_router)
 
+@app.on_event("startup")
+def start_metrics_writer():
+    metrics.start_writer()
+
+@app.on_event("shutdown")
+def stop_password_hashing():
+    shutdown_executor()
+
+@app.on_event("startup")
+def start_trace_capture():
+    tracing.start_capture()
+
+@app.on_event("shutdown")
+def stop_metrics_writer():
+    metrics.stop_writer()
+
+@app.on_event("shutdown")
+def stop_trace_capture():
+    tracing.stop_capture()
+
+@app.on_event("startup")
+def start_email_dispatcher():
+    email_dispatcher.start_dispatcher()
+
+@app.on_event("shutdown")
+def stop_email_dispatcher():
+    email_dispatcher.stop_dispatcher()
+
+@app.on_event("startup")
+def start_event_relay():
+    event_relay.start_relay()
+
+@app.on_event("shutdown")
+def stop_event_relay():
+    event_relay.stop_relay()
+
 @app.get("/", tags=["Root"])
 async def root():
     return {"message": "Welcome to the Coding Platform API"}
@@ -48,6 +98,28 @@ async def root():
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/api/health/cache", tags=["Health"])
+def cache_stats(current_user=Depends(get_current_admin_user)):
+    """Số hit/miss và tỉ lệ hit của cache response (theo worker)"""
+    return response_cache.stats()
+
+@app.get("/api/health/db", tags=["Health"])
+def database_pool_stats(current_user=Depends(get_current_admin_user)):
+    """
+    Pool kết nối của worker hiện tại: số kết nối đang dùng, mức bão hòa,
+    thời gian chờ lấy kết nối và số lần hết thời gian chờ
+    """
+    return pool_stats()
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+def prometheus_metrics(request: Request, db: Session = Depends(get_read_db)):
+    """Metrics dạng Prometheus, cộng dồn mọi worker (xem app.metrics)"""
+    if settings.METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    metrics.JUDGE_QUEUE_DEPTH.set((), judge_queue_service.pending_count(db))
+    metrics.JUDGE_QUEUE_ESTIMATED_WAIT.set((), judge_queue_service.estimated_wait(db))
+    return PlainTextResponse(metrics.render_latest(), media_type=metrics.CONTENT_TYPE)
+
 # Xử lý lỗi 404
 @app.exception_handler(404)
 async def not_found_exception_handler(request, exc):
@@ -0,0 +1,430 @@
+"""
+Metrics dạng Prometheus (text exposition format 0.0.4), không cần thư viện ngoài.
+
+Mỗi metric giữ giá trị trong bộ nhớ của process, ghi nhận chỉ tốn một lần
+lấy lock riêng của metric đó. Khi chạy nhiều worker uvicorn, mỗi worker ghi
+định kỳ bản chụp của mình vào METRICS_DIR/<pid>-<id ngẫu nhiên>.json (tên
+riêng cho từng lần chạy, không phụ thuộc PID được dùng lại); GET /metrics
+cộng dồn bản chụp của mọi worker:
+- counter và histogram: cộng tất cả các file. File của worker đã dừng (lâu
+  không được ghi) được gộp vào METRICS_DIR/totals.json rồi xóa, nên tổng
+  không giảm khi worker khởi động lại và thư mục không lớn dần;
+- gauge: chỉ cộng các worker còn sống (file được ghi gần đây);
+- gauge kiểu "scrape": chỉ lấy giá trị do worker đang phục vụ /metrics tính.
+Việc gộp và việc ghi bản chụp loại trừ nhau qua một file khóa. Worker chỉ
+chậm ghi (bị coi là đã dừng và bị gộp) sẽ ghi tiếp dưới tên mới phần tăng
+thêm kể từ bản đã gộp, nên không bị đếm hai lần.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: "_Metric"):
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Hàm cập nhật giá trị (ví dụ trạng thái pool) ngay trước khi chụp"""
+        self._collectors.append(collector)
+
+    def snapshot(self, include_scrape: bool = False) -> dict:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                logger.exception("Metrics collector failed")
+        return {
+            name: metric.snapshot()
+            for name, metric in self._metrics.items()
+            if include_scrape or not metric.scrape_only
+        }
+
+    def subtract(self, snapshot: dict, base: dict) -> dict:
+        """Bản chụp trừ đi một bản chụp mốc (counter/histogram)"""
+        result = {}
+        for name, entries in snapshot.items():
+            metric = self._metrics[name]
+            base_values = {tuple(labels): value for labels, value in base.get(name, [])}
+            result[name] = [
+                [labels, metric.subtract(value, base_values.get(tuple(labels)))] for labels, value in entries
+            ]
+        return result
+
+    def accumulate(self, total: dict, snapshot: dict) -> dict:
+        """Cộng counter/histogram của một bản chụp vào tổng (bỏ gauge)"""
+        for name, entries in snapshot.items():
+            metric = self._metrics.get(name)
+            if metric is None or metric.kind == "gauge":
+                continue
+            merged = {tuple(labels): value for labels, value in total.get(name, [])}
+            for labels, value in entries:
+                merged[tuple(labels)] = metric.merge(merged.get(tuple(labels)), value)
+            total[name] = [[list(labels), value] for labels, value in merged.items()]
+        return total
+
+    def render(self, snapshots: List[Tuple[dict, bool]]) -> str:
+        """Gộp các bản chụp (bản chụp, process còn sống) thành văn bản Prometheus"""
+        lines = []
+        for name, metric in self._metrics.items():
+            merged = {}
+            for snapshot, alive in snapshots:
+                if metric.kind == "gauge" and not alive:
+                    continue
+                for labels, value in snapshot.get(name, []):
+                    merged[tuple(labels)] = metric.merge(merged.get(tuple(labels)), value)
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for labels in sorted(merged):
+                lines.extend(metric.render(labels, merged[labels]))
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class _Metric:
+    kind = ""
+    scrape_only = False
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    def merge(self, current, value):
+        return value if current is None else current + value
+
+    def subtract(self, value, base):
+        """Phần tăng thêm so với mốc base (gauge giữ nguyên giá trị hiện tại)"""
+        return value if base is None or self.kind == "gauge" else value - base
+
+    def _labels(self, labels, extra=()) -> str:
+        pairs = [f'{key}="{_escape(value)}"' for key, value in zip(self.labelnames, labels)]
+        pairs.extend(f'{key}="{_escape(value)}"' for key, value in extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self, labels, value):
+        return [f"{self.name}{self._labels(labels)} {value}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def set_total(self, labels: tuple, value: float):
+        """Đặt tổng đếm sẵn ở nơi khác (ví dụ bộ đếm của pool kết nối)"""
+        with self._lock:
+            self._values[labels] = float(value)
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, scrape_only: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scrape_only = scrape_only
+
+    def set(self, labels: tuple = (), value: float = 0.0):
+        with self._lock:
+            self._values[labels] = float(value)
+
+    def inc(self, labels: tuple = (), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, labels: tuple = (), amount: float = 1.0):
+        self.inc(labels, -amount)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, labels: tuple, value: float):
+        # Số lần quan sát theo từng bucket (không cộng dồn), bucket +Inf, rồi tổng
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), list(entry)] for labels, entry in self._values.items()]
+
+    def merge(self, current, value):
+        return list(value) if current is None else [a + b for a, b in zip(current, value)]
+
+    def subtract(self, value, base):
+        return list(value) if base is None else [a - b for a, b in zip(value, base)]
+
+    def render(self, labels, entry):
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), entry):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{self.name}_bucket{self._labels(labels, [('le', le)])} {cumulative}")
+        lines.append(f"{self.name}_sum{self._labels(labels)} {entry[-1]}")
+        lines.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return lines
+
+# Ghi bản chụp của worker ra METRICS_DIR
+
+_writer: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+TOTALS_FILE = "totals.json"
+LOCK_FILE = ".lock"
+# File khóa cũ hơn chừng này giây là của process đã chết giữa chừng
+STALE_LOCK_SECONDS = 30
+
+# (pid, tên bản chụp) của process hiện tại; tạo lại sau fork
+_identity: Optional[Tuple[int, str]] = None
+# Bản chụp đầy đủ lần ghi gần nhất và mốc đã được gộp vào totals
+_last_written: Optional[dict] = None
+_baseline: dict = {}
+
+def _process_name(renew: bool = False) -> str:
+    global _identity
+    if renew or _identity is None or _identity[0] != os.getpid():
+        _identity = (os.getpid(), f"{os.getpid()}-{uuid.uuid4().hex[:12]}")
+    return _identity[1]
+
+def _snapshot_path(name: str) -> str:
+    return os.path.join(settings.METRICS_DIR, f"{name}.json")
+
+def _write_json(path: str, data):
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+@contextmanager
+def _directory_lock(wait: float = 0.0):
+    """Khóa METRICS_DIR giữa các process (file tạo bằng O_EXCL); trả False nếu không lấy được"""
+    path = os.path.join(settings.METRICS_DIR, LOCK_FILE)
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if os.path.getmtime(path) < time.time() - STALE_LOCK_SECONDS:
+                    os.remove(path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() >= deadline:
+                yield False
+                return
+            time.sleep(0.05)
+    try:
+        yield True
+    finally:
+        os.remove(path)
+
+def write_snapshot(wait: float = 0.0) -> bool:
+    """Ghi bản chụp của worker; False nếu thư mục đang bị khóa (lần sau ghi lại)"""
+    global _last_written, _baseline
+    with _directory_lock(wait) as locked:
+        if not locked:
+            return False
+        path = _snapshot_path(_process_name())
+        if _last_written is not None and not os.path.exists(path):
+            # Bản chụp đã bị gộp vào totals: ghi tiếp dưới tên mới phần tăng thêm
+            _baseline = _last_written
+            path = _snapshot_path(_process_name(renew=True))
+        snapshot = REGISTRY.snapshot()
+        _write_json(path, REGISTRY.subtract(snapshot, _baseline))
+        _last_written = snapshot
+        return True
+
+def _write_loop():
+    while not _stop.wait(settings.METRICS_FLUSH_SECONDS):
+        try:
+            write_snapshot()
+        except Exception:
+            logger.exception("Failed to write metrics snapshot")
+
+def start_writer():
+    """Bắt đầu ghi bản chụp định kỳ (khi khởi động worker), bỏ qua nếu không đặt METRICS_DIR"""
+    global _writer
+    if not settings.METRICS_DIR or _writer is not None:
+        return
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    _stop.clear()
+    write_snapshot(wait=1.0)
+    _writer = threading.Thread(target=_write_loop, name="metrics-writer", daemon=True)
+    _writer.start()
+
+def stop_writer():
+    """Ghi bản chụp cuối cùng (khi tắt worker)"""
+    global _writer
+    if _writer is None:
+        return
+    _stop.set()
+    _writer.join()
+    _writer = None
+    write_snapshot(wait=1.0)
+
+def _read_json(path: str):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _read_totals() -> dict:
+    totals = _read_json(os.path.join(settings.METRICS_DIR, TOTALS_FILE))
+    return totals if isinstance(totals, dict) else {"folded": [], "metrics": {}}
+
+def _snapshot_names():
+    for filename in os.listdir(settings.METRICS_DIR):
+        name, extension = os.path.splitext(filename)
+        if extension == ".json" and filename != TOTALS_FILE and not filename.startswith("."):
+            yield name
+
+def _fold_dead(dead_before: float):
+    """
+    Gộp counter/histogram của các worker đã dừng vào totals.json rồi xóa file
+    của chúng. totals.json ghi lại tên các file đã gộp (ghi nguyên tử cùng tổng)
+    để file chưa kịp xóa không bị cộng hai lần.
+    """
+    with _directory_lock() as locked:
+        if not locked:
+            return
+        totals = _read_totals()
+        folded = set(totals["folded"])
+        own = _process_name()
+        dead = []
+        for name in _snapshot_names():
+            path = _snapshot_path(name)
+            try:
+                if name in folded or name == own or os.path.getmtime(path) >= dead_before:
+                    continue
+            except OSError:
+                continue
+            snapshot = _read_json(path)
+            if snapshot is not None:
+                REGISTRY.accumulate(totals["metrics"], snapshot)
+            dead.append(name)
+        if not dead:
+            return
+        # Chỉ giữ tên các file còn tồn tại (đã gộp nhưng chưa xóa)
+        present = set(_snapshot_names())
+        totals["folded"] = sorted((folded & present) | set(dead))
+        _write_json(os.path.join(settings.METRICS_DIR, TOTALS_FILE), totals)
+        for name in dead:
+            try:
+                os.remove(_snapshot_path(name))
+            except OSError:
+                pass
+
+def _read_snapshots():
+    """Tổng của các worker đã dừng và bản chụp của các worker khác, kèm cờ worker còn sống"""
+    snapshots = []
+    if not settings.METRICS_DIR or not os.path.isdir(settings.METRICS_DIR):
+        return snapshots
+    fresh_after = time.time() - 3 * settings.METRICS_FLUSH_SECONDS
+    _fold_dead(fresh_after)
+    totals = _read_totals()
+    snapshots.append((totals["metrics"], False))
+    folded = set(totals["folded"])
+    own = _process_name()
+    for name in _snapshot_names():
+        if name in folded or name == own:
+            continue
+        path = _snapshot_path(name)
+        try:
+            alive = os.path.getmtime(path) >= fresh_after
+        except OSError:
+            continue
+        snapshot = _read_json(path)
+        if snapshot is not None:
+            snapshots.append((snapshot, alive))
+    return snapshots
+
+def render_latest() -> str:
+    """Văn bản /metrics: process hiện tại cộng với bản chụp của các worker khác"""
+    own = REGISTRY.subtract(REGISTRY.snapshot(include_scrape=True), _baseline)
+    return REGISTRY.render([(own, True)] + _read_snapshots())
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Các metric của ứng dụng
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status code",
+    ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route"]
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out", ["engine"])
+DB_POOL_CAPACITY = Gauge("db_pool_capacity", "Pool size plus max overflow", ["engine"])
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Connection checkouts", ["engine"])
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Checkouts that timed out waiting for a connection", ["engine"])
+DB_POOL_WAIT = Counter("db_pool_wait_seconds_total", "Time spent waiting for a connection", ["engine"])
+
+JUDGE_QUEUE_DEPTH = Gauge("judge_queue_depth", "Submissions waiting to be judged", scrape_only=True)
+JUDGE_QUEUE_ESTIMATED_WAIT = Gauge(
+    "judge_queue_estimated_wait_seconds", "Estimated wait for a new submission", scrape_only=True
+)
+JUDGE_QUEUE_WAIT = Histogram(
+    "judge_queue_wait_seconds", "Time from submission to start of judging",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
+JUDGE_COMPILE = Histogram("judge_compile_seconds", "Compile time by language", ["language"])
+JUDGE_RUN = Histogram("judge_run_seconds", "Run time (all test cases) by language", ["language"])
+JUDGE_COMPILE_CACHE = Counter("judge_compile_cache_total", "Compile cache lookups by result (hit/miss)", ["result"])
+JUDGE_VERDICTS = Counter("judge_verdicts_total", "Judged submissions by language and verdict", ["language", "verdict"])
+
+EMAILS = Counter("emails_total", "Outbox emails processed by result (sent/retry/failed)", ["result"])
+
+def _collect_pool_stats():
+    from app.database import pool_counters
+
+    for name, stats in pool_counters().items():
+        labels = (name,)
+        DB_POOL_CHECKED_OUT.set(labels, stats["checked_out"])
+        DB_POOL_CAPACITY.set(labels, stats["capacity"])
+        DB_POOL_CHECKOUTS.set_total(labels, stats["checkouts"])
+        DB_POOL_TIMEOUTS.set_total(labels, stats["timeouts"])
+        DB_POOL_WAIT.set_total(labels, stats["wait_seconds"])
+
+REGISTRY.add_collector(_collect_pool_stats)
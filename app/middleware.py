@@ -0,0 +1,177 @@
+"""
+Middleware ASGI của ứng dụng (viết trực tiếp trên ASGI để không bọc lại
+response, kể cả response streaming).
+"""
+import logging
+import time
+
+from app import metrics, query_stats, tracing
+from app.config import settings
+from app.database import READ_YOUR_WRITES_COOKIE, replica_engines
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+class ReadYourWritesMiddleware:
+    """
+    Sau một request ghi thành công, đặt cookie READ_YOUR_WRITES_COOKIE để các
+    request đọc tiếp theo của client dùng primary trong READ_YOUR_WRITES_SECONDS
+    giây, thay vì một bản sao có thể chưa nhận được thay đổi.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        seconds = settings.READ_YOUR_WRITES_SECONDS
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not replica_engines or seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = (f"{READ_YOUR_WRITES_COOKIE}={time.time() + seconds:.0f}; "
+                          f"Max-Age={seconds}; Path=/; HttpOnly; SameSite=Lax")
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+class QueryStatsMiddleware:
+    """
+    Ghi số câu SQL, tổng thời gian SQL và câu chậm nhất của mỗi request:
+    gắn header Server-Timing vào response và ghi log khi request kết thúc.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.SQL_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = query_stats.QueryStats()
+        token = query_stats.current.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timing = f"{stats.server_timing()}, app;dur={(time.perf_counter() - start) * 1000:.1f}"
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            query_stats.current.reset(token)
+            self._log(scope, status_code, stats, time.perf_counter() - start)
+
+    def _log(self, scope, status_code, stats, elapsed):
+        request = f"{scope['method']} {scope['path']}"
+        slow = stats.count >= settings.SQL_WARN_QUERIES or stats.total * 1000 >= settings.SQL_WARN_MS
+        level = logging.WARNING if slow else logging.DEBUG
+        if logger.isEnabledFor(level):
+            logger.log(
+                level, "%s %s: %d queries, %.1f ms SQL, slowest %.1f ms, total %.1f ms%s",
+                request, status_code, stats.count, stats.total * 1000, stats.slowest * 1000, elapsed * 1000,
+                f" ({' '.join(stats.slowest_statement.split())[:300]})" if slow and stats.slowest_statement else ""
+            )
+        if settings.N_PLUS_ONE_THRESHOLD > 0:
+            for statement, count in stats.repeated(settings.N_PLUS_ONE_THRESHOLD):
+                logger.warning(
+                    "Possible N+1 in %s: statement executed %d times: %s",
+                    request, count, " ".join(statement.split())[:300]
+                )
+
+class MetricsMiddleware:
+    """Số request đang xử lý, số request và độ trễ theo route (mẫu đường dẫn, không phải URL thật)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            # Không dùng URL thật làm nhãn để số chuỗi metric không tăng vô hạn
+            path = getattr(route, "path", None) or "unmatched"
+            metrics.HTTP_REQUESTS.inc((scope["method"], path, str(status_code)))
+            metrics.HTTP_LATENCY.observe((scope["method"], path), elapsed)
+
+class TraceCaptureMiddleware:
+    """
+    Ghi trace đã làm sạch của các request khớp route (xem app.tracing), bật
+    bằng TRACE_DIR. Body chỉ được giữ lại để làm sạch, không ghi nguyên văn.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracing.enabled() or not tracing.sampled():
+            await self.app(scope, receive, send)
+            return
+
+        trace = tracing.RequestTrace()
+        token = tracing.current.set(trace)
+        started_at = time.time()
+        start = time.perf_counter()
+        status_code = 500
+        chunks, size = [], 0
+
+        async def receive_with_body():
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request" and size <= tracing.MAX_BODY_BYTES:
+                chunks.append(message.get("body", b""))
+                size += len(chunks[-1])
+            return message
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_with_body, send_with_status)
+        finally:
+            tracing.current.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                headers = dict(scope.get("headers") or [])
+                tracing.record({
+                    "ts": round(started_at, 6),
+                    "method": scope["method"],
+                    "route": route.path,
+                    "path_params": {key: str(value) for key, value in scope.get("path_params", {}).items()},
+                    "query": tracing.sanitize_query(scope.get("query_string", b"")),
+                    "body": tracing.sanitize_body(headers.get(b"content-type", b"").decode("latin-1"), b"".join(chunks)),
+                    "conditional": b"if-none-match" in headers,
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                    "user_class": trace.user_class,
+                    "user_key": trace.user_key,
+                })
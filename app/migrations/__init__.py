@@ -0,0 +1,69 @@
+"""
+Migration schema có đánh số phiên bản.
+
+Mỗi migration là một module `vNNNN_<tên>.py` trong package này, khai báo
+`description` và hàm `upgrade(connection)`. Các phiên bản đã áp dụng được ghi
+vào bảng `schema_migrations`.
+
+Chạy: python -m app.migrations
+"""
+import importlib
+import pkgutil
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", String(64), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+def discover():
+    """Danh sách (version, module) của các migration, sắp theo phiên bản"""
+    migrations = []
+    for info in pkgutil.iter_modules(__path__):
+        if info.name.startswith("v") and info.name[1:5].isdigit():
+            module = importlib.import_module(f"{__name__}.{info.name}")
+            migrations.append((info.name, module))
+    return sorted(migrations)
+
+def applied_versions(connection):
+    """Các phiên bản đã được áp dụng trên database"""
+    schema_migrations.create(connection, checkfirst=True)
+    return {row.version for row in connection.execute(schema_migrations.select())}
+
+def upgrade(engine):
+    """Áp dụng lần lượt các migration chưa chạy, mỗi migration một transaction"""
+    # Import toàn bộ models để metadata đầy đủ các bảng và index được khai báo
+    import app.models  # noqa: F401
+
+    with engine.begin() as connection:
+        done = applied_versions(connection)
+
+    applied = []
+    for version, module in discover():
+        if version in done:
+            continue
+        with engine.begin() as connection:
+            module.upgrade(connection)
+            connection.execute(
+                schema_migrations.insert().values(version=version, applied_at=datetime.utcnow())
+            )
+        applied.append(version)
+    return applied
+
+# Các hàm hỗ trợ dùng trong migration
+
+def create_declared_index(connection, table_name: str, index_name: str):
+    """Tạo index đã được khai báo trong model (bỏ qua nếu đã tồn tại)"""
+    from app.database import Base
+
+    table = Base.metadata.tables[table_name]
+    index = next(index for index in table.indexes if index.name == index_name)
+    existing = {i["name"] for i in inspect(connection).get_indexes(table_name)}
+    if index.name not in existing:
+        index.create(connection)
@@ -0,0 +1,10 @@
+from app.database import engine
+from app.migrations import upgrade
+
+if __name__ == "__main__":
+    applied = upgrade(engine)
+    if applied:
+        for version in applied:
+            print(f"Applied {version}")
+    else:
+        print("Database is up to date")
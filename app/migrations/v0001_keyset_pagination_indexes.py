@@ -0,0 +1,17 @@
+from app.migrations import create_declared_index
+
+description = "Composite indexes for keyset pagination of list endpoints"
+
+INDEXES = [
+    ("submissions", "ix_submissions_submitted_at_id"),
+    ("submissions", "ix_submissions_user_submitted_at_id"),
+    ("problems", "ix_problems_created_at_id"),
+    ("problems", "ix_problems_is_public_created_at_id"),
+    ("contests", "ix_contests_created_at_id"),
+    ("contests", "ix_contests_is_public_created_at_id"),
+    ("users", "ix_users_created_at_id"),
+]
+
+def upgrade(connection):
+    for table_name, index_name in INDEXES:
+        create_declared_index(connection, table_name, index_name)
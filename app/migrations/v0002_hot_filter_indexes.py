@@ -0,0 +1,16 @@
+from app.migrations import create_declared_index
+
+description = "Composite indexes for hot submission and contest filters"
+
+INDEXES = [
+    ("submissions", "ix_submissions_user_problem_status"),
+    ("submissions", "ix_submissions_contest_status"),
+    ("contest_problems", "ix_contest_problems_contest_problem"),
+    ("contest_participants", "ix_contest_participants_contest_user"),
+    ("contest_participants", "ix_contest_participants_contest_score"),
+    ("test_cases", "ix_test_cases_problem_order"),
+]
+
+def upgrade(connection):
+    for table_name, index_name in INDEXES:
+        create_declared_index(connection, table_name, index_name)
@@ -0,0 +1,82 @@
+"""
+Chuyển các cột khóa UUID từ CHAR(36) sang BINARY(16).
+
+Giá trị được giữ nguyên (UNHEX của chuỗi UUID bỏ dấu gạch), nên các id cũ vẫn
+hợp lệ; chỉ id mới được sinh theo UUIDv7. Trên MySQL mỗi cột đi qua
+VARBINARY(36) trung gian để UPDATE được trước khi thu về BINARY(16). Khóa
+ngoại được tạm tắt kiểm tra trong lúc đổi kiểu các cột tham chiếu lẫn nhau.
+"""
+from sqlalchemy import inspect, text
+
+description = "Store UUID keys as BINARY(16)"
+
+# (bảng, cột, nullable) tại thời điểm migration này được viết
+UUID_COLUMNS = [
+    ("users", "id", False),
+    ("problems", "id", False),
+    ("problems", "created_by", True),
+    ("test_cases", "id", False),
+    ("test_cases", "problem_id", False),
+    ("contests", "id", False),
+    ("contests", "created_by", True),
+    ("contest_problems", "id", False),
+    ("contest_problems", "contest_id", False),
+    ("contest_problems", "problem_id", False),
+    ("contest_participants", "id", False),
+    ("contest_participants", "contest_id", False),
+    ("contest_participants", "user_id", False),
+    ("submissions", "id", False),
+    ("submissions", "user_id", False),
+    ("submissions", "problem_id", False),
+    ("submissions", "contest_id", True),
+]
+
+def _pending_columns(connection):
+    """Các cột vẫn còn lưu UUID dạng chuỗi"""
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    pending = []
+    for table, column, nullable in UUID_COLUMNS:
+        if table not in tables:
+            continue
+        types = {c["name"]: str(c["type"]).upper() for c in inspector.get_columns(table)}
+        if "CHAR" in types.get(column, "") and "BINARY" not in types[column]:
+            pending.append((table, column, nullable))
+    return pending
+
+def _upgrade_mysql(connection, pending):
+    connection.execute(text("SET FOREIGN_KEY_CHECKS = 0"))
+    try:
+        for table, column, nullable in pending:
+            null = "NULL" if nullable else "NOT NULL"
+            connection.execute(text(f"ALTER TABLE `{table}` MODIFY `{column}` VARBINARY(36) {null}"))
+            connection.execute(text(
+                f"UPDATE `{table}` SET `{column}` = UNHEX(REPLACE(`{column}`, '-', '')) "
+                f"WHERE LENGTH(`{column}`) = 36"
+            ))
+            connection.execute(text(f"ALTER TABLE `{table}` MODIFY `{column}` BINARY(16) {null}"))
+    finally:
+        connection.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
+
+def _upgrade_generic(connection, pending):
+    # SQLite không ràng buộc kiểu cột, chỉ cần đổi giá trị sang 16 byte
+    import uuid
+
+    for table, column, _ in pending:
+        values = connection.execute(text(
+            f'SELECT DISTINCT "{column}" FROM "{table}" WHERE length("{column}") = 36'
+        )).scalars().all()
+        for value in values:
+            connection.execute(
+                text(f'UPDATE "{table}" SET "{column}" = :new WHERE "{column}" = :old'),
+                {"new": uuid.UUID(value).bytes, "old": value}
+            )
+
+def upgrade(connection):
+    pending = _pending_columns(connection)
+    if not pending:
+        return
+    if connection.dialect.name == "mysql":
+        _upgrade_mysql(connection, pending)
+    else:
+        _upgrade_generic(connection, pending)
@@ -0,0 +1,67 @@
+"""
+Bảng user_problem_status và bộ đếm solved_count/attempted_count của problems.
+
+Dữ liệu cũ được tính lại từ bảng submissions bằng các câu lệnh gộp trong SQL.
+Các dòng được backfill dùng id ngẫu nhiên 16 byte của database thay vì UUIDv7.
+"""
+from sqlalchemy import inspect, text
+
+from app.database import Base
+
+description = "Materialized per-(user, problem) solved state and problem counters"
+
+def _add_counter_columns(connection):
+    columns = {c["name"] for c in inspect(connection).get_columns("problems")}
+    for name in ("solved_count", "attempted_count"):
+        if name not in columns:
+            connection.execute(text(f"ALTER TABLE problems ADD COLUMN {name} INTEGER NOT NULL DEFAULT 0"))
+
+def _backfill(connection):
+    if connection.dialect.name == "mysql":
+        new_id = "UNHEX(REPLACE(UUID(), '-', ''))"
+    else:
+        new_id = "randomblob(16)"
+
+    connection.execute(text(f"""
+        INSERT INTO user_problem_status
+            (id, user_id, problem_id, attempts, solved, first_accepted_at,
+             best_execution_time_ms, last_submitted_at)
+        SELECT {new_id}, user_id, problem_id, COUNT(*),
+               MAX(CASE WHEN status = 'accepted' THEN 1 ELSE 0 END),
+               MIN(CASE WHEN status = 'accepted' THEN submitted_at END),
+               MIN(CASE WHEN status = 'accepted' THEN execution_time_ms END),
+               MAX(submitted_at)
+        FROM submissions
+        WHERE status <> 'pending'
+        GROUP BY user_id, problem_id
+    """))
+
+    connection.execute(text("""
+        UPDATE user_problem_status SET best_submission_id = (
+            SELECT s.id FROM submissions s
+            WHERE s.user_id = user_problem_status.user_id
+              AND s.problem_id = user_problem_status.problem_id
+              AND s.status = 'accepted'
+            ORDER BY s.execution_time_ms, s.submitted_at
+            LIMIT 1
+        )
+        WHERE solved = 1
+    """))
+
+    connection.execute(text("""
+        UPDATE problems SET
+            attempted_count = (
+                SELECT COUNT(*) FROM user_problem_status u WHERE u.problem_id = problems.id
+            ),
+            solved_count = (
+                SELECT COUNT(*) FROM user_problem_status u
+                WHERE u.problem_id = problems.id AND u.solved = 1
+            )
+    """))
+
+def upgrade(connection):
+    _add_counter_columns(connection)
+    table = Base.metadata.tables["user_problem_status"]
+    if not inspect(connection).has_table(table.name):
+        table.create(connection)
+        _backfill(connection)
@@ -0,0 +1,18 @@
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from app.database import Base
+
+description = "Inverted search index over problems and contests"
+
+def upgrade(connection):
+    from app.services.search_service import reindex_all
+
+    table = Base.metadata.tables["search_terms"]
+    if not inspect(connection).has_table(table.name):
+        table.create(connection)
+
+    # Xây chỉ mục cho dữ liệu hiện có trong cùng transaction của migration
+    session = Session(bind=connection)
+    reindex_all(session)
+    session.flush()
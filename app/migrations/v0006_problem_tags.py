@@ -0,0 +1,50 @@
+"""
+Bảng tags/problem_tags và chuẩn hóa cột problems.tags.
+
+Trước đây tags bị json.dumps trước khi ghi vào cột JSON nên giá trị lưu là
+một chuỗi JSON chứa danh sách. Migration giải mã các giá trị đó, ghi lại dưới
+dạng danh sách và tạo các liên kết problem_tags tương ứng.
+"""
+import json
+
+from sqlalchemy import inspect, select
+
+from app.database import Base, generate_uuid
+
+description = "Normalized problem tags"
+
+def _decode(value):
+    # Giải mã lặp vì giá trị có thể bị mã hóa JSON nhiều lần
+    while isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return [value]
+    return value if isinstance(value, list) else []
+
+def upgrade(connection):
+    from app.services.tag_service import normalize_tags
+
+    inspector = inspect(connection)
+    for name in ("tags", "problem_tags"):
+        table = Base.metadata.tables[name]
+        if not inspector.has_table(name):
+            table.create(connection)
+
+    problems = Base.metadata.tables["problems"]
+    tags = Base.metadata.tables["tags"]
+    problem_tags = Base.metadata.tables["problem_tags"]
+
+    tag_ids = {row.name: row.id for row in connection.execute(select(tags.c.id, tags.c.name))}
+    for problem_id, raw in connection.execute(select(problems.c.id, problems.c.tags)).all():
+        names = normalize_tags(_decode(raw))
+        connection.execute(problems.update().where(problems.c.id == problem_id).values(tags=names))
+        for name in names:
+            if name not in tag_ids:
+                tag_ids[name] = generate_uuid()
+                connection.execute(tags.insert().values(id=tag_ids[name], name=name))
+        connection.execute(problem_tags.delete().where(problem_tags.c.problem_id == problem_id))
+        if names:
+            connection.execute(problem_tags.insert(), [
+                {"problem_id": problem_id, "tag_id": tag_ids[name]} for name in names
+            ])
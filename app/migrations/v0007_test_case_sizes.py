@@ -0,0 +1,19 @@
+from sqlalchemy import inspect, text
+
+description = "Byte sizes of test case data"
+
+def upgrade(connection):
+    columns = {c["name"] for c in inspect(connection).get_columns("test_cases")}
+    for name in ("input_size", "output_size"):
+        if name not in columns:
+            connection.execute(text(f"ALTER TABLE test_cases ADD COLUMN {name} INTEGER NOT NULL DEFAULT 0"))
+
+    # MySQL: LENGTH tính theo byte; SQLite cần ép sang BLOB để có số byte
+    if connection.dialect.name == "mysql":
+        size = "LENGTH({})"
+    else:
+        size = "LENGTH(CAST({} AS BLOB))"
+    connection.execute(text(
+        f"UPDATE test_cases SET input_size = {size.format('input')}, "
+        f"output_size = {size.format('expected_output')}"
+    ))
@@ -0,0 +1,13 @@
+from sqlalchemy import inspect, text
+
+from app.models.problems import ProblemImportJob
+
+description = "Content-addressed test data storage and problem import jobs"
+
+def upgrade(connection):
+    columns = {c["name"] for c in inspect(connection).get_columns("test_cases")}
+    for name in ("input_sha256", "output_sha256"):
+        if name not in columns:
+            connection.execute(text(f"ALTER TABLE test_cases ADD COLUMN {name} VARCHAR(64) NULL"))
+
+    ProblemImportJob.__table__.create(connection, checkfirst=True)
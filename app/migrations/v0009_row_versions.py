@@ -0,0 +1,16 @@
+from sqlalchemy import inspect, text
+
+description = "Row version columns for ETags"
+
+COLUMNS = (
+    ("problems", "version"),
+    ("contests", "version"),
+    ("contests", "standings_version"),
+    ("submissions", "version"),
+)
+
+def upgrade(connection):
+    inspector = inspect(connection)
+    for table, column in COLUMNS:
+        if column not in {c["name"] for c in inspector.get_columns(table)}:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER NOT NULL DEFAULT 1"))
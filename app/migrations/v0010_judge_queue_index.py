@@ -0,0 +1,6 @@
+from app.migrations import create_declared_index
+
+description = "Index for the pending submission queue"
+
+def upgrade(connection):
+    create_declared_index(connection, "submissions", "ix_submissions_status_submitted_at")
@@ -0,0 +1,6 @@
+from app.models.emails import EmailMessage
+
+description = "Email outbox for the background dispatcher"
+
+def upgrade(connection):
+    EmailMessage.__table__.create(connection, checkfirst=True)
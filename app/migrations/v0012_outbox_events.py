@@ -0,0 +1,6 @@
+from app.models.events import OutboxEvent
+
+description = "Transactional outbox for domain events"
+
+def upgrade(connection):
+    OutboxEvent.__table__.create(connection, checkfirst=True)
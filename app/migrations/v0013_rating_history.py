@@ -0,0 +1,12 @@
+from sqlalchemy import inspect, text
+
+from app.models.contests import RatingHistory
+
+description = "Contest rating history and rated_at marker"
+
+def upgrade(connection):
+    columns = {c["name"] for c in inspect(connection).get_columns("contests")}
+    if "rated_at" not in columns:
+        connection.execute(text("ALTER TABLE contests ADD COLUMN rated_at DATETIME NULL"))
+
+    RatingHistory.__table__.create(connection, checkfirst=True)
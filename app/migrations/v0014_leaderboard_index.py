@@ -0,0 +1,6 @@
+from app.migrations import create_declared_index
+
+description = "Index for the rating leaderboard"
+
+def upgrade(connection):
+    create_declared_index(connection, "users", "ix_users_rating_id")
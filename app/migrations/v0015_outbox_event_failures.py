@@ -0,0 +1,14 @@
+from sqlalchemy import inspect, text
+
+description = "Per-handler progress and failed status for outbox events"
+
+def upgrade(connection):
+    columns = {c["name"] for c in inspect(connection).get_columns("outbox_events")}
+    if "completed_handlers" not in columns:
+        connection.execute(text("ALTER TABLE outbox_events ADD COLUMN completed_handlers JSON NULL"))
+
+    if connection.dialect.name == "mysql":
+        connection.execute(text(
+            "ALTER TABLE outbox_events MODIFY status "
+            "ENUM('pending','relaying','delivered','failed') NOT NULL"
+        ))
@@ -0,0 +1,8 @@
+from sqlalchemy import inspect, text
+
+description = "Expiring claim for contest rating jobs"
+
+def upgrade(connection):
+    columns = {c["name"] for c in inspect(connection).get_columns("contests")}
+    if "rating_claimed_at" not in columns:
+        connection.execute(text("ALTER TABLE contests ADD COLUMN rating_claimed_at DATETIME NULL"))
@@ -1,4 +1,9 @@
 from app.models.users import User
-from app.models.problems import Problem, TestCase, DifficultyEnum
-from app.models.contests import Contest, ContestProblem, ContestParticipant
-from app.models.submissions import Submission, LanguageEnum, StatusEnum
\ No newline at end of file
+from app.models.problems import (
+    Problem, TestCase, Tag, ProblemTag, ProblemImportJob, DifficultyEnum, ImportStatusEnum
+)
+from app.models.contests import Contest, ContestProblem, ContestParticipant, RatingHistory
+from app.models.submissions import Submission, UserProblemStatus, LanguageEnum, StatusEnum
+from app.models.search import SearchTerm
+from app.models.emails import EmailMessage, EmailStatusEnum
+from app.models.events import OutboxEvent, EventStatusEnum
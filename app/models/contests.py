@@ -1,31 +1,45 @@
-from sqlalchemy import Column, String, Boolean, Integer, DateTime, Text, ForeignKey, func
-from sqlalchemy.types import CHAR
+from sqlalchemy import Column, String, Boolean, Integer, DateTime, Text, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
-from app.database import Base, generate_uuid
+from app.database import Base, BinaryUUID, generate_uuid, version_column
 
 class Contest(Base):
     __tablename__ = "contests"
     
-    id = Column(CHAR(36), primary_key=True, default=generate_uuid)
+    id = Column(BinaryUUID(), primary_key=True, default=generate_uuid)
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=False)
     start_time = Column(DateTime, nullable=False)
     end_time = Column(DateTime, nullable=False)
-    created_by = Column(CHAR(36), ForeignKey("users.id"))
+    created_by = Column(BinaryUUID(), ForeignKey("users.id"))
     is_public = Column(Boolean, default=True)
     created_at = Column(DateTime, default=func.current_timestamp())
+    # Tăng khi cuộc thi, danh sách bài hoặc người tham gia thay đổi (ETag)
+    version = version_column()
+    # Tăng khi bảng xếp hạng thay đổi (đăng ký, điểm số)
+    standings_version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Thời điểm đã tính xong rating (NULL = chưa tính)
+    rated_at = Column(DateTime)
+    # Thời điểm một worker nhận việc tính rating, đặt có điều kiện để mỗi lúc
+    # chỉ một worker tính; nhận lại được sau RATING_CLAIM_TIMEOUT_SECONDS
+    rating_claimed_at = Column(DateTime)
     
     # Relationships
     creator = relationship("User", foreign_keys=[created_by])
     problems = relationship("ContestProblem", back_populates="contest", cascade="all, delete-orphan")
     participants = relationship("ContestParticipant", back_populates="contest", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Phân trang theo con trỏ (created_at, id)
+        Index("ix_contests_created_at_id", "created_at", "id"),
+        Index("ix_contests_is_public_created_at_id", "is_public", "created_at", "id"),
+    )
+
 class ContestProblem(Base):
     __tablename__ = "contest_problems"
     
-    id = Column(CHAR(36), primary_key=True, default=generate_uuid)
-    contest_id = Column(CHAR(36), ForeignKey("contests.id", ondelete="CASCADE"), nullable=False)
-    problem_id = Column(CHAR(36), ForeignKey("problems.id", ondelete="CASCADE"), nullable=False)
+    id = Column(BinaryUUID(), primary_key=True, default=generate_uuid)
+    contest_id = Column(BinaryUUID(), ForeignKey("contests.id", ondelete="CASCADE"), nullable=False)
+    problem_id = Column(BinaryUUID(), ForeignKey("problems.id", ondelete="CASCADE"), nullable=False)
     order = Column(Integer, nullable=False)
     points = Column(Integer, default=100)
     
@@ -33,15 +47,67 @@ class ContestProblem(Base):
     contest = relationship("Contest", back_populates="problems")
     problem = relationship("Problem")
 
+    # Các thuộc tính hiển thị cho trang cuộc thi
+    @property
+    def problem_title(self):
+        return self.problem.title if self.problem else None
+
+    @property
+    def problem_difficulty(self):
+        return self.problem.difficulty.value if self.problem else None
+
+    __table_args__ = (
+        Index("ix_contest_problems_contest_problem", "contest_id", "problem_id"),
+    )
+
 class ContestParticipant(Base):
     __tablename__ = "contest_participants"
     
-    id = Column(CHAR(36), primary_key=True, default=generate_uuid)
-    contest_id = Column(CHAR(36), ForeignKey("contests.id", ondelete="CASCADE"), nullable=False)
-    user_id = Column(CHAR(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    id = Column(BinaryUUID(), primary_key=True, default=generate_uuid)
+    contest_id = Column(BinaryUUID(), ForeignKey("contests.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(BinaryUUID(), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     joined_at = Column(DateTime, default=func.current_timestamp())
     score = Column(Integer, default=0)
     
     # Relationships
     contest = relationship("Contest", back_populates="participants")
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+    # Các thuộc tính hiển thị cho bảng xếp hạng
+    @property
+    def username(self):
+        return self.user.username if self.user else None
+
+    @property
+    def full_name(self):
+        return self.user.full_name if self.user else None
+
+    __table_args__ = (
+        Index("ix_contest_participants_contest_user", "contest_id", "user_id"),
+        # Bảng xếp hạng: người tham gia của cuộc thi theo điểm
+        Index("ix_contest_participants_contest_score", "contest_id", "score"),
+    )
+
+class RatingHistory(Base):
+    """Rating của người dùng trước và sau mỗi cuộc thi đã tính rating (đồ thị trang cá nhân)"""
+    __tablename__ = "rating_history"
+    
+    id = Column(BinaryUUID(), primary_key=True, default=generate_uuid)
+    user_id = Column(BinaryUUID(), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    contest_id = Column(BinaryUUID(), ForeignKey("contests.id", ondelete="CASCADE"), nullable=False)
+    rank = Column(Integer, nullable=False)
+    old_rating = Column(Integer, nullable=False)
+    new_rating = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=func.current_timestamp())
+
+    contest = relationship("Contest")
+
+    @property
+    def contest_title(self):
+        return self.contest.title if self.contest else None
+
+    __table_args__ = (
+        # Lịch sử rating của một người dùng theo thời gian
+        Index("ix_rating_history_user_created_at", "user_id", "created_at"),
+        Index("ix_rating_history_contest", "contest_id"),
+    )
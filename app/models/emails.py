@@ -0,0 +1,42 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, Enum, Index, func
+from sqlalchemy.types import JSON
+from app.database import Base, BinaryUUID, generate_uuid
+import enum
+
+class EmailStatusEnum(enum.Enum):
+    pending = "pending"
+    sending = "sending"
+    sent = "sent"
+    failed = "failed"
+
+class EmailMessage(Base):
+    """
+    Email chờ gửi (outbox). Nội dung được dựng từ template và context lúc gửi;
+    email_dispatcher nhận từng batch, gửi và thử lại khi lỗi tạm thời.
+    """
+    __tablename__ = "email_outbox"
+    
+    id = Column(BinaryUUID(), primary_key=True, default=generate_uuid)
+    to_email = Column(String(100), nullable=False)
+    template = Column(String(50), nullable=False)
+    context = Column(JSON, nullable=False)
+    # Người nhận và đối tượng liên quan (ví dụ cuộc thi), dùng để tránh gửi trùng
+    user_id = Column(BinaryUUID(), ForeignKey("users.id", ondelete="SET NULL"))
+    reference_id = Column(BinaryUUID())
+    status = Column(Enum(EmailStatusEnum), nullable=False, default=EmailStatusEnum.pending)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=func.current_timestamp())
+    # Worker đang gửi (claim_token) và thời điểm nhận, để nhận lại khi worker chết
+    claim_token = Column(BinaryUUID())
+    claimed_at = Column(DateTime)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=func.current_timestamp())
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        # Hàng đợi của dispatcher
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+        Index("ix_email_outbox_claim_token", "claim_token"),
+        # Kiểm tra đã gửi lời mời cho (cuộc thi, người dùng) chưa
+        Index("ix_email_outbox_template_reference_user", "template", "reference_id", "user_id"),
+    )
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text, Enum, Index, func
+from sqlalchemy.types import JSON
+from app.database import Base, BinaryUUID, generate_uuid
+import enum
+
+class EventStatusEnum(enum.Enum):
+    pending = "pending"
+    relaying = "relaying"
+    delivered = "delivered"
+    failed = "failed"
+
+class OutboxEvent(Base):
+    """
+    Sự kiện miền (bài nộp đã chấm, đăng ký...) được ghi trong cùng transaction
+    với thay đổi trạng thái; event_relay chuyển tiếp cho subscriber trong
+    process và transport bên ngoài. id là UUIDv7 nên thứ tự id là thứ tự ghi.
+    """
+    __tablename__ = "outbox_events"
+    
+    id = Column(BinaryUUID(), primary_key=True, default=generate_uuid)
+    topic = Column(String(64), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(Enum(EventStatusEnum), nullable=False, default=EventStatusEnum.pending)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=func.current_timestamp())
+    claim_token = Column(BinaryUUID())
+    claimed_at = Column(DateTime)
+    last_error = Column(Text)
+    # Subscriber đã chạy xong (được commit), không chạy lại khi sự kiện được thử lại
+    completed_handlers = Column(JSON)
+    created_at = Column(DateTime, default=func.current_timestamp())
+    delivered_at = Column(DateTime)
+
+    __table_args__ = (
+        # Hàng đợi của relay
+        Index("ix_outbox_events_status_next_attempt", "status", "next_attempt_at"),
+        Index("ix_outbox_events_claim_token", "claim_token"),
+    )
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, String, Boolean, Integer, DateTime, Text, ForeignKey, Enum, func
-from sqlalchemy.types import CHAR, JSON
-from sqlalchemy.orm import relationship
-from app.database import Base, generate_uuid
+from sqlalchemy import Column, String, Boolean, Integer, DateTime, Text, ForeignKey, Enum, Index, func
+from sqlalchemy.types import JSON
+from sqlalchemy.orm import relationship, deferred
+from app.database import Base, BinaryUUID, generate_uuid, version_column
 import enum
 
 class DifficultyEnum(enum.Enum):
@@ -9,36 +9,108 @@ class DifficultyEnum(enum.Enum):
     medium = "medium"
     hard = "hard"
 
+class ImportStatusEnum(enum.Enum):
+    pending = "pending"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
 class Problem(Base):
     __tablename__ = "problems"
     
-    id = Column(CHAR(36), primary_key=True, default=generate_uuid)
+    id = Column(BinaryUUID(), primary_key=True, default=generate_uuid)
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=False)
     difficulty = Column(Enum(DifficultyEnum), nullable=False)
-    tags = Column(JSON, default='[]')
+    # Danh sách tên tag (bản sao để trả về API), dữ liệu chuẩn nằm ở problem_tags
+    tags = Column(JSON, default=list)
     example_input = Column(Text, nullable=False)
     example_output = Column(Text, nullable=False)
     constraints = Column(Text, nullable=False)
     created_at = Column(DateTime, default=func.current_timestamp())
-    created_by = Column(CHAR(36), ForeignKey("users.id"))
+    created_by = Column(BinaryUUID(), ForeignKey("users.id"))
     is_public = Column(Boolean, default=True)
     time_limit_ms = Column(Integer, default=1000)
     memory_limit_kb = Column(Integer, default=262144)
+    # Số người đã giải / đã thử, được cập nhật khi chấm bài
+    solved_count = Column(Integer, nullable=False, default=0, server_default="0")
+    attempted_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Tăng mỗi khi bài toán hoặc test mẫu thay đổi (ETag, khóa cache)
+    version = version_column()
     
     # Relationships
     creator = relationship("User", foreign_keys=[created_by])
     test_cases = relationship("TestCase", back_populates="problem", cascade="all, delete-orphan")
+    # Chỉ các test mẫu, dùng cho trang đề bài
+    sample_test_cases = relationship(
+        "TestCase",
+        primaryjoin="and_(Problem.id == TestCase.problem_id, TestCase.is_sample == True)",
+        order_by="TestCase.order",
+        viewonly=True
+    )
+    tag_links = relationship("ProblemTag", back_populates="problem", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Phân trang theo con trỏ (created_at, id)
+        Index("ix_problems_created_at_id", "created_at", "id"),
+        Index("ix_problems_is_public_created_at_id", "is_public", "created_at", "id"),
+    )
 
 class TestCase(Base):
     __tablename__ = "test_cases"
     
-    id = Column(CHAR(36), primary_key=True, default=generate_uuid)
-    problem_id = Column(CHAR(36), ForeignKey("problems.id", ondelete="CASCADE"), nullable=False)
-    input = Column(Text, nullable=False)
-    expected_output = Column(Text, nullable=False)
+    id = Column(BinaryUUID(), primary_key=True, default=generate_uuid)
+    problem_id = Column(BinaryUUID(), ForeignKey("problems.id", ondelete="CASCADE"), nullable=False)
+    # Dữ liệu test có thể rất lớn nên chỉ được tải khi cần
+    input = deferred(Column(Text, nullable=False))
+    expected_output = deferred(Column(Text, nullable=False))
     is_sample = Column(Boolean, default=False)
     order = Column(Integer, nullable=False)
+    # Kích thước dữ liệu (byte, UTF-8)
+    input_size = Column(Integer, nullable=False, default=0, server_default="0")
+    output_size = Column(Integer, nullable=False, default=0, server_default="0")
+    # Dữ liệu lớn được lưu ngoài database theo sha256; khi đó cột input/expected_output để trống
+    input_sha256 = Column(String(64))
+    output_sha256 = Column(String(64))
     
     # Relationships
-    problem = relationship("Problem", back_populates="test_cases")
\ No newline at end of file
+    problem = relationship("Problem", back_populates="test_cases")
+
+    __table_args__ = (
+        Index("ix_test_cases_problem_order", "problem_id", "order"),
+    )
+
+class Tag(Base):
+    __tablename__ = "tags"
+    
+    id = Column(BinaryUUID(), primary_key=True, default=generate_uuid)
+    name = Column(String(50), unique=True, nullable=False)
+
+class ProblemTag(Base):
+    __tablename__ = "problem_tags"
+    
+    problem_id = Column(BinaryUUID(), ForeignKey("problems.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = Column(BinaryUUID(), ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    
+    # Relationships
+    problem = relationship("Problem", back_populates="tag_links")
+    tag = relationship("Tag")
+
+    __table_args__ = (
+        # Lọc bài toán theo tag
+        Index("ix_problem_tags_tag_problem", "tag_id", "problem_id"),
+    )
+
+class ProblemImportJob(Base):
+    """Tiến trình nhập bài toán từ gói zip"""
+    __tablename__ = "problem_import_jobs"
+    
+    id = Column(BinaryUUID(), primary_key=True, default=generate_uuid)
+    created_by = Column(BinaryUUID(), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = Column(Enum(ImportStatusEnum), nullable=False, default=ImportStatusEnum.pending)
+    total_tests = Column(Integer, nullable=False, default=0)
+    processed_tests = Column(Integer, nullable=False, default=0)
+    problem_id = Column(BinaryUUID(), ForeignKey("problems.id", ondelete="SET NULL"))
+    error = Column(Text)
+    created_at = Column(DateTime, default=func.current_timestamp())
+    finished_at = Column(DateTime)
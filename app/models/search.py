@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Integer, Index
+from app.database import Base, BinaryUUID
+
+class SearchTerm(Base):
+    """
+    Chỉ mục ngược cho tìm kiếm: mỗi dòng là một từ (đã chuẩn hóa) xuất hiện
+    trong một tài liệu (bài toán/cuộc thi) cùng trọng số của nó.
+
+    Khóa chính bắt đầu bằng (doc_type, term) nên tra cứu theo từ hoặc tiền tố
+    là một range scan trên clustered index.
+    """
+    __tablename__ = "search_terms"
+    
+    doc_type = Column(String(16), primary_key=True)
+    term = Column(String(64), primary_key=True)
+    doc_id = Column(BinaryUUID(), primary_key=True)
+    weight = Column(Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        # Xóa/cập nhật toàn bộ từ của một tài liệu
+        Index("ix_search_terms_doc", "doc_type", "doc_id"),
+    )
@@ -1,7 +1,6 @@
-from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, Enum, func
-from sqlalchemy.types import CHAR
-from sqlalchemy.orm import relationship
-from app.database import Base, generate_uuid
+from sqlalchemy import Column, String, Boolean, Integer, DateTime, Text, ForeignKey, Enum, Index, UniqueConstraint, func
+from sqlalchemy.orm import relationship, deferred
+from app.database import Base, BinaryUUID, generate_uuid, version_column
 import enum
 
 class LanguageEnum(enum.Enum):
@@ -22,18 +21,67 @@ class StatusEnum(enum.Enum):
 class Submission(Base):
     __tablename__ = "submissions"
     
-    id = Column(CHAR(36), primary_key=True, default=generate_uuid)
-    user_id = Column(CHAR(36), ForeignKey("users.id"), nullable=False)
-    problem_id = Column(CHAR(36), ForeignKey("problems.id"), nullable=False)
-    code = Column(Text, nullable=False)
+    id = Column(BinaryUUID(), primary_key=True, default=generate_uuid)
+    user_id = Column(BinaryUUID(), ForeignKey("users.id"), nullable=False)
+    problem_id = Column(BinaryUUID(), ForeignKey("problems.id"), nullable=False)
+    # Mã nguồn chỉ được tải khi cần (trang chi tiết), danh sách không đọc cột này
+    code = deferred(Column(Text, nullable=False))
     language = Column(Enum(LanguageEnum), nullable=False)
     status = Column(Enum(StatusEnum), default=StatusEnum.pending)
     execution_time_ms = Column(Integer)
     memory_used_kb = Column(Integer)
     submitted_at = Column(DateTime, default=func.current_timestamp())
-    contest_id = Column(CHAR(36), ForeignKey("contests.id"))
+    contest_id = Column(BinaryUUID(), ForeignKey("contests.id"))
+    version = version_column()
     
     # Relationships
     user = relationship("User")
     problem = relationship("Problem")
-    contest = relationship("Contest")
\ No newline at end of file
+    contest = relationship("Contest")
+
+    # Các thuộc tính hiển thị cho trang chi tiết bài nộp
+    @property
+    def problem_title(self):
+        return self.problem.title if self.problem else None
+
+    @property
+    def username(self):
+        return self.user.username if self.user else None
+
+    @property
+    def contest_title(self):
+        return self.contest.title if self.contest else None
+
+    __table_args__ = (
+        # Phân trang theo con trỏ (submitted_at, id)
+        Index("ix_submissions_submitted_at_id", "submitted_at", "id"),
+        Index("ix_submissions_user_submitted_at_id", "user_id", "submitted_at", "id"),
+        # Bộ lọc thường dùng: bài nộp của user cho một bài toán, thống kê theo cuộc thi
+        Index("ix_submissions_user_problem_status", "user_id", "problem_id", "status"),
+        Index("ix_submissions_contest_status", "contest_id", "status"),
+        # Hàng đợi chấm bài: bài đang chờ theo thứ tự nộp
+        Index("ix_submissions_status_submitted_at", "status", "submitted_at"),
+    )
+
+class UserProblemStatus(Base):
+    """Trạng thái giải bài của từng người dùng, được cập nhật khi chấm bài"""
+    __tablename__ = "user_problem_status"
+    
+    id = Column(BinaryUUID(), primary_key=True, default=generate_uuid)
+    user_id = Column(BinaryUUID(), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    problem_id = Column(BinaryUUID(), ForeignKey("problems.id", ondelete="CASCADE"), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    solved = Column(Boolean, nullable=False, default=False)
+    first_accepted_at = Column(DateTime)
+    best_submission_id = Column(BinaryUUID(), ForeignKey("submissions.id", ondelete="SET NULL"))
+    best_execution_time_ms = Column(Integer)
+    last_submitted_at = Column(DateTime)
+    
+    # Relationships
+    user = relationship("User")
+    problem = relationship("Problem")
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "problem_id", name="uq_user_problem_status_user_problem"),
+        Index("ix_user_problem_status_user_solved", "user_id", "solved"),
+    )
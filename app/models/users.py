@@ -1,12 +1,11 @@
-from sqlalchemy import Column, String, Boolean, Integer, DateTime, Text, func
-from sqlalchemy.types import CHAR
-from app.database import Base, generate_uuid
+from sqlalchemy import Column, String, Boolean, Integer, DateTime, Text, Index, func
+from app.database import Base, BinaryUUID, generate_uuid
 from datetime import datetime
 
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(CHAR(36), primary_key=True, default=generate_uuid)
+    id = Column(BinaryUUID(), primary_key=True, default=generate_uuid)
     username = Column(String(50), unique=True, nullable=False)
     email = Column(String(100), unique=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
@@ -15,4 +14,11 @@ class User(Base):
     created_at = Column(DateTime, default=func.current_timestamp())
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
-    rating = Column(Integer, default=0)
\ No newline at end of file
+    rating = Column(Integer, default=0)
+
+    __table_args__ = (
+        # Phân trang theo con trỏ (created_at, id)
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # Bảng xếp hạng theo rating (rating, id)
+        Index("ix_users_rating_id", "rating", "id"),
+    )
\ No newline at end of file
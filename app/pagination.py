@@ -0,0 +1,132 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import DateTime, Float, Integer, Numeric, and_, literal, or_
+
+# Header trả về con trỏ của trang kế tiếp cho client
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def _encode_value(value: Any):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+def _value_type(column) -> type:
+    """Kiểu Python của giá trị con trỏ ứng với một cột của keyset"""
+    if isinstance(column.type, DateTime):
+        return datetime
+    if isinstance(column.type, Integer):
+        return int
+    if isinstance(column.type, (Float, Numeric)):
+        return float
+    return str
+
+def _decode_value(value: Any, expected: type):
+    """Giá trị con trỏ đã giải mã; ValueError nếu không đúng kiểu của cột"""
+    if value is None:
+        return None
+    if expected is datetime:
+        if not isinstance(value, dict) or not isinstance(value.get("dt"), str):
+            raise ValueError("expected a datetime")
+        return datetime.fromisoformat(value["dt"])
+    if expected is float and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if type(value) is not expected:
+        raise ValueError(f"expected {expected.__name__}")
+    return value
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Mã hóa giá trị khóa sắp xếp thành con trỏ dạng chuỗi (opaque)"""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """
+    Giải mã con trỏ theo kiểu của từng cột, báo lỗi 400 nếu con trỏ không
+    hợp lệ (kể cả con trỏ đúng định dạng nhưng sai số phần tử hoặc sai kiểu)
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("cursor size mismatch")
+        return [_decode_value(value, expected) for value, expected in zip(values, types)]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def _bounds(value: Any):
+    """
+    Cận dưới và cận trên (bao gồm) của các giá trị được lưu bằng giá trị con
+    trỏ. SQLite lưu CURRENT_TIMESTAMP dạng 'YYYY-MM-DD HH:MM:SS' còn giá trị
+    ghi từ Python có dạng '... HH:MM:SS.000000'; hai chuỗi này liền nhau theo
+    thứ tự chuỗi nên so sánh theo khoảng đúng với cả hai (MySQL tự chuyển
+    chuỗi sang DATETIME).
+    """
+    if isinstance(value, datetime) and value.microsecond == 0:
+        return literal(value.strftime("%Y-%m-%d %H:%M:%S")), value
+    return value, value
+
+class Keyset:
+    """
+    Phân trang theo khóa (keyset/cursor) trên một bộ cột có thứ tự cố định.
+
+    Cột cuối cùng phải là khóa duy nhất (thường là id) để thứ tự luôn xác định.
+    Mỗi trang chỉ cần một lần seek trên index tương ứng, nên chi phí trang N
+    bằng chi phí trang đầu tiên.
+    """
+
+    def __init__(self, *columns, descending: bool = False):
+        self.columns = columns
+        self.descending = descending
+
+    def order_by(self, query):
+        """Sắp xếp query theo các cột của keyset"""
+        if self.descending:
+            return query.order_by(*[column.desc() for column in self.columns])
+        return query.order_by(*[column.asc() for column in self.columns])
+
+    def seek(self, query, cursor: str):
+        """Lọc các dòng nằm sau con trỏ (không bao gồm dòng của con trỏ)"""
+        values = decode_cursor(cursor, [_value_type(column) for column in self.columns])
+        bounds = [_bounds(value) for value in values]
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        # Viết dạng mở rộng để MySQL dùng được range scan trên index
+        clauses = []
+        for i, column in enumerate(self.columns):
+            equal = [self.columns[j].between(*bounds[j]) for j in range(i)]
+            low, high = bounds[i]
+            after = column < low if self.descending else column > high
+            clauses.append(and_(*equal, after))
+        return query.filter(or_(*clauses))
+
+    def paginate(self, query, skip: int, limit: int, cursor: Optional[str] = None):
+        """
+        Áp dụng thứ tự và phân trang cho query.
+
+        Có con trỏ thì dùng keyset, không thì giữ chế độ offset để tương thích.
+        """
+        query = self.order_by(query)
+        if cursor:
+            query = self.seek(query, cursor)
+        elif skip:
+            query = query.offset(skip)
+        return query.limit(limit)
+
+    def next_cursor(self, items: Sequence[Any], limit: int) -> Optional[str]:
+        """Tạo con trỏ cho trang kế tiếp từ dòng cuối cùng của trang hiện tại"""
+        if not items or len(items) < limit:
+            return None
+        last = items[-1]
+        return encode_cursor([getattr(last, column.key) for column in self.columns])
+
+    def set_next_cursor(self, response: Response, items: Sequence[Any], limit: int):
+        """Gắn con trỏ trang kế tiếp vào header của response"""
+        cursor = self.next_cursor(items, limit)
+        if cursor:
+            response.headers[NEXT_CURSOR_HEADER] = cursor
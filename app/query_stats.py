@@ -0,0 +1,61 @@
+"""
+Thống kê câu SQL theo từng request: số câu, tổng thời gian, câu chậm nhất
+và số lần lặp lại của mỗi câu (phát hiện N+1 do lazy load).
+
+Hook gắn vào mọi Engine (kể cả engine async); thống kê nằm trong một
+ContextVar do QueryStatsMiddleware đặt cho mỗi request. Các endpoint def chạy
+trong threadpool vẫn thấy cùng đối tượng vì context được sao chép sang thread.
+Câu SQL ngoài request (thread chấm bài, migration) không được ghi.
+"""
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+class QueryStats:
+    __slots__ = ("count", "total", "slowest", "slowest_statement", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+        self.statements = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.total += duration
+        self.statements[statement] += 1
+        if duration > self.slowest:
+            self.slowest = duration
+            self.slowest_statement = statement
+
+    def repeated(self, threshold: int):
+        """Các câu SQL chạy nhiều hơn threshold lần trong request"""
+        return [(statement, count) for statement, count in self.statements.most_common() if count > threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total * 1000:.1f};desc="{self.count} queries", db-max;dur={self.slowest * 1000:.1f}'
+
+current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current.get()
+    if stats is not None and conn.info.get("query_start"):
+        stats.record(statement, time.perf_counter() - conn.info["query_start"].pop())
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # Câu lỗi không chạy tới after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
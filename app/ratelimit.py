@@ -0,0 +1,176 @@
+"""
+Giới hạn tần suất request theo thuật toán token bucket.
+
+Mỗi giới hạn có dạng "N/đơn vị" (ví dụ "10/minute"): bucket chứa tối đa N
+token, được nạp lại đều N token mỗi đơn vị thời gian, mỗi request tiêu một
+token. Hết token thì trả 429 kèm Retry-After.
+
+Trạng thái bucket lưu trong bộ nhớ (mỗi worker một bản) hoặc trong một file
+SQLite dùng chung cho các worker trên cùng máy (RATE_LIMIT_BACKEND=sqlite).
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+
+from app.auth.oauth2 import Principal, get_current_active_user
+from app.config import settings
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+def parse_limit(spec: Optional[str]) -> Optional[Tuple[int, float]]:
+    """"10/minute" -> (dung lượng, số token nạp mỗi giây); chuỗi rỗng = không giới hạn"""
+    if not spec:
+        return None
+    count, _, period = spec.partition("/")
+    if period not in PERIODS or not count.strip().isdigit() or int(count) <= 0:
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+    return int(count), int(count) / PERIODS[period]
+
+class MemoryStore:
+    """
+    Bucket trong bộ nhớ của process. Bucket đã nạp đầy lại tương đương với
+    chưa có nên được xóa định kỳ; số bucket còn bị chặn ở MAX_BUCKETS (bỏ
+    bucket lâu không dùng nhất) để nhiều địa chỉ IP khác nhau không làm
+    phình bộ nhớ.
+    """
+
+    # Xóa các bucket đã đầy sau mỗi bao nhiêu lần gọi
+    PRUNE_EVERY = 10000
+    MAX_BUCKETS = 100000
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def _prune(self, now: float):
+        self._buckets = OrderedDict(
+            (key, bucket) for key, bucket in self._buckets.items()
+            if bucket[0] + (now - bucket[1]) * bucket[3] < bucket[2]
+        )
+
+    def take(self, key: str, capacity: int, rate: float) -> float:
+        """Lấy một token; trả 0 nếu được phép, ngược lại số giây cần chờ"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _, _ = self._buckets.pop(key, (capacity, now, capacity, rate))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now, capacity, rate)
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY == 0:
+                self._prune(now)
+            while len(self._buckets) > self.MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+            return wait
+
+class SQLiteStore:
+    """
+    Bucket trong file SQLite, dùng chung giữa các worker uvicorn trên một máy.
+    Mỗi lần lấy token là một transaction BEGIN IMMEDIATE nên không bị tranh chấp.
+    """
+
+    # Xóa các bucket không dùng sau mỗi bao nhiêu lần gọi
+    PRUNE_EVERY = 10000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def take(self, key: str, capacity: int, rate: float) -> float:
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            connection.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now)
+            )
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY == 0:
+                connection.execute("DELETE FROM buckets WHERE updated < ?", (now - PERIODS["day"],))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return wait
+
+def create_store(name: str):
+    if name == "memory":
+        return MemoryStore()
+    if name == "sqlite":
+        return SQLiteStore(settings.RATE_LIMIT_SQLITE_PATH)
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+store = create_store(settings.RATE_LIMIT_BACKEND)
+
+def too_many_requests(retry_after: float, detail: str = "Too many requests") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+def check(name: str, key: str, spec: Optional[str]):
+    """Tiêu một token của bucket (name, key); hết token thì raise 429"""
+    limit = parse_limit(spec)
+    if limit is None:
+        return
+    wait = store.take(f"{name}:{key}", *limit)
+    if wait > 0:
+        raise too_many_requests(wait)
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+def limit_by_ip(name: str, setting: str):
+    """
+    Dependency giới hạn theo địa chỉ IP, giới hạn lấy từ settings.<setting>
+    (đọc mỗi request để có thể đổi cấu hình khi chạy).
+    """
+    parse_limit(getattr(settings, setting))
+
+    def dependency(request: Request):
+        check(name, "ip:" + client_ip(request), getattr(settings, setting))
+    return dependency
+
+def limit_by_user(name: str, setting: str):
+    """Dependency giới hạn theo người dùng đăng nhập"""
+    parse_limit(getattr(settings, setting))
+
+    def dependency(current_user: Principal = Depends(get_current_active_user)):
+        check(name, "user:" + current_user.id, getattr(settings, setting))
+    return dependency
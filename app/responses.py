@@ -0,0 +1,20 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson là tùy chọn
+    orjson = None
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse mã hóa bằng orjson (nếu đã cài) cho các payload dựng sẵn,
+    ví dụ dict lấy từ cache. Endpoint trả về response_model không cần lớp
+    này: FastAPI đã mã hóa thẳng ra bytes bằng Pydantic.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
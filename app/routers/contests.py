@@ -1,26 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List, Optional
 from datetime import datetime
 
-from app.database import get_db
+from app import events
+from app.database import get_async_read_db, get_db, get_read_db
+from app.etag import bump_version, is_not_modified, make_etag, not_modified, set_etag
+from app.pagination import Keyset
 from app.models.contests import Contest, ContestProblem, ContestParticipant
 from app.models.problems import Problem
-from app.models.users import User
 from app.schemas.contests import (
     ContestCreate, ContestResponse, ContestUpdate, ContestDetailResponse,
     ContestProblemCreate, ContestProblemResponse, ContestProblemDetailResponse,
-    ContestParticipantCreate, ContestParticipantResponse, ContestParticipantDetailResponse
+    ContestParticipantCreate, ContestParticipantResponse, ContestParticipantDetailResponse,
+    ContestInvitationCreate, ContestInvitationResponse
 )
-from app.auth.oauth2 import get_current_active_user, get_current_admin_user
+from app.auth.oauth2 import Principal, get_current_active_user, get_current_active_user_async, get_current_admin_user
+from app.services import email_service, rating_service, search_service
 
 router = APIRouter(prefix="/api/contests", tags=["Contests"])
 
+# Thứ tự danh sách cuộc thi: theo thời gian tạo, id để phân định khi trùng thời gian
+CONTEST_KEYSET = Keyset(Contest.created_at, Contest.id)
+
 @router.post("/", response_model=ContestResponse, status_code=status.HTTP_201_CREATED)
 def create_contest(
     contest: ContestCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Tạo cuộc thi mới
@@ -66,29 +75,38 @@ def create_contest(
         )
         db.add(db_contest_problem)
     
+    # Thêm cuộc thi vào chỉ mục tìm kiếm
+    search_service.index_contest(db, db_contest)
+    
     db.commit()
     db.refresh(db_contest)
     return db_contest
 
 @router.get("/", response_model=List[ContestResponse])
 def get_contests(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     upcoming: Optional[bool] = None,
     ongoing: Optional[bool] = None,
     past: Optional[bool] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Lấy danh sách cuộc thi với bộ lọc
     """
     query = db.query(Contest)
     
-    # Tìm kiếm theo tiêu đề
+    # Tìm kiếm trên chỉ mục (tiêu đề, mô tả), không phân biệt dấu
+    ranked = None
     if search:
-        query = query.filter(Contest.title.contains(search))
+        ranked = search_service.search_subquery(search_service.CONTEST, search)
+        if ranked is None:
+            return []
+        query = query.join(ranked, ranked.c.doc_id == Contest.id)
     
     # Lọc theo trạng thái cuộc thi
     now = datetime.utcnow()
@@ -103,43 +121,66 @@ def get_contests(
     if not current_user.is_admin:
         query = query.filter(Contest.is_public == True)
     
-    # Phân trang và lấy kết quả
-    contests = query.offset(skip).limit(limit).all()
+    if ranked is not None:
+        # Kết quả tìm kiếm sắp theo độ liên quan, phân trang bằng offset
+        contests = query.order_by(ranked.c.score.desc(), Contest.id).offset(skip).limit(limit).all()
+    else:
+        # Phân trang theo con trỏ hoặc offset và lấy kết quả
+        contests = CONTEST_KEYSET.paginate(query, skip, limit, cursor).all()
+        CONTEST_KEYSET.set_next_cursor(response, contests, limit)
     return contests
 
 @router.get("/{contest_id}", response_model=ContestDetailResponse)
 def get_contest(
     contest_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Lấy thông tin chi tiết cuộc thi theo ID
     """
-    contest = db.query(Contest).filter(Contest.id == contest_id).first()
+    # Chỉ đọc phiên bản và thông tin quyền xem trước
+    meta = db.query(Contest.version, Contest.is_public, Contest.created_by).filter(
+        Contest.id == contest_id
+    ).first()
     
     # Kiểm tra cuộc thi tồn tại
-    if not contest:
+    if not meta:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contest not found"
         )
     
     # Kiểm tra quyền xem
-    if not contest.is_public and not current_user.is_admin and contest.created_by != current_user.id:
+    if not meta.is_public and not current_user.is_admin and meta.created_by != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view this contest"
         )
     
-    return contest
+    # Response kèm tên/độ khó của các bài toán: phiên bản của chúng cũng thuộc ETag
+    # (phiên bản chỉ tăng nên tổng đổi khi có bài bất kỳ đổi)
+    problems_version = db.query(func.count(Problem.id), func.coalesce(func.sum(Problem.version), 0)).join(
+        ContestProblem, ContestProblem.problem_id == Problem.id
+    ).filter(ContestProblem.contest_id == contest_id).one()
+    etag = make_etag("contest", contest_id, meta.version, *problems_version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    set_etag(response, etag)
+    return db.query(Contest).options(
+        selectinload(Contest.problems).joinedload(ContestProblem.problem),
+        selectinload(Contest.participants).joinedload(ContestParticipant.user)
+    ).filter(Contest.id == contest_id).first()
 
 @router.put("/{contest_id}", response_model=ContestResponse)
 def update_contest(
     contest_id: str,
     contest_update: ContestUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Cập nhật thông tin cuộc thi
@@ -160,10 +201,14 @@ def update_contest(
         )
     
     # Cập nhật thông tin
-    update_data = contest_update.dict(exclude_unset=True)
+    update_data = contest_update.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_contest, key, value)
     
+    # Cập nhật chỉ mục tìm kiếm khi nội dung được tìm kiếm thay đổi
+    if {"title", "description"} & update_data.keys():
+        search_service.index_contest(db, db_contest)
+    
     db.commit()
     db.refresh(db_contest)
     return db_contest
@@ -172,7 +217,7 @@ def update_contest(
 def delete_contest(
     contest_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """
     Xóa cuộc thi (yêu cầu quyền admin)
@@ -185,6 +230,7 @@ def delete_contest(
         )
     
     db.delete(db_contest)
+    search_service.remove_document(db, search_service.CONTEST, contest_id)
     db.commit()
     return None
 
@@ -194,7 +240,7 @@ def add_problem_to_contest(
     contest_id: str,
     problem: ContestProblemCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """
     Thêm bài toán vào cuộc thi
@@ -236,6 +282,7 @@ def add_problem_to_contest(
     )
     
     db.add(db_contest_problem)
+    bump_version(db, Contest, contest_id)
     db.commit()
     db.refresh(db_contest_problem)
     return db_contest_problem
@@ -245,7 +292,7 @@ def remove_problem_from_contest(
     contest_id: str,
     problem_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """
     Xóa bài toán khỏi cuộc thi
@@ -263,6 +310,7 @@ def remove_problem_from_contest(
         )
     
     db.delete(db_contest_problem)
+    bump_version(db, Contest, contest_id)
     db.commit()
     return None
 
@@ -271,7 +319,7 @@ def remove_problem_from_contest(
 def register_for_contest(
     contest_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Đăng ký tham gia cuộc thi
@@ -311,15 +359,66 @@ def register_for_contest(
     )
     
     db.add(db_participant)
+    bump_version(db, Contest, contest_id, Contest.standings_version)
+    events.publish(db, events.CONTEST_REGISTERED, {"contest_id": contest_id, "user_id": current_user.id})
     db.commit()
     db.refresh(db_participant)
     return db_participant
 
+@router.post(
+    "/{contest_id}/invitations", response_model=ContestInvitationResponse, status_code=status.HTTP_202_ACCEPTED
+)
+def invite_to_contest(
+    contest_id: str,
+    invitation: ContestInvitationCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin_user)
+):
+    """
+    Gửi lời mời tham gia cuộc thi cho mọi người tham gia hoặc mọi người dùng
+    
+    Lời mời được thêm vào outbox ở nền và gửi dần bởi dispatcher email;
+    người đã được mời cho cuộc thi này không nhận lại
+    """
+    db_contest = db.query(Contest.id).filter(Contest.id == contest_id).first()
+    if not db_contest:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Contest not found"
+        )
+    
+    recipients = db.execute(
+        select(func.count()).select_from(
+            email_service.invitation_recipients(contest_id, invitation.audience.value).subquery()
+        )
+    ).scalar()
+    background_tasks.add_task(email_service.queue_contest_invitations, contest_id, invitation.audience.value)
+    return {"contest_id": contest_id, "audience": invitation.audience, "recipients": recipients}
+
+@router.post("/{contest_id}/rating", status_code=status.HTTP_202_ACCEPTED)
+def rate_contest(
+    contest_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin_user)
+):
+    """
+    Tính rating cho người tham gia sau khi cuộc thi kết thúc (chạy nền)
+    
+    Mỗi cuộc thi chỉ được tính một lần; lần tính bị bỏ dở được yêu cầu lại
+    sau RATING_CLAIM_TIMEOUT_SECONDS. Kết quả xem qua
+    GET /api/users/{user_id}/rating-history
+    """
+    claimed_at = rating_service.claim_contest(db, contest_id)
+    background_tasks.add_task(rating_service.run_rating, contest_id, claimed_at)
+    return {"contest_id": contest_id, "status": "queued"}
+
 @router.get("/{contest_id}/participants", response_model=List[ContestParticipantDetailResponse])
 def get_contest_participants(
     contest_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Lấy danh sách người tham gia cuộc thi
@@ -333,7 +432,9 @@ def get_contest_participants(
         )
     
     # Lấy danh sách người tham gia
-    participants = db.query(ContestParticipant).filter(
+    participants = db.query(ContestParticipant).options(
+        joinedload(ContestParticipant.user)
+    ).filter(
         ContestParticipant.contest_id == contest_id
     ).all()
     
@@ -344,7 +445,7 @@ def remove_participant_from_contest(
     contest_id: str,
     user_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """
     Xóa người tham gia khỏi cuộc thi (yêu cầu quyền admin)
@@ -362,46 +463,63 @@ def remove_participant_from_contest(
         )
     
     db.delete(db_participant)
+    bump_version(db, Contest, contest_id, Contest.standings_version)
     db.commit()
     return None
 
 # API cho Contest Standings (bảng xếp hạng)
 @router.get("/{contest_id}/standings", response_model=List[ContestParticipantDetailResponse])
-def get_contest_standings(
+async def get_contest_standings(
     contest_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_active_user_async)
 ):
     """
     Lấy bảng xếp hạng của cuộc thi
     """
     # Kiểm tra cuộc thi tồn tại
-    db_contest = db.query(Contest).filter(Contest.id == contest_id).first()
-    if not db_contest:
+    standings_version = await db.scalar(
+        select(Contest.standings_version).where(Contest.id == contest_id)
+    )
+    if standings_version is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contest not found"
         )
     
+    # Bảng xếp hạng chưa đổi kể từ lần tải trước
+    etag = make_etag("standings", contest_id, standings_version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
     # Lấy danh sách người tham gia và sắp xếp theo điểm (giảm dần)
-    standings = db.query(ContestParticipant).filter(
-        ContestParticipant.contest_id == contest_id
-    ).order_by(ContestParticipant.score.desc()).all()
+    standings = await db.scalars(
+        select(ContestParticipant).options(
+            joinedload(ContestParticipant.user)
+        ).where(
+            ContestParticipant.contest_id == contest_id
+        ).order_by(ContestParticipant.score.desc())
+    )
     
-    return standings
+    return standings.all()
 
 # API cho xác nhận trạng thái cuộc thi
 @router.get("/{contest_id}/status", response_model=dict)
-def get_contest_status(
+async def get_contest_status(
     contest_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_active_user_async)
 ):
     """
     Kiểm tra trạng thái cuộc thi (sắp diễn ra, đang diễn ra, đã kết thúc)
     """
-    # Kiểm tra cuộc thi tồn tại
-    db_contest = db.query(Contest).filter(Contest.id == contest_id).first()
+    # Kiểm tra cuộc thi tồn tại (chỉ cần thời gian bắt đầu/kết thúc)
+    db_contest = (await db.execute(
+        select(Contest.start_time, Contest.end_time).where(Contest.id == contest_id)
+    )).first()
     if not db_contest:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -411,29 +529,31 @@ def get_contest_status(
     now = datetime.utcnow()
     
     if now < db_contest.start_time:
-        status = "upcoming"
+        contest_status = "upcoming"
         message = "Contest has not started yet"
     elif now >= db_contest.start_time and now <= db_contest.end_time:
-        status = "ongoing"
+        contest_status = "ongoing"
         message = "Contest is currently active"
     else:
-        status = "ended"
+        contest_status = "ended"
         message = "Contest has ended"
     
     # Kiểm tra người dùng đã đăng ký cuộc thi chưa
-    is_registered = db.query(ContestParticipant).filter(
-        ContestParticipant.contest_id == contest_id,
-        ContestParticipant.user_id == current_user.id
-    ).first() is not None
+    is_registered = await db.scalar(
+        select(ContestParticipant.id).where(
+            ContestParticipant.contest_id == contest_id,
+            ContestParticipant.user_id == current_user.id
+        ).limit(1)
+    ) is not None
     
     return {
         "contest_id": contest_id,
-        "status": status,
+        "status": contest_status,
         "message": message,
         "is_registered": is_registered,
         "start_time": db_contest.start_time,
         "end_time": db_contest.end_time,
-        "time_remaining": str(db_contest.end_time - now) if status == "ongoing" else None
+        "time_remaining": str(db_contest.end_time - now) if contest_status == "ongoing" else None
     }
 
 # API cho cập nhật điểm số người tham gia
@@ -443,7 +563,7 @@ def update_participant_score(
     user_id: str,
     score: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """
     Cập nhật điểm số cho người tham gia cuộc thi (yêu cầu quyền admin)
@@ -462,6 +582,7 @@ def update_participant_score(
     
     # Cập nhật điểm số
     db_participant.score = score
+    bump_version(db, Contest, contest_id, Contest.standings_version)
     db.commit()
     db.refresh(db_participant)
     return db_participant
\ No newline at end of file
@@ -1,25 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import (
+    APIRouter, BackgroundTasks, Depends, File, Form, Header, HTTPException, Query, Request,
+    UploadFile, status
+)
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload, undefer
 from typing import List, Optional
-import json
+import os
 
-from app.database import get_db, generate_uuid
-from app.models.problems import Problem, TestCase
-from app.models.users import User
+from app.database import get_async_read_db, get_db, get_read_db, generate_uuid
+from app.cache import response_cache
+from app.etag import bump_version, is_not_modified, make_etag, not_modified, set_etag
+from app.pagination import Keyset, NEXT_CURSOR_HEADER
+from app.responses import FastJSONResponse
+from app.streaming import iter_bytes, ranged_response
+from app.models.problems import Problem, TestCase, ProblemImportJob
 from app.schemas.problems import (
     DifficultyEnum,
     ProblemCreate, ProblemResponse, ProblemUpdate, ProblemDetailResponse,
-    TestCaseCreate, TestCaseResponse
+    ProblemFacetsResponse, ProblemImportJobResponse,
+    TestCaseCreate, TestCaseResponse, TestCaseSummaryResponse
+)
+from app.auth.oauth2 import Principal, get_current_active_user, get_current_active_user_async, get_current_admin_user
+from app.services.problem_stats_service import is_solved_async, solved_problem_ids
+from app.services import problem_cache_service, problem_import_service, search_service, tag_service
+from app.services.storage import (
+    FileTooLarge, SampleTooLarge, delete_unreferenced, stored_keys, test_case_fields, test_data_storage
 )
-from app.auth.oauth2 import get_current_active_user, get_current_admin_user
+from app.config import settings
 
 router = APIRouter(prefix="/api/problems", tags=["Problems"])
 
+# Thứ tự danh sách bài toán: theo thời gian tạo, id để phân định khi trùng thời gian
+PROBLEM_KEYSET = Keyset(Problem.created_at, Problem.id)
+
+# Các cột metadata của test case (không có dữ liệu input/output)
+TEST_CASE_SUMMARY_COLUMNS = (
+    TestCase.id,
+    TestCase.problem_id,
+    TestCase.is_sample,
+    TestCase.order,
+    TestCase.input_size,
+    TestCase.output_size,
+    TestCase.input_sha256,
+    TestCase.output_sha256,
+)
+
+def _data_size(text: str) -> int:
+    """Kích thước dữ liệu test tính theo byte UTF-8"""
+    return len(text.encode("utf-8"))
+
+def _can_view_all_tests(problem: Problem, user: Principal) -> bool:
+    """Chỉ admin hoặc người tạo bài toán được xem test ẩn"""
+    return user.is_admin or problem.created_by == user.id
+
 @router.post("/", response_model=ProblemDetailResponse, status_code=status.HTTP_201_CREATED)
 def create_problem(
     problem: ProblemCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Tạo bài toán mới
@@ -36,7 +75,6 @@ def create_problem(
         title=problem.title,
         description=problem.description,
         difficulty=problem.difficulty,
-        tags=json.dumps(problem.tags),
         example_input=problem.example_input,
         example_output=problem.example_output,
         constraints=problem.constraints,
@@ -57,11 +95,19 @@ def create_problem(
             input=test_case.input,
             expected_output=test_case.expected_output,
             is_sample=test_case.is_sample,
-            order=test_case.order
+            order=test_case.order,
+            input_size=_data_size(test_case.input),
+            output_size=_data_size(test_case.expected_output)
         )
         db.add(db_test_case)
     
+    # Gán tag và thêm bài toán vào chỉ mục tìm kiếm
+    tag_service.set_problem_tags(db, db_problem, problem.tags)
+    search_service.index_problem(db, db_problem)
+    
     db.commit()
+    tag_service.invalidate_facets()
+    problem_cache_service.invalidate_problem_list()
     db.refresh(db_problem)
     return db_problem
 
@@ -69,65 +115,179 @@ def create_problem(
 def get_problems(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     difficulty: Optional[DifficultyEnum] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    tags: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Lấy danh sách bài toán với bộ lọc
+    
+    Lọc theo nhiều tag: ?tags=graph&tags=dp hoặc ?tags=graph,dp (bài toán phải có đủ các tag)
     """
+    tags = tag_service.normalize_tags(name for value in tags or [] for name in value.split(","))
+    key = problem_cache_service.list_key(
+        current_user, skip=skip, limit=limit, cursor=cursor,
+        difficulty=difficulty.value if difficulty else None, search=search, tags=tags
+    )
+    page = response_cache.get_or_set(
+        problem_cache_service.PROBLEM_LIST, key,
+        lambda: _problem_list_page(db, current_user, skip, limit, cursor, difficulty, search, tags)
+    )
+    
+    # Đánh dấu các bài người dùng đã giải bằng một query trên bảng trạng thái
+    solved = solved_problem_ids(db, current_user.id, [item["id"] for item in page["items"]])
+    headers = {NEXT_CURSOR_HEADER: page["next_cursor"]} if page["next_cursor"] else None
+    return FastJSONResponse(
+        [problem_cache_service.with_solved(item, item["id"] in solved) for item in page["items"]],
+        headers=headers
+    )
+
+def _problem_list_page(db, current_user, skip, limit, cursor, difficulty, search, tags) -> dict:
+    """Một trang danh sách bài toán ở dạng JSON (chưa có is_solved) để cache"""
     query = db.query(Problem)
     
     # Lọc theo độ khó
     if difficulty:
         query = query.filter(Problem.difficulty == difficulty)
     
-    # Tìm kiếm theo tiêu đề
+    # Lọc theo tag (giao của các tag)
+    if tags:
+        query = tag_service.filter_by_tags(query, tags)
+    
+    # Tìm kiếm trên chỉ mục (tiêu đề, mô tả, tags), không phân biệt dấu
+    ranked = None
     if search:
-        query = query.filter(Problem.title.contains(search))
+        ranked = search_service.search_subquery(search_service.PROBLEM, search)
+        if ranked is None:
+            return {"items": [], "next_cursor": None}
+        query = query.join(ranked, ranked.c.doc_id == Problem.id)
     
     # Nếu không phải admin thì chỉ xem được bài public
     if not current_user.is_admin:
         query = query.filter(Problem.is_public == True)
     
-    # Phân trang và lấy kết quả
-    problems = query.offset(skip).limit(limit).all()
-    return problems
+    next_cursor = None
+    if ranked is not None:
+        # Kết quả tìm kiếm sắp theo độ liên quan, phân trang bằng offset
+        problems = query.order_by(ranked.c.score.desc(), Problem.id).offset(skip).limit(limit).all()
+    else:
+        # Phân trang theo con trỏ hoặc offset và lấy kết quả
+        problems = PROBLEM_KEYSET.paginate(query, skip, limit, cursor).all()
+        next_cursor = PROBLEM_KEYSET.next_cursor(problems, limit)
+    
+    return {
+        "items": [
+            ProblemResponse.model_validate(problem).model_dump(mode="json")
+            for problem in problems
+        ],
+        "next_cursor": next_cursor,
+    }
+
+@router.get("/facets", response_model=ProblemFacetsResponse)
+def get_problem_facets(
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Lấy số lượng bài toán theo từng tag và từng độ khó
+    """
+    return tag_service.get_facets(db, public_only=not current_user.is_admin)
+
+@router.post("/import", response_model=ProblemImportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def import_problem(
+    background_tasks: BackgroundTasks,
+    package: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin_user)
+):
+    """
+    Nhập bài toán từ gói zip (đề bài, giới hạn, các file test đánh số)
+    
+    Gói được xử lý nền; theo dõi tiến trình qua GET /api/problems/import/{job_id}
+    """
+    job = problem_import_service.create_job(db, package.file, current_user)
+    background_tasks.add_task(problem_import_service.run_import, job.id)
+    return job
+
+@router.get("/import/{job_id}", response_model=ProblemImportJobResponse)
+def get_import_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin_user)
+):
+    """
+    Xem tiến trình nhập bài toán
+    """
+    job = db.query(ProblemImportJob).filter(ProblemImportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Import job not found"
+        )
+    return job
 
 @router.get("/{problem_id}", response_model=ProblemDetailResponse)
-def get_problem(
+async def get_problem(
     problem_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_active_user_async)
 ):
     """
-    Lấy thông tin chi tiết bài toán theo ID
+    Lấy thông tin chi tiết bài toán theo ID (chỉ kèm các test mẫu)
     """
-    problem = db.query(Problem).filter(Problem.id == problem_id).first()
+    # Chỉ đọc phiên bản và thông tin quyền xem trước
+    meta = (await db.execute(
+        select(Problem.version, Problem.is_public, Problem.created_by).where(Problem.id == problem_id)
+    )).first()
     
     # Kiểm tra bài toán tồn tại
-    if not problem:
+    if not meta:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Problem not found"
         )
     
     # Kiểm tra quyền xem
-    if not problem.is_public and not current_user.is_admin and problem.created_by != current_user.id:
+    if not meta.is_public and not current_user.is_admin and meta.created_by != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view this problem"
         )
     
-    return problem
+    # Client đã có bản mới nhất: trả 304 mà không tải đề bài
+    solved = await is_solved_async(db, current_user.id, problem_id)
+    etag = make_etag("problem", problem_id, meta.version, solved)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    key = problem_cache_service.detail_key(problem_id, meta.version)
+    cached = await response_cache.aget(problem_cache_service.PROBLEM_DETAIL, key)
+    if cached is None:
+        problem = await db.scalar(
+            select(Problem).options(
+                selectinload(Problem.sample_test_cases).options(
+                    undefer(TestCase.input),
+                    undefer(TestCase.expected_output)
+                )
+            ).where(Problem.id == problem_id)
+        )
+        cached = ProblemDetailResponse.model_validate(problem).model_dump(mode="json")
+        await response_cache.aset(problem_cache_service.PROBLEM_DETAIL, key, cached)
+    
+    response = FastJSONResponse(problem_cache_service.with_solved(cached, solved))
+    set_etag(response, etag)
+    return response
 
 @router.put("/{problem_id}", response_model=ProblemDetailResponse)
 def update_problem(
     problem_id: str,
     problem_update: ProblemUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Cập nhật thông tin bài toán
@@ -148,14 +308,22 @@ def update_problem(
         )
     
     # Cập nhật thông tin
-    update_data = problem_update.dict(exclude_unset=True)
+    update_data = problem_update.model_dump(exclude_unset=True)
     if "tags" in update_data:
-        update_data["tags"] = json.dumps(update_data["tags"])
+        tag_service.set_problem_tags(db, db_problem, update_data.pop("tags") or [])
+        update_data["tags"] = db_problem.tags
     
     for key, value in update_data.items():
         setattr(db_problem, key, value)
     
+    # Cập nhật chỉ mục tìm kiếm khi nội dung được tìm kiếm thay đổi
+    if {"title", "description", "tags"} & update_data.keys():
+        search_service.index_problem(db, db_problem)
+    
     db.commit()
+    if {"tags", "difficulty", "is_public"} & update_data.keys():
+        tag_service.invalidate_facets()
+    problem_cache_service.invalidate_problem_list()
     db.refresh(db_problem)
     return db_problem
 
@@ -163,7 +331,7 @@ def update_problem(
 def delete_problem(
     problem_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """
     Xóa bài toán (yêu cầu quyền admin)
@@ -175,17 +343,33 @@ def delete_problem(
             detail="Problem not found"
         )
     
+    # Dữ liệu test trong kho được dọn sau khi xóa
+    keys = set()
+    for input_sha256, output_sha256 in db.query(TestCase.input_sha256, TestCase.output_sha256).filter(
+        TestCase.problem_id == problem_id
+    ):
+        keys.update((input_sha256, output_sha256))
+    
     db.delete(db_problem)
+    search_service.remove_document(db, search_service.PROBLEM, problem_id)
     db.commit()
+    delete_unreferenced(db, keys)
+    tag_service.invalidate_facets()
+    problem_cache_service.invalidate_problem_list()
     return None
 
 # API cho TestCase
+def _discard_stored(db: Session, stored):
+    """Bỏ các file vừa ghi khi test case không được lưu"""
+    test_data_storage.discard(*stored)
+    delete_unreferenced(db, stored_keys(*stored))
+
 @router.post("/{problem_id}/test-cases", response_model=TestCaseResponse)
 def create_test_case(
     problem_id: str,
     test_case: TestCaseCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Thêm test case cho bài toán
@@ -211,22 +395,111 @@ def create_test_case(
         input=test_case.input,
         expected_output=test_case.expected_output,
         is_sample=test_case.is_sample,
-        order=test_case.order
+        order=test_case.order,
+        input_size=_data_size(test_case.input),
+        output_size=_data_size(test_case.expected_output)
     )
     
     db.add(db_test_case)
+    # Test mẫu nằm trong trang đề bài: đổi phiên bản bài toán
+    if db_test_case.is_sample:
+        bump_version(db, Problem, problem_id)
     db.commit()
     db.refresh(db_test_case)
     return db_test_case
 
-@router.get("/{problem_id}/test-cases", response_model=List[TestCaseResponse])
+@router.post(
+    "/{problem_id}/test-cases/upload",
+    response_model=TestCaseSummaryResponse,
+    response_model_exclude={"input", "expected_output"},
+    status_code=status.HTTP_201_CREATED
+)
+def upload_test_case(
+    problem_id: str,
+    input_file: UploadFile = File(...),
+    output_file: UploadFile = File(...),
+    order: int = Form(...),
+    is_sample: bool = Form(False),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Thêm test case bằng cách upload file (multipart)
+    
+    Dữ liệu được ghi vào kho theo từng khối và băm sha256 trong lúc ghi,
+    không đi qua JSON/Pydantic.
+    """
+    # Lấy thông tin bài toán
+    db_problem = db.query(Problem).filter(Problem.id == problem_id).first()
+    if not db_problem:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Problem not found"
+        )
+    
+    # Kiểm tra quyền (phải là admin hoặc người tạo bài toán)
+    if not _can_view_all_tests(db_problem, current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to add test cases to this problem"
+        )
+    
+    stored = []
+    try:
+        stored.append(test_data_storage.save_file(
+            input_file.file,
+            max_size=settings.MAX_TEST_FILE_SIZE,
+            inline_limit=settings.TEST_DATA_INLINE_LIMIT
+        ))
+        stored.append(test_data_storage.save_file(
+            output_file.file,
+            max_size=settings.MAX_TEST_FILE_SIZE,
+            inline_limit=settings.TEST_DATA_INLINE_LIMIT
+        ))
+        fields = test_case_fields(stored[0], stored[1], is_sample)
+    except FileTooLarge as e:
+        _discard_stored(db, stored)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except SampleTooLarge as e:
+        _discard_stored(db, stored)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    db_test_case = TestCase(problem_id=problem_id, is_sample=is_sample, order=order, **fields)
+    db.add(db_test_case)
+    # Test mẫu nằm trong trang đề bài: đổi phiên bản bài toán
+    if db_test_case.is_sample:
+        bump_version(db, Problem, problem_id)
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        _discard_stored(db, stored)
+        raise
+    # File có thể đã bị xóa trước khi test case được commit: đặt lại nếu cần
+    test_data_storage.confirm(*stored)
+    db.refresh(db_test_case)
+    return db_test_case
+
+@router.get("/{problem_id}/test-cases", response_model=List[TestCaseSummaryResponse], response_model_exclude_unset=True)
 def get_test_cases(
     problem_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    include: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
-    Lấy danh sách test cases của bài toán
+    Lấy danh sách test cases của bài toán (metadata, có phân trang)
+    
+    Dữ liệu test lấy qua /test-cases/{id}/input và /output (hỗ trợ Range);
+    include=data trả kèm dữ liệu trong JSON để tương thích với client cũ.
     """
     # Lấy thông tin bài toán
     db_problem = db.query(Problem).filter(Problem.id == problem_id).first()
@@ -236,25 +509,107 @@ def get_test_cases(
             detail="Problem not found"
         )
     
+    fields = {field.strip() for field in include.split(",")} if include else set()
+    if "data" in fields:
+        query = db.query(TestCase).options(undefer(TestCase.input), undefer(TestCase.expected_output))
+    else:
+        query = db.query(*TEST_CASE_SUMMARY_COLUMNS)
+    query = query.filter(TestCase.problem_id == problem_id)
+    
     # Kiểm tra quyền xem test case (phải là admin hoặc người tạo bài toán)
-    if not current_user.is_admin and db_problem.created_by != current_user.id:
+    if not _can_view_all_tests(db_problem, current_user):
         # Nếu không phải admin hoặc người tạo, chỉ xem được test case sample
-        test_cases = db.query(TestCase).filter(
-            TestCase.problem_id == problem_id,
-            TestCase.is_sample == True
-        ).all()
-    else:
-        # Admin hoặc người tạo xem được tất cả test cases
-        test_cases = db.query(TestCase).filter(TestCase.problem_id == problem_id).all()
+        query = query.filter(TestCase.is_sample == True)
     
+    test_cases = query.order_by(TestCase.order, TestCase.id).offset(skip).limit(limit).all()
     return test_cases
 
+def _stream_test_data(
+    problem_id: str,
+    test_case_id: str,
+    column,
+    sha256_column,
+    range_header: Optional[str],
+    db: Session,
+    current_user: Principal
+):
+    """Trả dữ liệu input/output của một test case dạng stream, hỗ trợ Range"""
+    db_problem = db.query(Problem).filter(Problem.id == problem_id).first()
+    if not db_problem:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Problem not found"
+        )
+    
+    row = db.query(
+        TestCase.is_sample, TestCase.order, column.label("data"), sha256_column.label("sha256")
+    ).filter(
+        TestCase.id == test_case_id,
+        TestCase.problem_id == problem_id
+    ).first()
+    
+    # Người không có quyền chỉ xem được test mẫu; test ẩn coi như không tồn tại
+    if not row or (not row.is_sample and not _can_view_all_tests(db_problem, current_user)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test case not found"
+        )
+    
+    suffix = "in" if column is TestCase.input else "out"
+    
+    # Dữ liệu lớn nằm trong kho file: đọc đúng đoạn được yêu cầu theo từng khối
+    if row.sha256:
+        return ranged_response(
+            lambda start, length: test_data_storage.read(row.sha256, start, length),
+            os.path.getsize(test_data_storage.path(row.sha256)),
+            range_header,
+            filename=f"{row.order}.{suffix}"
+        )
+    
+    data = row.data.encode("utf-8")
+    return ranged_response(
+        lambda start, length: iter_bytes(data, start, length),
+        len(data),
+        range_header,
+        filename=f"{row.order}.{suffix}"
+    )
+
+@router.get("/{problem_id}/test-cases/{test_case_id}/input")
+def get_test_case_input(
+    problem_id: str,
+    test_case_id: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Tải dữ liệu input của test case (hỗ trợ HTTP Range)
+    """
+    return _stream_test_data(
+        problem_id, test_case_id, TestCase.input, TestCase.input_sha256, range_header, db, current_user
+    )
+
+@router.get("/{problem_id}/test-cases/{test_case_id}/output")
+def get_test_case_output(
+    problem_id: str,
+    test_case_id: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Tải dữ liệu output mong đợi của test case (hỗ trợ HTTP Range)
+    """
+    return _stream_test_data(
+        problem_id, test_case_id, TestCase.expected_output, TestCase.output_sha256, range_header, db, current_user
+    )
+
 @router.delete("/{problem_id}/test-cases/{test_case_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_test_case(
     problem_id: str,
     test_case_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Xóa test case
@@ -287,5 +642,10 @@ def delete_test_case(
         )
     
     db.delete(db_test_case)
+    if db_test_case.is_sample:
+        bump_version(db, Problem, problem_id)
     db.commit()
+    
+    # Xóa file dữ liệu nếu không còn test case nào dùng chung
+    delete_unreferenced(db, [db_test_case.input_sha256, db_test_case.output_sha256])
     return None
\ No newline at end of file
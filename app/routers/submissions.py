@@ -1,31 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, undefer
 from typing import List, Optional
 from datetime import datetime
 
-from app.database import get_db
-from app.models.submissions import Submission, StatusEnum
+from app import events
+from app.database import get_async_read_db, get_db, get_read_db
+from app.etag import bump_version, is_not_modified, make_etag, not_modified, set_etag
+from app.pagination import Keyset
+from app.models.submissions import Submission, UserProblemStatus, StatusEnum
 from app.models.problems import Problem
 from app.models.contests import Contest, ContestParticipant, ContestProblem
-from app.models.users import User
 from app.schemas.submissions import (
-    SubmissionCreate, SubmissionResponse, SubmissionDetailResponse,
+    SubmissionCreate, SubmissionResponse, SubmissionSummaryResponse, SubmissionDetailResponse,
     LanguageEnum, StatusEnum as SchemaStatusEnum
 )
-from app.auth.oauth2 import get_current_active_user, get_current_admin_user
+from app.auth.oauth2 import Principal, get_current_active_user, get_current_active_user_async, get_current_admin_user
+from app.ratelimit import limit_by_ip, limit_by_user
+from app.services.judge_queue_service import check_admission
 from app.services.judge_service import judge_submission
+from app.services.problem_stats_service import record_judge_result, rebuild_user_problem_status
 
 router = APIRouter(prefix="/api/submissions", tags=["Submissions"])
 
-@router.post("/", response_model=SubmissionResponse, status_code=status.HTTP_201_CREATED)
+# Thứ tự danh sách bài nộp: mới nhất trước, id để phân định khi trùng thời gian
+SUBMISSION_KEYSET = Keyset(Submission.submitted_at, Submission.id, descending=True)
+
+# Các cột metadata dùng cho danh sách bài nộp (không có mã nguồn)
+SUBMISSION_SUMMARY_COLUMNS = (
+    Submission.id,
+    Submission.user_id,
+    Submission.problem_id,
+    Submission.contest_id,
+    Submission.language,
+    Submission.status,
+    Submission.execution_time_ms,
+    Submission.memory_used_kb,
+    Submission.submitted_at,
+)
+
+def _submission_list_query(db: Session, include: Optional[str]):
+    """
+    Query cho danh sách bài nộp.
+
+    Mặc định chỉ chọn các cột metadata; mã nguồn chỉ được đọc khi client
+    yêu cầu rõ ràng bằng include=code.
+    """
+    fields = {field.strip() for field in include.split(",")} if include else set()
+    if "code" in fields:
+        return db.query(Submission).options(undefer(Submission.code))
+    return db.query(*SUBMISSION_SUMMARY_COLUMNS)
+
+@router.post(
+    "/",
+    response_model=SubmissionResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[
+        Depends(limit_by_user("submission", "RATE_LIMIT_SUBMISSION_PER_USER")),
+        Depends(limit_by_ip("submission", "RATE_LIMIT_SUBMISSION_PER_IP")),
+    ]
+)
 def create_submission(
     submission: SubmissionCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Tạo bài nộp mới
     """
+    # Hàng đợi chấm bài quá dài: từ chối trước khi ghi bài nộp
+    check_admission(db)
+    
     # Kiểm tra bài toán tồn tại
     db_problem = db.query(Problem).filter(Problem.id == submission.problem_id).first()
     if not db_problem:
@@ -74,11 +120,14 @@ def create_submission(
         contest_id=submission.contest_id
     )
     
+    # Ghi bài nộp ở trạng thái chờ trước khi chấm: hàng đợi chấm bài
+    # (kiểm soát tiếp nhận) đếm các bài này
     db.add(db_submission)
     db.commit()
-    db.refresh(db_submission)
     
-    # Chấm bài nộp (trong thực tế sẽ được xử lý bất đồng bộ)
+    # Chấm bài nộp (trong thực tế sẽ được xử lý bất đồng bộ). Kết quả chấm,
+    # điểm cuộc thi, trạng thái giải bài và sự kiện cho các xử lý phụ (email,
+    # thông báo...) được ghi trong một commit
     try:
         judge_result = judge_submission(db_submission, db_problem)
         db_submission.status = judge_result["status"]
@@ -86,6 +135,7 @@ def create_submission(
         db_submission.memory_used_kb = judge_result["memory_used_kb"]
         
         # Nếu là bài nộp trong cuộc thi và được chấp nhận, cập nhật điểm
+        points = 0
         if submission.contest_id and db_submission.status == StatusEnum.accepted:
             contest_problem = db.query(ContestProblem).filter(
                 ContestProblem.contest_id == submission.contest_id,
@@ -93,33 +143,52 @@ def create_submission(
             ).first()
             
             if contest_problem:
-                participant.score += contest_problem.points
-                db.commit()
+                points = contest_problem.points
+                participant.score += points
+                bump_version(db, Contest, submission.contest_id, Contest.standings_version)
         
+        # Cập nhật trạng thái giải bài và bộ đếm của bài toán
+        record_judge_result(db, db_submission)
+        events.publish(db, events.SUBMISSION_JUDGED, {
+            "submission_id": db_submission.id,
+            "user_id": db_submission.user_id,
+            "problem_id": db_submission.problem_id,
+            "contest_id": db_submission.contest_id,
+            "language": db_submission.language.value,
+            "status": db_submission.status.value,
+            "execution_time_ms": db_submission.execution_time_ms,
+            "points": points,
+        })
         db.commit()
-        db.refresh(db_submission)
-    except Exception as e:
-        # Xử lý lỗi khi chấm bài
+    except Exception:
+        # Xử lý lỗi khi chấm bài: vẫn là một lần thử, bộ đếm phải khớp với
+        # rebuild_user_problem_status
+        db.rollback()
         db_submission.status = StatusEnum.runtime_error
+        record_judge_result(db, db_submission)
         db.commit()
     
+    db.refresh(db_submission)
     return db_submission
 
-@router.get("/", response_model=List[SubmissionResponse])
+@router.get("/", response_model=List[SubmissionSummaryResponse], response_model_exclude_unset=True)
 def get_submissions(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    include: Optional[str] = None,
     problem_id: Optional[str] = None,
     user_id: Optional[str] = None,
     contest_id: Optional[str] = None,
     status: Optional[SchemaStatusEnum] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Lấy danh sách bài nộp với bộ lọc
     """
-    query = db.query(Submission)
+    query = _submission_list_query(db, include)
     
     # Nếu không phải admin, chỉ xem được bài nộp của mình
     if not current_user.is_admin:
@@ -138,45 +207,61 @@ def get_submissions(
     if status:
         query = query.filter(Submission.status == status)
     
-    # Sắp xếp theo thời gian nộp (mới nhất trước)
-    query = query.order_by(Submission.submitted_at.desc())
-    
-    # Phân trang và lấy kết quả
-    submissions = query.offset(skip).limit(limit).all()
+    # Sắp xếp theo thời gian nộp (mới nhất trước), phân trang theo con trỏ hoặc offset
+    submissions = SUBMISSION_KEYSET.paginate(query, skip, limit, cursor).all()
+    SUBMISSION_KEYSET.set_next_cursor(response, submissions, limit)
     return submissions
 
 @router.get("/{submission_id}", response_model=SubmissionDetailResponse)
-def get_submission(
+async def get_submission(
     submission_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_active_user_async)
 ):
     """
     Lấy thông tin chi tiết bài nộp theo ID
     """
-    submission = db.query(Submission).filter(Submission.id == submission_id).first()
+    # Chỉ đọc phiên bản và chủ bài nộp trước
+    meta = (await db.execute(
+        select(Submission.version, Submission.user_id).where(Submission.id == submission_id)
+    )).first()
     
     # Kiểm tra bài nộp tồn tại
-    if not submission:
+    if not meta:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Submission not found"
         )
     
     # Kiểm tra quyền xem (phải là admin hoặc chủ của bài nộp)
-    if not current_user.is_admin and submission.user_id != current_user.id:
+    if not current_user.is_admin and meta.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view this submission"
         )
     
-    return submission
+    # Kết quả chấm chưa đổi: không cần tải mã nguồn
+    etag = make_etag("submission", submission_id, meta.version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
+    return await db.scalar(
+        select(Submission).options(
+            undefer(Submission.code),
+            joinedload(Submission.problem),
+            joinedload(Submission.user),
+            joinedload(Submission.contest)
+        ).where(Submission.id == submission_id)
+    )
 
 @router.delete("/{submission_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_submission(
     submission_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """
     Xóa bài nộp (yêu cầu quyền admin)
@@ -189,23 +274,30 @@ def delete_submission(
         )
     
     db.delete(db_submission)
+    db.flush()
+    
+    # Tính lại trạng thái giải bài vì bài nộp bị xóa có thể là bài tốt nhất
+    rebuild_user_problem_status(db, db_submission.user_id, db_submission.problem_id)
     db.commit()
     return None
 
-@router.get("/user/me", response_model=List[SubmissionResponse])
+@router.get("/user/me", response_model=List[SubmissionSummaryResponse], response_model_exclude_unset=True)
 def get_my_submissions(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    include: Optional[str] = None,
     problem_id: Optional[str] = None,
     contest_id: Optional[str] = None,
     status: Optional[SchemaStatusEnum] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Lấy danh sách bài nộp của người dùng hiện tại
     """
-    query = db.query(Submission).filter(Submission.user_id == current_user.id)
+    query = _submission_list_query(db, include).filter(Submission.user_id == current_user.id)
     
     # Áp dụng các bộ lọc
     if problem_id:
@@ -217,31 +309,32 @@ def get_my_submissions(
     if status:
         query = query.filter(Submission.status == status)
     
-    # Sắp xếp theo thời gian nộp (mới nhất trước)
-    query = query.order_by(Submission.submitted_at.desc())
-    
-    # Phân trang và lấy kết quả
-    submissions = query.offset(skip).limit(limit).all()
+    # Sắp xếp theo thời gian nộp (mới nhất trước), phân trang theo con trỏ hoặc offset
+    submissions = SUBMISSION_KEYSET.paginate(query, skip, limit, cursor).all()
+    SUBMISSION_KEYSET.set_next_cursor(response, submissions, limit)
     return submissions
 
 @router.get("/problem/{problem_id}/best", response_model=SubmissionResponse)
 def get_best_submission_for_problem(
     problem_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Lấy bài nộp tốt nhất của người dùng cho một bài toán
     """
-    # Lấy bài nộp đã được accepted với thời gian thực thi thấp nhất
-    best_submission = db.query(Submission).filter(
-        Submission.user_id == current_user.id,
-        Submission.problem_id == problem_id,
-        Submission.status == StatusEnum.accepted
-    ).order_by(
-        Submission.execution_time_ms.asc()
+    # Bài nộp tốt nhất được lưu sẵn trong bảng trạng thái giải bài
+    problem_status = db.query(UserProblemStatus.best_submission_id).filter(
+        UserProblemStatus.user_id == current_user.id,
+        UserProblemStatus.problem_id == problem_id
     ).first()
     
+    best_submission = None
+    if problem_status and problem_status.best_submission_id:
+        best_submission = db.query(Submission).options(undefer(Submission.code)).filter(
+            Submission.id == problem_status.best_submission_id
+        ).first()
+    
     if not best_submission:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -253,8 +346,8 @@ def get_best_submission_for_problem(
 @router.get("/contest/{contest_id}/stats", response_model=dict)
 def get_contest_submission_stats(
     contest_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Lấy thống kê bài nộp trong cuộc thi
@@ -1,41 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional
 
-from app.database import get_db
+from app import events
+from app.database import get_async_db, get_db, get_read_db
+from app.pagination import NEXT_CURSOR_HEADER, Keyset
 from app.models.users import User
-from app.schemas.users import UserCreate, UserResponse, UserUpdate
+from app.models.contests import Contest, RatingHistory
+from app.models.submissions import UserProblemStatus
+from app.schemas.users import LeaderboardEntry, RatingHistoryResponse, UserCreate, UserResponse, UserUpdate
+from app.schemas.submissions import UserProblemStatusResponse
 from app.auth import utils, oauth2
+from app.services import leaderboard_service
+from app.ratelimit import limit_by_ip
 
 router = APIRouter(prefix="/api/users", tags=["Users"])
 
-@router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def create_user(
-    user: UserCreate,
-    db: Session = Depends(get_db),
-    current_admin: User = Depends(oauth2.get_current_admin_user)
-):
-    """
-    Tạo người dùng mới (yêu cầu quyền admin)
-    """
+# Thứ tự danh sách người dùng: theo thời gian tạo, id để phân định khi trùng thời gian
+USER_KEYSET = Keyset(User.created_at, User.id)
+
+async def _check_unique(db: AsyncSession, user: UserCreate):
+    """Kiểm tra username và email chưa được dùng"""
     # Kiểm tra username đã tồn tại
-    existing_username = db.query(User).filter(User.username == user.username).first()
-    if existing_username:
+    if (await db.execute(select(User.id).where(User.username == user.username))).first():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already exists"
         )
     
     # Kiểm tra email đã tồn tại
-    existing_email = db.query(User).filter(User.email == user.email).first()
-    if existing_email:
+    if (await db.execute(select(User.id).where(User.email == user.email))).first():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already exists"
         )
+
+# Các endpoint băm mật khẩu là async: bcrypt chạy trong process pool, request
+# chờ trên event loop thay vì giữ một thread của threadpool
+@router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def create_user(
+    user: UserCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin: oauth2.Principal = Depends(oauth2.get_current_admin_user_async)
+):
+    """
+    Tạo người dùng mới (yêu cầu quyền admin)
+    """
+    await _check_unique(db, user)
     
     # Tạo user mới
-    hashed_password = utils.get_password_hash(user.password)
+    hashed_password = await utils.get_password_hash_async(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -48,36 +64,29 @@ def create_user(
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.flush()
+    events.publish(db, events.USER_CREATED, {"user_id": db_user.id})
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register_user(
+@router.post(
+    "/register",
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_by_ip("register", "RATE_LIMIT_REGISTER_PER_IP"))]
+)
+async def register_user(
     user: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Đăng ký người dùng mới (không yêu cầu quyền admin)
     """
-    # Kiểm tra username đã tồn tại
-    existing_username = db.query(User).filter(User.username == user.username).first()
-    if existing_username:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already exists"
-        )
-    
-    # Kiểm tra email đã tồn tại
-    existing_email = db.query(User).filter(User.email == user.email).first()
-    if existing_email:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already exists"
-        )
+    await _check_unique(db, user)
     
     # Tạo user mới (không có quyền admin)
-    hashed_password = utils.get_password_hash(user.password)
+    hashed_password = await utils.get_password_hash_async(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -90,37 +99,66 @@ def register_user(
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.flush()
+    events.publish(db, events.USER_CREATED, {"user_id": db_user.id})
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @router.get("/", response_model=List[UserResponse])
 def get_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(oauth2.get_current_active_user)
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_active_user)
 ):
     """
     Lấy danh sách người dùng
     """
-    users = db.query(User).offset(skip).limit(limit).all()
+    users = USER_KEYSET.paginate(db.query(User), skip, limit, cursor).all()
+    USER_KEYSET.set_next_cursor(response, users, limit)
     return users
 
+@router.get("/leaderboard", response_model=List[LeaderboardEntry])
+def get_leaderboard(
+    response: Response,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_active_user)
+):
+    """
+    Bảng xếp hạng rating (trang đầu được cache, các trang sau dùng con trỏ)
+    """
+    entries, next_cursor = leaderboard_service.leaderboard_page(db, skip, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return entries
+
 @router.get("/me", response_model=UserResponse)
 def get_current_user_info(
-    current_user: User = Depends(oauth2.get_current_active_user)
+    db: Session = Depends(get_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_active_user)
 ):
     """
     Lấy thông tin người dùng hiện tại
     """
-    return current_user
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
 
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user(
     user_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(oauth2.get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_active_user)
 ):
     """
     Lấy thông tin người dùng theo ID
@@ -133,12 +171,63 @@ def get_user(
         )
     return user
 
+@router.get("/{user_id}/problem-status", response_model=List[UserProblemStatusResponse])
+def get_user_problem_status(
+    user_id: str,
+    solved: Optional[bool] = None,
+    problem_id: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_active_user)
+):
+    """
+    Lấy trạng thái giải bài của người dùng (đã giải, số lần nộp, bài nộp tốt nhất)
+    """
+    query = db.query(UserProblemStatus).filter(UserProblemStatus.user_id == user_id)
+    
+    if solved is not None:
+        query = query.filter(UserProblemStatus.solved == solved)
+    
+    if problem_id:
+        query = query.filter(UserProblemStatus.problem_id == problem_id)
+    
+    return query.all()
+
+@router.get("/{user_id}/rating-history", response_model=List[RatingHistoryResponse])
+def get_user_rating_history(
+    user_id: str,
+    db: Session = Depends(get_read_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_active_user)
+):
+    """
+    Lấy lịch sử rating của người dùng theo thời gian (mỗi cuộc thi một điểm)
+    """
+    return db.query(RatingHistory).options(joinedload(RatingHistory.contest).load_only(Contest.title)).filter(
+        RatingHistory.user_id == user_id
+    ).order_by(RatingHistory.created_at).all()
+
+@router.get("/{user_id}/rank", response_model=LeaderboardEntry)
+def get_user_rank(
+    user_id: str,
+    db: Session = Depends(get_read_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_active_user)
+):
+    """
+    Thứ hạng rating của người dùng trên bảng xếp hạng
+    """
+    entry = leaderboard_service.user_entry(db, user_id)
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return entry
+
 @router.put("/{user_id}", response_model=UserResponse)
-def update_user(
+async def update_user(
     user_id: str,
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(oauth2.get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_active_user_async)
 ):
     """
     Cập nhật thông tin người dùng
@@ -151,7 +240,7 @@ def update_user(
         )
     
     # Lấy thông tin user cần cập nhật
-    db_user = db.query(User).filter(User.id == user_id).first()
+    db_user = await db.get(User, user_id)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -159,26 +248,31 @@ def update_user(
         )
     
     # Cập nhật thông tin user
-    user_data = user_update.dict(exclude_unset=True)
+    user_data = user_update.model_dump(exclude_unset=True)
     if "password" in user_data:
-        user_data["hashed_password"] = utils.get_password_hash(user_data.pop("password"))
+        user_data["hashed_password"] = await utils.get_password_hash_async(user_data.pop("password"))
     
     # Chỉ có admin mới được cập nhật trạng thái admin
     if "is_admin" in user_data and not current_user.is_admin:
         user_data.pop("is_admin")
     
+    old_username = db_user.username
     for key, value in user_data.items():
         setattr(db_user, key, value)
     
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    # Quyền/trạng thái có thể đã đổi: bỏ thông tin đăng nhập đã cache
+    await oauth2.invalidate_principal_async(old_username)
+    if "rating" in user_data or "is_active" in user_data:
+        await leaderboard_service.invalidate_async()
+    await db.refresh(db_user)
     return db_user
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_user(
     user_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(oauth2.get_current_admin_user)
+    current_user: oauth2.Principal = Depends(oauth2.get_current_admin_user)
 ):
     """
     Xóa người dùng (yêu cầu quyền admin)
@@ -192,4 +286,6 @@ def delete_user(
     
     db.delete(db_user)
     db.commit()
+    oauth2.invalidate_principal(db_user.username)
+    leaderboard_service.invalidate()
     return None
\ No newline at end of file
@@ -1,15 +1,18 @@
-from app.schemas.users import UserBase, UserCreate, UserUpdate, UserResponse, Token, TokenData
+from app.schemas.users import UserBase, UserCreate, UserUpdate, UserResponse, Token, TokenData, RatingHistoryResponse, LeaderboardEntry
 from app.schemas.problems import (
     DifficultyEnum, 
-    TestCaseBase, TestCaseCreate, TestCaseResponse,
-    ProblemBase, ProblemCreate, ProblemUpdate, ProblemResponse, ProblemDetailResponse
+    TestCaseBase, TestCaseCreate, TestCaseResponse, TestCaseSummaryResponse,
+    ProblemBase, ProblemCreate, ProblemUpdate, ProblemResponse, ProblemDetailResponse,
+    FacetCount, ProblemFacetsResponse, ImportStatusEnum, ProblemImportJobResponse
 )
 from app.schemas.contests import (
     ContestProblemBase, ContestProblemCreate, ContestProblemResponse, ContestProblemDetailResponse,
     ContestParticipantBase, ContestParticipantCreate, ContestParticipantResponse, ContestParticipantDetailResponse,
-    ContestBase, ContestCreate, ContestUpdate, ContestResponse, ContestDetailResponse
+    ContestBase, ContestCreate, ContestUpdate, ContestResponse, ContestDetailResponse,
+    InvitationAudienceEnum, ContestInvitationCreate, ContestInvitationResponse
 )
 from app.schemas.submissions import (
     LanguageEnum, StatusEnum,
-    SubmissionBase, SubmissionCreate, SubmissionResponse, SubmissionDetailResponse
+    SubmissionBase, SubmissionCreate, SubmissionResponse, SubmissionSummaryResponse,
+    SubmissionDetailResponse, UserProblemStatusResponse
 )
\ No newline at end of file
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 from datetime import datetime
+from enum import Enum
 
 # ContestProblem schemas
 class ContestProblemBase(BaseModel):
@@ -15,15 +16,13 @@ class ContestProblemResponse(ContestProblemBase):
     id: str
     contest_id: str
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ContestProblemDetailResponse(ContestProblemResponse):
     problem_title: str
     problem_difficulty: str
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # ContestParticipant schemas
 class ContestParticipantBase(BaseModel):
@@ -38,15 +37,13 @@ class ContestParticipantResponse(ContestParticipantBase):
     joined_at: datetime
     score: int
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ContestParticipantDetailResponse(ContestParticipantResponse):
     username: str
     full_name: Optional[str] = None
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Contest schemas
 class ContestBase(BaseModel):
@@ -71,12 +68,24 @@ class ContestResponse(ContestBase):
     created_by: str
     created_at: datetime
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ContestDetailResponse(ContestResponse):
     problems: List[ContestProblemDetailResponse] = []
     participants: List[ContestParticipantDetailResponse] = []
     
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+# Lời mời tham gia cuộc thi
+class InvitationAudienceEnum(str, Enum):
+    participants = "participants"
+    users = "users"
+
+class ContestInvitationCreate(BaseModel):
+    audience: InvitationAudienceEnum = InvitationAudienceEnum.participants
+
+class ContestInvitationResponse(BaseModel):
+    contest_id: str
+    audience: InvitationAudienceEnum
+    # Số người nhận chưa được mời tại thời điểm gửi yêu cầu
+    recipients: int
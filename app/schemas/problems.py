@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 from datetime import datetime
 from enum import Enum
@@ -22,8 +22,22 @@ class TestCaseResponse(TestCaseBase):
     id: str
     problem_id: str
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class TestCaseSummaryResponse(BaseModel):
+    """Metadata của test case; dữ liệu chỉ có khi yêu cầu include=data"""
+    id: str
+    problem_id: str
+    is_sample: bool = False
+    order: int
+    input_size: int = 0
+    output_size: int = 0
+    input_sha256: Optional[str] = None
+    output_sha256: Optional[str] = None
+    input: Optional[str] = None
+    expected_output: Optional[str] = None
+    
+    model_config = ConfigDict(from_attributes=True)
 
 # Problem schemas
 class ProblemBase(BaseModel):
@@ -57,12 +71,42 @@ class ProblemResponse(ProblemBase):
     id: str
     created_at: datetime
     created_by: str
+    solved_count: int = 0
+    attempted_count: int = 0
+    # Người dùng hiện tại đã giải bài này chưa
+    is_solved: bool = False
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ProblemDetailResponse(ProblemResponse):
-    test_cases: List[TestCaseResponse] = []
+    # Trang đề bài chỉ kèm các test mẫu; dữ liệu test đầy đủ lấy qua API test-cases
+    test_cases: List[TestCaseResponse] = Field([], validation_alias="sample_test_cases")
     
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class ImportStatusEnum(str, Enum):
+    pending = "pending"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+class ProblemImportJobResponse(BaseModel):
+    id: str
+    status: ImportStatusEnum
+    total_tests: int = 0
+    processed_tests: int = 0
+    problem_id: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+# Facet schemas
+class FacetCount(BaseModel):
+    name: str
+    count: int
+
+class ProblemFacetsResponse(BaseModel):
+    tags: List[FacetCount] = []
+    difficulties: List[FacetCount] = []
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 from datetime import datetime
 from enum import Enum
@@ -36,13 +36,38 @@ class SubmissionResponse(SubmissionBase):
     memory_used_kb: Optional[int] = None
     submitted_at: datetime
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class SubmissionSummaryResponse(BaseModel):
+    """Bài nộp trong danh sách: chỉ metadata, mã nguồn chỉ có khi yêu cầu include=code"""
+    id: str
+    user_id: str
+    problem_id: str
+    contest_id: Optional[str] = None
+    language: LanguageEnum
+    status: StatusEnum
+    execution_time_ms: Optional[int] = None
+    memory_used_kb: Optional[int] = None
+    submitted_at: datetime
+    code: Optional[str] = None
+    
+    model_config = ConfigDict(from_attributes=True)
 
 class SubmissionDetailResponse(SubmissionResponse):
     problem_title: str
     username: str
     contest_title: Optional[str] = None
     
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+# Trạng thái giải bài của người dùng
+class UserProblemStatusResponse(BaseModel):
+    problem_id: str
+    solved: bool
+    attempts: int
+    first_accepted_at: Optional[datetime] = None
+    best_submission_id: Optional[str] = None
+    best_execution_time_ms: Optional[int] = None
+    last_submitted_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from typing import Optional
 from datetime import datetime
 
@@ -30,10 +30,11 @@ class UserUpdate(BaseModel):
 # Schema for returning user data
 class UserResponse(UserBase):
     id: str
+    # Email đã được kiểm tra khi tạo/sửa, không validate lại (chậm) khi trả về
+    email: str
     created_at: datetime
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Schema for token
 class Token(BaseModel):
@@ -42,4 +43,23 @@ class Token(BaseModel):
 
 # Schema for token data
 class TokenData(BaseModel):
-    username: Optional[str] = None
\ No newline at end of file
+    username: Optional[str] = None
+
+# Lịch sử rating (đồ thị trang cá nhân)
+class RatingHistoryResponse(BaseModel):
+    contest_id: str
+    contest_title: Optional[str] = None
+    rank: int
+    old_rating: int
+    new_rating: int
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+
+# Một dòng của bảng xếp hạng rating
+class LeaderboardEntry(BaseModel):
+    rank: int
+    id: str
+    username: str
+    full_name: Optional[str] = None
+    rating: int
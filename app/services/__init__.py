@@ -1,3 +1,4 @@
 # Import các dịch vụ
 from app.services.judge_service import judge_submission
-from app.services.email_service import send_welcome_email, send_contest_invitation, send_submission_result
\ No newline at end of file
+from app.services.email_service import send_welcome_email, send_contest_invitation, send_submission_result
+from app.services.problem_stats_service import record_judge_result, rebuild_user_problem_status, solved_problem_ids
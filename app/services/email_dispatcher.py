@@ -0,0 +1,282 @@
+"""
+Gửi email trong outbox ở nền.
+
+Mỗi vòng, dispatcher nhận (claim) tối đa EMAIL_BATCH_SIZE email đến hạn bằng
+một câu UPDATE có điều kiện, nên nhiều worker chạy cùng lúc không gửi trùng.
+Batch được chia cho tối đa EMAIL_SMTP_CONNECTIONS thread, mỗi thread gửi
+lần lượt trên một kết nối SMTP lấy từ pool; kết nối được giữ mở giữa các
+batch và mở lại khi server ngắt. Lỗi tạm thời được thử lại sau
+EMAIL_RETRY_BASE_SECONDS x 2^(lần thử - 1) (có jitter, tối đa
+EMAIL_RETRY_MAX_SECONDS); lỗi 5xx hoặc hết EMAIL_MAX_ATTEMPTS lần thì email
+bị đánh dấu failed. Email bị nhận bởi worker đã chết được nhận lại sau
+CLAIM_TIMEOUT.
+
+Chạy riêng (không cần server API):
+    python -m app.services.email_dispatcher
+"""
+import logging
+import queue
+import random
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import List, Optional
+
+from sqlalchemy import and_, or_, select, update
+
+from app import metrics
+from app.config import settings
+from app.database import SessionLocal, generate_uuid
+from app.models.emails import EmailMessage, EmailStatusEnum
+from app.services.email_service import render
+
+logger = logging.getLogger(__name__)
+
+CLAIM_TIMEOUT = timedelta(minutes=10)
+# Kết nối rảnh lâu hơn ngưỡng này được kiểm tra bằng NOOP trước khi dùng lại
+IDLE_CHECK_SECONDS = 30
+
+class SMTPConnectionPool:
+    """Tối đa `size` kết nối SMTP, kết nối trả về được giữ mở để dùng lại"""
+
+    def __init__(self, size: int):
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT)
+        if settings.SMTP_STARTTLS:
+            connection.starttls()
+        if settings.SMTP_USERNAME:
+            connection.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
+        return connection
+
+    def acquire(self) -> smtplib.SMTP:
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    connection, released_at = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - released_at < IDLE_CHECK_SECONDS or self._alive(connection):
+                    return connection
+                self._quit(connection)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection: Optional[smtplib.SMTP]):
+        """Trả kết nối về pool (None nếu kết nối đã hỏng và bị đóng)"""
+        if connection is not None:
+            self._idle.put((connection, time.monotonic()))
+        self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._quit(connection)
+
+    @staticmethod
+    def _alive(connection) -> bool:
+        try:
+            return connection.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _quit(connection):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+def build_message(message: EmailMessage) -> MIMEMultipart:
+    subject, html_content = render(message.template, message.context)
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = settings.EMAIL_FROM
+    msg["To"] = message.to_email
+    msg.attach(MIMEText(html_content, "html"))
+    return msg
+
+def _is_permanent(exc: Exception) -> bool:
+    """Lỗi không nên thử lại: người nhận/người gửi bị từ chối hoặc mã 5xx"""
+    if isinstance(exc, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)):
+        return True
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code >= 500
+    return isinstance(exc, (KeyError, TypeError))  # template hoặc context không hợp lệ
+
+class Dispatcher:
+    def __init__(self):
+        self.pool = SMTPConnectionPool(settings.EMAIL_SMTP_CONNECTIONS)
+        self.executor = ThreadPoolExecutor(max_workers=settings.EMAIL_SMTP_CONNECTIONS, thread_name_prefix="smtp")
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+
+    def claim(self, db) -> List[EmailMessage]:
+        """Nhận một batch email đến hạn cho worker này"""
+        now = datetime.utcnow()
+        due = or_(
+            and_(EmailMessage.status == EmailStatusEnum.pending, EmailMessage.next_attempt_at <= now),
+            and_(EmailMessage.status == EmailStatusEnum.sending, EmailMessage.claimed_at < now - CLAIM_TIMEOUT),
+        )
+        ids = db.execute(
+            select(EmailMessage.id).where(due).order_by(EmailMessage.next_attempt_at).limit(settings.EMAIL_BATCH_SIZE)
+        ).scalars().all()
+        if not ids:
+            return []
+        token = generate_uuid()
+        # Điều kiện được kiểm tra lại trong UPDATE: worker khác đã nhận thì bỏ qua
+        db.execute(
+            update(EmailMessage).where(EmailMessage.id.in_(ids), due)
+            .values(status=EmailStatusEnum.sending, claim_token=token, claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return db.execute(select(EmailMessage).where(EmailMessage.claim_token == token)).scalars().all()
+
+    def _send_chunk(self, messages: List[EmailMessage]):
+        """Gửi lần lượt trên một kết nối; trả về [(id, lỗi hoặc None)]"""
+        if settings.EMAIL_BACKEND != "smtp":
+            for message in messages:
+                logger.info("Email to %s: %s", message.to_email, render(message.template, message.context)[0])
+            return [(message.id, None) for message in messages]
+
+        results = []
+        connection = None
+        try:
+            for message in messages:
+                try:
+                    msg = build_message(message)
+                except Exception as exc:
+                    results.append((message.id, exc))
+                    continue
+                for retry in (False, True):
+                    if connection is None:
+                        connection = self.pool.acquire()
+                    try:
+                        connection.send_message(msg)
+                        results.append((message.id, None))
+                        break
+                    except (smtplib.SMTPServerDisconnected, ConnectionError) as exc:
+                        # Server đóng kết nối giữa chừng: mở lại một lần cho email này
+                        connection.close()
+                        self.pool.release(None)
+                        connection = None
+                        if retry:
+                            results.append((message.id, exc))
+                    except (smtplib.SMTPException, OSError) as exc:
+                        results.append((message.id, exc))
+                        break
+        except (smtplib.SMTPException, OSError) as exc:
+            # Không kết nối được: các email còn lại thử lại sau
+            done = {message_id for message_id, _ in results}
+            results.extend((message.id, exc) for message in messages if message.id not in done)
+        finally:
+            if connection is not None:
+                self.pool.release(connection)
+        return results
+
+    def _record(self, db, messages: List[EmailMessage], results):
+        now = datetime.utcnow()
+        by_id = {message.id: message for message in messages}
+        sent = [message_id for message_id, error in results if error is None]
+        if sent:
+            db.execute(
+                update(EmailMessage).where(EmailMessage.id.in_(sent))
+                .values(status=EmailStatusEnum.sent, sent_at=now, attempts=EmailMessage.attempts + 1, claim_token=None)
+                .execution_options(synchronize_session=False)
+            )
+            metrics.EMAILS.inc(("sent",), len(sent))
+        for message_id, error in results:
+            if error is None:
+                continue
+            message = by_id[message_id]
+            attempts = message.attempts + 1
+            values = {"attempts": attempts, "claim_token": None, "last_error": f"{type(error).__name__}: {error}"[:1000]}
+            if _is_permanent(error) or attempts >= settings.EMAIL_MAX_ATTEMPTS:
+                values["status"] = EmailStatusEnum.failed
+                metrics.EMAILS.inc(("failed",))
+                logger.warning("Giving up on email %s to %s: %s", message_id, message.to_email, values["last_error"])
+            else:
+                delay = min(settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.EMAIL_RETRY_MAX_SECONDS)
+                values["status"] = EmailStatusEnum.pending
+                values["next_attempt_at"] = now + timedelta(seconds=delay * random.uniform(0.5, 1.0))
+                metrics.EMAILS.inc(("retry",))
+            db.execute(
+                update(EmailMessage).where(EmailMessage.id == message_id).values(**values)
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+
+    def dispatch_once(self) -> int:
+        """Gửi một batch, trả về số email đã xử lý"""
+        db = SessionLocal()
+        try:
+            messages = self.claim(db)
+            if not messages:
+                return 0
+            # Đọc hết thuộc tính trước khi chuyển đối tượng sang thread khác
+            db.expunge_all()
+            size = max(1, -(-len(messages) // settings.EMAIL_SMTP_CONNECTIONS))
+            chunks = [messages[i:i + size] for i in range(0, len(messages), size)]
+            results = [result for chunk in self.executor.map(self._send_chunk, chunks) for result in chunk]
+            self._record(db, messages, results)
+            return len(messages)
+        finally:
+            db.close()
+
+    def run(self, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                processed = self.dispatch_once()
+            except Exception:
+                logger.exception("Email dispatch failed")
+                processed = 0
+            # Batch đầy: có thể còn email đến hạn, gửi tiếp ngay
+            if processed < settings.EMAIL_BATCH_SIZE:
+                stop.wait(settings.EMAIL_POLL_SECONDS)
+
+_thread: Optional[threading.Thread] = None
+_dispatcher: Optional[Dispatcher] = None
+_stop = threading.Event()
+
+def start_dispatcher():
+    """Chạy dispatcher trong thread nền của worker (bỏ qua nếu EMAIL_DISPATCHER_ENABLED tắt)"""
+    global _thread, _dispatcher
+    if not settings.EMAIL_DISPATCHER_ENABLED or _thread is not None:
+        return
+    _stop.clear()
+    _dispatcher = Dispatcher()
+    _thread = threading.Thread(target=_dispatcher.run, args=(_stop,), name="email-dispatcher", daemon=True)
+    _thread.start()
+
+def stop_dispatcher():
+    global _thread, _dispatcher
+    if _thread is None:
+        return
+    _stop.set()
+    _thread.join()
+    _dispatcher.close()
+    _thread = _dispatcher = None
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    dispatcher = Dispatcher()
+    try:
+        dispatcher.run(_stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dispatcher.close()
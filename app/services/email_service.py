@@ -1,56 +1,25 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import List, Optional
-
-# Trong triển khai thực tế, bạn nên sử dụng biến môi trường cho các thông tin này
-SMTP_SERVER = "smtp.example.com"
-SMTP_PORT = 587
-SMTP_USERNAME = "your_email@example.com"
-SMTP_PASSWORD = "your_password"
-DEFAULT_FROM_EMAIL = "noreply@codingplatform.com"
-
-def send_email(to_email: str, subject: str, html_content: str, 
-               from_email: Optional[str] = None, cc: Optional[List[str]] = None):
-    """
-    Gửi email sử dụng SMTP
-    
-    Lưu ý: Đây chỉ là mẫu cơ bản, trong ứng dụng thực tế bạn nên sử dụng
-    các dịch vụ email như SendGrid, Amazon SES, Mailgun, v.v.
-    """
-    try:
-        # Tạo message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = from_email or DEFAULT_FROM_EMAIL
-        msg['To'] = to_email
-        
-        if cc:
-            msg['Cc'] = ", ".join(cc)
-            recipients = [to_email] + cc
-        else:
-            recipients = [to_email]
-        
-        # Thêm nội dung HTML
-        html_part = MIMEText(html_content, 'html')
-        msg.attach(html_part)
-        
-        # Kết nối đến SMTP server và gửi email
-        # Trong triển khai thực tế, bạn nên xử lý ngoại lệ và retry
-        # server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        # server.starttls()
-        # server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        # server.sendmail(msg['From'], recipients, msg.as_string())
-        # server.quit()
-        
-        print(f"Email would be sent to {to_email} with subject: {subject}")
-        return True
-    except Exception as e:
-        print(f"Failed to send email: {str(e)}")
-        return False
-
-def send_welcome_email(to_email: str, username: str):
-    """Gửi email chào mừng người dùng mới"""
+"""
+Email của ứng dụng: các hàm send_* chỉ thêm email vào outbox (bảng
+email_outbox) trong transaction của người gọi, việc gửi do
+app.services.email_dispatcher thực hiện ở nền. Nội dung được dựng từ
+template lúc gửi.
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, exists, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal, generate_uuid
+from app.models.contests import Contest, ContestParticipant
+from app.models.emails import EmailMessage, EmailStatusEnum
+from app.models.users import User
+
+# Số người nhận được thêm vào outbox mỗi transaction khi gửi hàng loạt
+ENQUEUE_BATCH_SIZE = 1000
+
+def _welcome(username: str):
     subject = "Welcome to Coding Platform"
     html_content = f"""
     <html>
@@ -70,10 +39,9 @@ def send_welcome_email(to_email: str, username: str):
     </body>
     </html>
     """
-    return send_email(to_email, subject, html_content)
+    return subject, html_content
 
-def send_contest_invitation(to_email: str, username: str, contest_title: str, contest_time: str, contest_url: str):
-    """Gửi lời mời tham gia cuộc thi"""
+def _contest_invitation(username: str, contest_title: str, contest_time: str, contest_url: str):
     subject = f"You're invited to join: {contest_title}"
     html_content = f"""
     <html>
@@ -89,14 +57,13 @@ def send_contest_invitation(to_email: str, username: str, contest_title: str, co
     </body>
     </html>
     """
-    return send_email(to_email, subject, html_content)
+    return subject, html_content
 
-def send_submission_result(to_email: str, username: str, problem_title: str, status: str, score: Optional[int] = None):
-    """Gửi kết quả bài nộp"""
+def _submission_result(username: str, problem_title: str, status: str, score: Optional[int] = None):
     subject = f"Submission Result: {problem_title}"
-    
+
     status_color = "green" if status == "accepted" else "red"
-    
+
     html_content = f"""
     <html>
     <head></head>
@@ -111,4 +78,104 @@ def send_submission_result(to_email: str, username: str, problem_title: str, sta
     </body>
     </html>
     """
-    return send_email(to_email, subject, html_content)
\ No newline at end of file
+    return subject, html_content
+
+TEMPLATES = {
+    "welcome": _welcome,
+    "contest_invitation": _contest_invitation,
+    "submission_result": _submission_result,
+}
+
+def render(template: str, context: dict):
+    """(subject, html) của một email trong outbox"""
+    return TEMPLATES[template](**context)
+
+def enqueue_email(db: Session, to_email: str, template: str, context: dict,
+                  user_id: Optional[str] = None, reference_id: Optional[str] = None) -> EmailMessage:
+    """Thêm email vào outbox (người gọi commit cùng thay đổi của mình)"""
+    message = EmailMessage(
+        to_email=to_email, template=template, context=context,
+        user_id=user_id, reference_id=reference_id, status=EmailStatusEnum.pending
+    )
+    db.add(message)
+    return message
+
+def send_welcome_email(db: Session, to_email: str, username: str):
+    """Gửi email chào mừng người dùng mới"""
+    return enqueue_email(db, to_email, "welcome", {"username": username})
+
+def _invitation_context(contest: Contest, username: str) -> dict:
+    return {
+        "username": username,
+        "contest_title": contest.title,
+        "contest_time": contest.start_time.strftime("%Y-%m-%d %H:%M UTC"),
+        "contest_url": f"{settings.APP_BASE_URL}/contests/{contest.id}",
+    }
+
+def send_contest_invitation(db: Session, to_email: str, username: str, contest: Contest, user_id: Optional[str] = None):
+    """Gửi lời mời tham gia cuộc thi"""
+    return enqueue_email(
+        db, to_email, "contest_invitation", _invitation_context(contest, username),
+        user_id=user_id, reference_id=contest.id
+    )
+
+def send_submission_result(db: Session, to_email: str, username: str, problem_title: str,
+                           status: str, score: Optional[int] = None):
+    """Gửi kết quả bài nộp"""
+    return enqueue_email(db, to_email, "submission_result", {
+        "username": username, "problem_title": problem_title, "status": status, "score": score,
+    })
+
+def invitation_recipients(contest_id: str, audience: str):
+    """Câu truy vấn (id, username, email) của người nhận lời mời chưa được mời"""
+    query = select(User.id, User.username, User.email).where(
+        User.is_active.is_(True),
+        ~exists().where(and_(
+            EmailMessage.template == "contest_invitation",
+            EmailMessage.reference_id == contest_id,
+            EmailMessage.user_id == User.id,
+        )),
+    )
+    if audience == "participants":
+        query = query.join(
+            ContestParticipant,
+            and_(ContestParticipant.user_id == User.id, ContestParticipant.contest_id == contest_id)
+        )
+    return query
+
+def queue_contest_invitations(contest_id: str, audience: str):
+    """
+    Thêm lời mời cho mọi người tham gia cuộc thi hoặc mọi người dùng vào
+    outbox (chạy nền). Người đã được mời cho cuộc thi này được bỏ qua, nên
+    gọi lại sau khi bị gián đoạn chỉ thêm phần còn thiếu.
+    """
+    db = SessionLocal()
+    try:
+        contest = db.query(Contest).filter(Contest.id == contest_id).first()
+        if contest is None:
+            return 0
+        table = EmailMessage.__table__
+        now = datetime.utcnow()
+        queued, last_id = 0, None
+        while True:
+            query = invitation_recipients(contest_id, audience).order_by(User.id).limit(ENQUEUE_BATCH_SIZE)
+            if last_id is not None:
+                query = query.where(User.id > last_id)
+            rows = db.execute(query).all()
+            if not rows:
+                break
+            db.execute(table.insert(), [
+                {
+                    "id": generate_uuid(), "to_email": row.email, "template": "contest_invitation",
+                    "context": _invitation_context(contest, row.username), "user_id": row.id,
+                    "reference_id": contest_id, "status": EmailStatusEnum.pending, "attempts": 0,
+                    "next_attempt_at": now, "created_at": now,
+                }
+                for row in rows
+            ])
+            db.commit()
+            queued += len(rows)
+            last_id = rows[-1].id
+        return queued
+    finally:
+        db.close()
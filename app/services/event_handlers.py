@@ -0,0 +1,34 @@
+"""
+Subscriber trong process của các sự kiện miền (xem app.events).
+"""
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.events import CONTEST_RATED, SUBMISSION_JUDGED, USER_CREATED, subscribe
+from app.models.problems import Problem
+from app.models.users import User
+from app.services import email_service, leaderboard_service
+
+@subscribe(USER_CREATED)
+def send_welcome(db: Session, event: dict):
+    user = db.query(User.email, User.username).filter(User.id == event["payload"]["user_id"]).first()
+    if user is not None:
+        email_service.send_welcome_email(db, user.email, user.username)
+
+@subscribe(SUBMISSION_JUDGED)
+def send_submission_result(db: Session, event: dict):
+    if not settings.EMAIL_SUBMISSION_RESULTS:
+        return
+    payload = event["payload"]
+    user = db.query(User.email, User.username).filter(User.id == payload["user_id"]).first()
+    problem = db.query(Problem.title).filter(Problem.id == payload["problem_id"]).first()
+    if user is not None and problem is not None:
+        email_service.send_submission_result(
+            db, user.email, user.username, problem.title, payload["status"],
+            payload["points"] if payload.get("contest_id") else None
+        )
+
+@subscribe(CONTEST_RATED)
+def refresh_leaderboard(db: Session, event: dict):
+    # Rating có thể được tính ở process khác (chạy tay): làm mới cache của worker này
+    leaderboard_service.invalidate()
@@ -0,0 +1,248 @@
+"""
+Relay của outbox sự kiện (xem app.events).
+
+Mỗi vòng, relay nhận tối đa EVENT_BATCH_SIZE sự kiện đến hạn theo thứ tự
+ghi (claim bằng UPDATE có điều kiện như dispatcher email), gọi subscriber
+trong process (mỗi subscriber một savepoint), gửi các sự kiện có subscriber
+thành công qua transport bên ngoài rồi đánh dấu đã giao trong cùng commit
+với thay đổi của subscriber. Sự kiện được thử lại sau
+EVENT_RETRY_BASE_SECONDS x 2^(lần thử - 1) (tối đa EVENT_RETRY_MAX_SECONDS):
+- subscriber lỗi: chỉ subscriber chưa xong được chạy lại; quá
+  EVENT_MAX_ATTEMPTS lần thì sự kiện bị đánh dấu failed;
+- transport lỗi: cả batch (kể cả thay đổi của subscriber) được hủy và thử lại.
+
+Transport (EVENT_TRANSPORT):
+- "none": chỉ subscriber trong process;
+- "file": ghi mỗi sự kiện một dòng JSON vào EVENT_SINK_PATH (thay thế cục
+  bộ cho message broker khi phát triển và kiểm thử);
+- "webhook": POST {"events": [...]} tới EVENT_WEBHOOK_URL, lỗi khi mã khác 2xx.
+
+Chạy riêng (không cần server API):
+    python -m app.services.event_relay
+"""
+import json
+import logging
+import os
+import threading
+import urllib.request
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import and_, or_, select, update
+
+from app import events
+from app.config import settings
+from app.database import SessionLocal, generate_uuid
+from app.models.events import EventStatusEnum, OutboxEvent
+from app.services import event_handlers  # noqa: F401  (đăng ký subscriber)
+
+logger = logging.getLogger(__name__)
+
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+class NullTransport:
+    def send(self, batch: List[dict]):
+        pass
+
+class FileTransport:
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def send(self, batch: List[dict]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(event, separators=(",", ":")) + "\n" for event in batch))
+            f.flush()
+            os.fsync(f.fileno())
+
+class WebhookTransport:
+    def __init__(self, url: str, timeout: float = 10):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, batch: List[dict]):
+        request = urllib.request.Request(
+            self.url, data=json.dumps({"events": batch}).encode(), method="POST",
+            headers={"Content-Type": "application/json"}
+        )
+        # urlopen báo lỗi HTTPError với mã 4xx/5xx
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+def create_transport(name: str):
+    if name == "none":
+        return NullTransport()
+    if name == "file":
+        return FileTransport(settings.EVENT_SINK_PATH)
+    if name == "webhook":
+        return WebhookTransport(settings.EVENT_WEBHOOK_URL)
+    raise ValueError(f"Unknown event transport: {name}")
+
+def serialize(event: OutboxEvent) -> dict:
+    return {
+        "id": event.id,
+        "topic": event.topic,
+        "payload": event.payload,
+        "created_at": event.created_at.isoformat() if event.created_at else None,
+    }
+
+class Relay:
+    def __init__(self, transport=None):
+        self.transport = transport or create_transport(settings.EVENT_TRANSPORT)
+
+    def claim(self, db) -> List[OutboxEvent]:
+        """Nhận một batch sự kiện đến hạn cho worker này"""
+        now = datetime.utcnow()
+        due = or_(
+            and_(OutboxEvent.status == EventStatusEnum.pending, OutboxEvent.next_attempt_at <= now),
+            and_(OutboxEvent.status == EventStatusEnum.relaying, OutboxEvent.claimed_at < now - CLAIM_TIMEOUT),
+        )
+        ids = db.execute(
+            select(OutboxEvent.id).where(due).order_by(OutboxEvent.id).limit(settings.EVENT_BATCH_SIZE)
+        ).scalars().all()
+        if not ids:
+            return []
+        token = generate_uuid()
+        db.execute(
+            update(OutboxEvent).where(OutboxEvent.id.in_(ids), due)
+            .values(status=EventStatusEnum.relaying, claim_token=token, claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return db.execute(
+            select(OutboxEvent).where(OutboxEvent.claim_token == token).order_by(OutboxEvent.id)
+        ).scalars().all()
+
+    def _run_handlers(self, db, event: OutboxEvent, data: dict) -> Optional[Exception]:
+        """
+        Chạy các subscriber chưa hoàn thành của sự kiện, mỗi subscriber trong
+        một savepoint; trả về lỗi đầu tiên (None nếu tất cả thành công).
+        """
+        done = list(event.completed_handlers or [])
+        error = None
+        for handler in events.subscribers(data["topic"]):
+            name = f"{handler.__module__}.{handler.__name__}"
+            if name in done:
+                continue
+            try:
+                with db.begin_nested():
+                    handler(db, data)
+            except Exception as exc:
+                logger.exception("Event handler %s failed for %s", name, data["id"])
+                error = error or exc
+            else:
+                done.append(name)
+        if done != (event.completed_handlers or []):
+            db.execute(
+                update(OutboxEvent).where(OutboxEvent.id == data["id"]).values(completed_handlers=done)
+                .execution_options(synchronize_session=False)
+            )
+        return error
+
+    def relay_once(self) -> int:
+        """Chuyển tiếp một batch, trả về số sự kiện đã xử lý"""
+        db = SessionLocal()
+        try:
+            claimed = self.claim(db)
+            if not claimed:
+                return 0
+            # Gia hạn claim trước khi chạy subscriber. Câu ghi này cũng mở transaction
+            # trước savepoint đầu tiên: pysqlite chỉ mở transaction trước câu ghi, nếu
+            # không thì RELEASE của savepoint sẽ commit luôn thay đổi của subscriber
+            db.execute(
+                update(OutboxEvent).where(OutboxEvent.id.in_([event.id for event in claimed]))
+                .values(claimed_at=datetime.utcnow()).execution_options(synchronize_session=False)
+            )
+            # Sự kiện có subscriber lỗi được thử lại riêng và chưa gửi ra ngoài
+            ready, failed = [], []
+            for event in claimed:
+                data = serialize(event)
+                error = self._run_handlers(db, event, data)
+                if error is None:
+                    ready.append((event, data))
+                else:
+                    failed.append((event, error))
+
+            if ready:
+                try:
+                    self.transport.send([data for _, data in ready])
+                except Exception as exc:
+                    # Hủy cả thay đổi của subscriber: chạy lại cùng lần gửi sau
+                    db.rollback()
+                    for event in claimed:
+                        self._retry(db, event, exc, give_up=False)
+                    db.commit()
+                    return len(claimed)
+
+                db.execute(
+                    update(OutboxEvent).where(OutboxEvent.id.in_([event.id for event, _ in ready]))
+                    .values(status=EventStatusEnum.delivered, delivered_at=datetime.utcnow(),
+                            attempts=OutboxEvent.attempts + 1, claim_token=None)
+                    .execution_options(synchronize_session=False)
+                )
+            for event, error in failed:
+                self._retry(db, event, error, give_up=True)
+            db.commit()
+            return len(claimed)
+        finally:
+            db.close()
+
+    def _retry(self, db, event: OutboxEvent, exc: Exception, give_up: bool):
+        """
+        Hẹn thử lại sự kiện với backoff. Lỗi của subscriber quá
+        EVENT_MAX_ATTEMPTS lần thì sự kiện bị đánh dấu failed; lỗi transport
+        được thử lại đến khi gửi được.
+        """
+        attempts = event.attempts + 1
+        values = {"attempts": attempts, "claim_token": None, "last_error": f"{type(exc).__name__}: {exc}"[:1000]}
+        if give_up and attempts >= settings.EVENT_MAX_ATTEMPTS:
+            values["status"] = EventStatusEnum.failed
+            logger.warning("Giving up on event %s (%s): %s", event.id, event.topic, values["last_error"])
+        else:
+            delay = min(settings.EVENT_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.EVENT_RETRY_MAX_SECONDS)
+            values["status"] = EventStatusEnum.pending
+            values["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning("Event %s failed (attempt %d): %s", event.id, attempts, values["last_error"])
+        db.execute(
+            update(OutboxEvent).where(OutboxEvent.id == event.id).values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+    def run(self, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                processed = self.relay_once()
+            except Exception:
+                logger.exception("Event relay failed")
+                processed = 0
+            if processed < settings.EVENT_BATCH_SIZE:
+                stop.wait(settings.EVENT_POLL_SECONDS)
+
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+def start_relay():
+    """Chạy relay trong thread nền của worker (bỏ qua nếu EVENT_RELAY_ENABLED tắt)"""
+    global _thread
+    if not settings.EVENT_RELAY_ENABLED or _thread is not None:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=Relay().run, args=(_stop,), name="event-relay", daemon=True)
+    _thread.start()
+
+def stop_relay():
+    global _thread
+    if _thread is None:
+        return
+    _stop.set()
+    _thread.join()
+    _thread = None
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        Relay().run(_stop)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,44 @@
+import threading
+import time
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.submissions import Submission, StatusEnum
+from app.ratelimit import too_many_requests
+
+# Độ sâu hàng đợi được đếm lại tối đa mỗi giây một lần trong mỗi worker
+DEPTH_CACHE_SECONDS = 1.0
+
+_depth = (0.0, 0)
+_depth_lock = threading.Lock()
+
+def pending_count(db: Session) -> int:
+    """Số bài nộp đang chờ chấm"""
+    global _depth
+    now = time.monotonic()
+    with _depth_lock:
+        expires_at, count = _depth
+        if expires_at > now:
+            return count
+    count = db.query(func.count(Submission.id)).filter(Submission.status == StatusEnum.pending).scalar()
+    with _depth_lock:
+        _depth = (now + DEPTH_CACHE_SECONDS, count)
+    return count
+
+def estimated_wait(db: Session) -> float:
+    """Thời gian chờ ước tính (giây) của một bài nộp mới"""
+    return pending_count(db) / settings.JUDGE_DRAIN_RATE
+
+def check_admission(db: Session):
+    """
+    Từ chối bài nộp mới (429) khi hàng đợi không thể chấm xong trong
+    JUDGE_QUEUE_SLA_SECONDS với tốc độ JUDGE_DRAIN_RATE.
+    """
+    wait = estimated_wait(db)
+    if wait > settings.JUDGE_QUEUE_SLA_SECONDS:
+        raise too_many_requests(
+            wait - settings.JUDGE_QUEUE_SLA_SECONDS,
+            detail="Judge queue is full, please retry later"
+        )
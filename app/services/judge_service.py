@@ -1,8 +1,26 @@
+import hashlib
 import random
+import threading
 import time
+from collections import OrderedDict
+from datetime import datetime
+
+from app import metrics
+from app.config import settings
 from app.models.submissions import Submission, StatusEnum
 from app.models.problems import Problem, TestCase
 
+# Thời gian biên dịch giả lập (giây) của các ngôn ngữ cần biên dịch
+COMPILE_SECONDS = {"c": 0.2, "cpp": 0.3, "pascal": 0.2}
+
+# Cache bản biên dịch theo hash (ngôn ngữ, mã nguồn): nộp lại cùng một mã
+# nguồn (rejudge, nộp vào nhiều bài) không phải biên dịch lại
+_compile_cache = OrderedDict()
+_compile_cache_lock = threading.Lock()
+
+def _language(submission: Submission) -> str:
+    return getattr(submission.language, "value", submission.language)
+
 def judge_submission(submission: Submission, problem: Problem):
     """
     Chấm bài nộp (giả lập)
@@ -18,8 +36,16 @@ def judge_submission(submission: Submission, problem: Problem):
     # 2. Chạy mã nguồn với các test cases
     # 3. Kiểm tra kết quả và giới hạn tài nguyên
     
-    # Giả lập thời gian xử lý
-    time.sleep(0.5)
+    language = _language(submission)
+    if submission.submitted_at:
+        metrics.JUDGE_QUEUE_WAIT.observe((), max(0.0, (datetime.utcnow() - submission.submitted_at).total_seconds()))
+    
+    compile_code(submission.code, language)
+    
+    # Giả lập thời gian chạy các test
+    start = time.perf_counter()
+    time.sleep(0.3)
+    metrics.JUDGE_RUN.observe((language,), time.perf_counter() - start)
     
     # Giả lập kết quả chấm bài với tỉ lệ thành công ngẫu nhiên
     rand_val = random.random()
@@ -41,16 +67,37 @@ def judge_submission(submission: Submission, problem: Problem):
     execution_time_ms = random.randint(10, problem.time_limit_ms - 10) if status != StatusEnum.time_limit_exceeded else problem.time_limit_ms + 100
     memory_used_kb = random.randint(1000, problem.memory_limit_kb - 1000) if status != StatusEnum.memory_limit_exceeded else problem.memory_limit_kb + 1000
     
+    metrics.JUDGE_VERDICTS.inc((language, status.value))
     return {
         "status": status,
         "execution_time_ms": execution_time_ms,
         "memory_used_kb": memory_used_kb
     }
 
-# Trong ứng dụng thực tế, bạn sẽ cần triển khai các hàm sau:
 def compile_code(code: str, language: str):
-    """Biên dịch mã nguồn"""
-    pass
+    """Biên dịch mã nguồn (giả lập), dùng lại bản đã biên dịch nếu có trong cache"""
+    key = hashlib.sha256(f"{language}\0{code}".encode()).hexdigest()
+    with _compile_cache_lock:
+        compiled = _compile_cache.get(key)
+        if compiled is not None:
+            _compile_cache.move_to_end(key)
+    if compiled is not None:
+        metrics.JUDGE_COMPILE_CACHE.inc(("hit",))
+        return compiled
+    
+    metrics.JUDGE_COMPILE_CACHE.inc(("miss",))
+    start = time.perf_counter()
+    time.sleep(COMPILE_SECONDS.get(language, 0))
+    compiled = {"language": language, "key": key}
+    metrics.JUDGE_COMPILE.observe((language,), time.perf_counter() - start)
+    
+    with _compile_cache_lock:
+        _compile_cache[key] = compiled
+        while len(_compile_cache) > settings.JUDGE_COMPILE_CACHE_SIZE:
+            _compile_cache.popitem(last=False)
+    return compiled
+
+# Trong ứng dụng thực tế, bạn sẽ cần triển khai các hàm sau:
 
 def run_test_case(compiled_code, test_case: TestCase, time_limit_ms: int, memory_limit_kb: int):
     """Chạy một test case và trả về kết quả"""
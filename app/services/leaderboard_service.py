@@ -0,0 +1,113 @@
+"""
+Bảng xếp hạng rating toàn hệ thống.
+
+- Trang đầu (LEADERBOARD_TOP_N người) được dựng từ index (rating, id) và
+  cache trong namespace LEADERBOARD; các trang sau dùng con trỏ trên cùng
+  index nên mỗi trang chỉ cần một lần seek.
+- Thứ hạng của một người là 1 + số người có rating cao hơn (đồng rating thì
+  cùng hạng). Thay vì COUNT trên bảng users cho mỗi lần tra, mỗi worker giữ
+  danh sách rating đã sắp xếp và tra bằng bisect (O(log n)).
+- Tính rating xong (hoặc admin sửa rating) thì namespace bị vô hiệu hóa:
+  trang đầu được dựng lại, danh sách rating của mọi worker dùng chung backend
+  cache được nạp lại ở lần tra kế tiếp. Với backend memory, worker khác thấy
+  thay đổi sau tối đa LEADERBOARD_REFRESH_SECONDS.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.cache import response_cache
+from app.config import settings
+from app.models.users import User
+from app.pagination import Keyset, encode_cursor
+
+LEADERBOARD = "leaderboard"
+
+# Thứ tự bảng xếp hạng: rating giảm dần, id để phân định khi trùng rating
+LEADERBOARD_KEYSET = Keyset(User.rating, User.id, descending=True)
+
+# Người dùng có mặt trên bảng xếp hạng
+RANKED = (User.is_active.is_(True), User.rating.isnot(None))
+
+class RankIndex:
+    """Rating (tăng dần) của mọi người trên bảng xếp hạng, trong một worker"""
+
+    def __init__(self):
+        self._ratings = array("q")
+        self._version: Optional[int] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _stale(self, version: int) -> bool:
+        return self._version != version or time.monotonic() >= self._expires_at
+
+    def ratings(self, db: Session) -> array:
+        version = response_cache.version(LEADERBOARD)
+        if self._stale(version):
+            with self._lock:
+                if self._stale(version):
+                    self._ratings = array("q", db.execute(
+                        select(User.rating).where(*RANKED).order_by(User.rating)
+                    ).scalars())
+                    self._version = version
+                    self._expires_at = time.monotonic() + settings.LEADERBOARD_REFRESH_SECONDS
+        return self._ratings
+
+    def rank(self, db: Session, rating: int) -> int:
+        ratings = self.ratings(db)
+        return len(ratings) - bisect_right(ratings, rating) + 1
+
+rank_index = RankIndex()
+
+def _entry(row, rank: int) -> dict:
+    return {"rank": rank, "id": row.id, "username": row.username, "full_name": row.full_name, "rating": row.rating}
+
+def _rows(db: Session, skip: int, limit: int, cursor: Optional[str] = None):
+    query = db.query(User.id, User.username, User.full_name, User.rating).filter(*RANKED)
+    return LEADERBOARD_KEYSET.paginate(query, skip, limit, cursor).all()
+
+def top_entries(db: Session) -> List[dict]:
+    """LEADERBOARD_TOP_N người đầu bảng (có cache), hạng tính theo vị trí"""
+    def build():
+        entries = []
+        for position, row in enumerate(_rows(db, 0, settings.LEADERBOARD_TOP_N), 1):
+            tied = entries and entries[-1]["rating"] == row.rating
+            entries.append(_entry(row, entries[-1]["rank"] if tied else position))
+        return entries
+
+    return response_cache.get_or_set(LEADERBOARD, "top", build, settings.LEADERBOARD_CACHE_TTL_SECONDS)
+
+def leaderboard_page(db: Session, skip: int, limit: int, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """Một trang bảng xếp hạng và con trỏ của trang kế tiếp"""
+    if not cursor and skip + limit <= settings.LEADERBOARD_TOP_N:
+        entries = top_entries(db)[skip:skip + limit]
+    else:
+        entries = [_entry(row, rank_index.rank(db, row.rating)) for row in _rows(db, skip, limit, cursor)]
+    if not entries or len(entries) < limit:
+        return entries, None
+    return entries, encode_cursor([entries[-1]["rating"], entries[-1]["id"]])
+
+def user_entry(db: Session, user_id: str) -> Optional[dict]:
+    """Dòng bảng xếp hạng của một người dùng (None nếu không có trên bảng)"""
+    row = db.query(User.id, User.username, User.full_name, User.rating).filter(User.id == user_id, *RANKED).first()
+    if row is None:
+        return None
+    return _entry(row, rank_index.rank(db, row.rating))
+
+def invalidate():
+    """Rating thay đổi: bỏ trang đầu đã cache và đánh dấu danh sách rating cần nạp lại"""
+    response_cache.invalidate(LEADERBOARD)
+
+async def invalidate_async():
+    """Như invalidate(), cho endpoint async"""
+    await response_cache.ainvalidate(LEADERBOARD)
+
+def refresh(db: Session):
+    """Vô hiệu hóa rồi dựng lại trang đầu ngay (sau khi tính rating xong)"""
+    invalidate()
+    top_entries(db)
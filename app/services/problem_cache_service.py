@@ -0,0 +1,41 @@
+"""
+Cache response cho đề bài và các trang danh sách bài toán.
+
+Đề bài giống nhau với mọi người xem nên được cache theo id và phiên bản
+của bài toán: sửa bài hoặc test mẫu làm tăng phiên bản nên mục cũ không còn
+được đọc. Trang danh sách phụ thuộc lớp quyền xem
+(admin thấy cả bài không public) nên khóa gồm lớp quyền và tham số lọc.
+Trạng thái đã giải (is_solved) là dữ liệu riêng từng người dùng, được gắn
+sau khi đọc cache.
+
+Bộ đếm solved_count/attempted_count không làm mất cache, có thể trễ tối đa
+CACHE_TTL_SECONDS.
+"""
+from app.cache import response_cache
+
+PROBLEM_DETAIL = "problem"
+PROBLEM_LIST = "problem-list"
+
+def detail_key(problem_id: str, version: int) -> str:
+    return f"{problem_id}:{version}"
+
+def visibility_class(user) -> str:
+    return "admin" if user.is_admin else "public"
+
+def list_key(user, **params) -> str:
+    """Khóa cache của một trang danh sách: lớp quyền xem và các tham số lọc"""
+    parts = [visibility_class(user)]
+    for name in sorted(params):
+        value = params[name]
+        if isinstance(value, list):
+            value = ",".join(sorted(value))
+        parts.append(f"{name}={'' if value is None else value}")
+    return "&".join(parts)
+
+def with_solved(payload: dict, solved: bool) -> dict:
+    """Bản sao của response đã cache kèm trạng thái đã giải của người xem"""
+    return dict(payload, is_solved=solved)
+
+def invalidate_problem_list():
+    """Bài toán được tạo/sửa/xóa: vô hiệu hóa mọi trang danh sách"""
+    response_cache.invalidate(PROBLEM_LIST)
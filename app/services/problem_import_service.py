@@ -0,0 +1,197 @@
+"""
+Nhập bài toán từ gói zip.
+
+Cấu trúc gói:
+    problem.json        title, difficulty, tags, time_limit_ms, memory_limit_kb,
+                        constraints, example_input, example_output, is_public,
+                        samples (danh sách số thứ tự các test mẫu)
+    statement.md        đề bài (hoặc trường "description" trong problem.json)
+    tests/1.in, tests/1.out, tests/2.in, ...
+"""
+import json
+import os
+import re
+import shutil
+import zipfile
+from datetime import datetime
+
+from app.config import settings
+from app.database import SessionLocal, generate_uuid
+from app.models.problems import Problem, TestCase, ProblemImportJob, DifficultyEnum, ImportStatusEnum
+from app.services import problem_cache_service, search_service, tag_service
+from app.services.storage import (
+    CHUNK_SIZE, SampleTooLarge, delete_unreferenced, stored_keys, test_case_fields, test_data_storage
+)
+
+_TEST_RE = re.compile(r"^(?:.*/)?tests/(\d+)\.(in|out)$")
+
+# Cập nhật tiến trình sau mỗi bao nhiêu test
+PROGRESS_EVERY = 10
+
+class PackageError(Exception):
+    """Gói bài toán không hợp lệ"""
+
+def _imports_dir():
+    return os.path.join(settings.TEST_DATA_DIR, ".imports")
+
+def create_job(db, upload, user) -> ProblemImportJob:
+    """
+    Tạo job nhập bài toán và chép gói zip đang upload ra đĩa (theo từng khối)
+    để xử lý nền sau khi request kết thúc.
+    """
+    job = ProblemImportJob(created_by=user.id, status=ImportStatusEnum.pending)
+    db.add(job)
+    db.flush()
+
+    os.makedirs(_imports_dir(), exist_ok=True)
+    with open(package_path(job.id), "wb") as target:
+        shutil.copyfileobj(upload, target, CHUNK_SIZE)
+
+    db.commit()
+    db.refresh(job)
+    return job
+
+def package_path(job_id: str) -> str:
+    return os.path.join(_imports_dir(), f"{job_id}.zip")
+
+def _find(archive: zipfile.ZipFile, basename: str):
+    """Tìm file theo tên, ở gốc gói hoặc trong một thư mục con"""
+    for info in archive.infolist():
+        if info.filename == basename or info.filename.endswith("/" + basename):
+            return info
+    return None
+
+def _read_json(archive: zipfile.ZipFile, basename: str):
+    info = _find(archive, basename)
+    if info is None:
+        raise PackageError(f"Missing {basename}")
+    try:
+        with archive.open(info) as f:
+            return json.load(f)
+    except ValueError as e:
+        raise PackageError(f"Invalid {basename}: {e}")
+
+def _collect_tests(archive: zipfile.ZipFile):
+    """Ghép các cặp (input, output) theo số thứ tự test"""
+    tests = {}
+    for info in archive.infolist():
+        match = _TEST_RE.match(info.filename)
+        if match and not info.is_dir():
+            tests.setdefault(int(match.group(1)), {})[match.group(2)] = info
+    for number, pair in tests.items():
+        if set(pair) != {"in", "out"}:
+            raise PackageError(f"Test {number} must have both .in and .out files")
+        for info in pair.values():
+            if info.file_size > settings.MAX_TEST_FILE_SIZE:
+                raise PackageError(f"{info.filename} exceeds {settings.MAX_TEST_FILE_SIZE} bytes")
+    return [(number, tests[number]["in"], tests[number]["out"]) for number in sorted(tests)]
+
+def _store_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+    """Ghi một file trong gói vào kho dữ liệu test mà không giải nén ra bộ nhớ"""
+    with archive.open(info) as source:
+        return test_data_storage.save_file(
+            source,
+            max_size=settings.MAX_TEST_FILE_SIZE,
+            inline_limit=settings.TEST_DATA_INLINE_LIMIT
+        )
+
+def _test_case_mapping(problem_id, number, order, is_sample, stored_input, stored_output):
+    try:
+        fields = test_case_fields(stored_input, stored_output, is_sample)
+    except SampleTooLarge as e:
+        raise PackageError(f"Test {number}: {e}")
+    return {"id": generate_uuid(), "problem_id": problem_id, "order": order, "is_sample": is_sample, **fields}
+
+def run_import(job_id: str):
+    """
+    Xử lý gói zip của job (chạy nền). Bài toán và toàn bộ metadata test case
+    được ghi trong một transaction; tiến trình được ghi riêng để client theo dõi.
+    """
+    job_db = SessionLocal()
+    db = SessionLocal()
+    path = package_path(job_id)
+    try:
+        job = job_db.query(ProblemImportJob).filter(ProblemImportJob.id == job_id).first()
+        if job is None:
+            return
+        job.status = ImportStatusEnum.running
+        job_db.commit()
+
+        # Các file đã ghi vào kho, để xác nhận sau commit hoặc dọn lại nếu job thất bại
+        written = []
+        try:
+            with zipfile.ZipFile(path) as archive:
+                meta = _read_json(archive, "problem.json")
+                statement = _find(archive, "statement.md")
+                description = archive.read(statement).decode("utf-8") if statement else meta.get("description")
+                if not meta.get("title") or not description:
+                    raise PackageError("Package must define a title and a statement")
+                try:
+                    difficulty = DifficultyEnum(meta.get("difficulty", "medium"))
+                except ValueError:
+                    raise PackageError(f"Unknown difficulty: {meta.get('difficulty')}")
+
+                tests = _collect_tests(archive)
+                job.total_tests = len(tests)
+                job_db.commit()
+
+                # Ghi dữ liệu test vào kho trước, ngoài transaction của bài toán
+                problem_id = generate_uuid()
+                samples = set(meta.get("samples", []))
+                rows = []
+                for order, (number, input_info, output_info) in enumerate(tests, start=1):
+                    stored_input = _store_entry(archive, input_info)
+                    written.append(stored_input)
+                    stored_output = _store_entry(archive, output_info)
+                    written.append(stored_output)
+                    rows.append(_test_case_mapping(
+                        problem_id, number, order, number in samples, stored_input, stored_output
+                    ))
+                    if order % PROGRESS_EVERY == 0:
+                        job.processed_tests = order
+                        job_db.commit()
+
+            # Bài toán, tags, test case và chỉ mục tìm kiếm: một transaction
+            problem = Problem(
+                id=problem_id,
+                title=meta["title"],
+                description=description,
+                difficulty=difficulty,
+                example_input=meta.get("example_input", ""),
+                example_output=meta.get("example_output", ""),
+                constraints=meta.get("constraints", ""),
+                is_public=meta.get("is_public", True),
+                time_limit_ms=meta.get("time_limit_ms", 1000),
+                memory_limit_kb=meta.get("memory_limit_kb", 262144),
+                created_by=job.created_by
+            )
+            db.add(problem)
+            tag_service.set_problem_tags(db, problem, meta.get("tags", []))
+            db.bulk_insert_mappings(TestCase, rows)
+            search_service.index_problem(db, problem)
+            db.commit()
+            test_data_storage.confirm(*written)
+            tag_service.invalidate_facets()
+            problem_cache_service.invalidate_problem_list()
+
+            job.processed_tests = len(tests)
+            job.problem_id = problem.id
+            job.status = ImportStatusEnum.completed
+        except (PackageError, zipfile.BadZipFile, UnicodeDecodeError) as e:
+            db.rollback()
+            job.status = ImportStatusEnum.failed
+            job.error = str(e)
+        except Exception as e:
+            db.rollback()
+            job.status = ImportStatusEnum.failed
+            job.error = f"Internal error: {e}"
+        if job.status == ImportStatusEnum.failed:
+            test_data_storage.discard(*written)
+            delete_unreferenced(db, stored_keys(*written))
+        job.finished_at = datetime.utcnow()
+        job_db.commit()
+    finally:
+        db.close()
+        job_db.close()
+        if os.path.exists(path):
+            os.remove(path)
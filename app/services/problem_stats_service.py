@@ -0,0 +1,158 @@
+from sqlalchemy import func, case, insert, select
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import Session
+
+from app.database import generate_uuid
+from app.models.problems import Problem
+from app.models.submissions import Submission, UserProblemStatus, StatusEnum
+
+# Thứ tự chọn bài nộp tốt nhất (dùng chung cho cập nhật dần và tính lại):
+# có thời gian chạy trước không có, thời gian thấp hơn trước, nộp sớm hơn thắng khi bằng nhau
+BEST_SUBMISSION_ORDER = (
+    Submission.execution_time_ms.is_(None),
+    Submission.execution_time_ms.asc(),
+    Submission.submitted_at.asc(),
+    Submission.id.asc(),
+)
+
+def _is_better(execution_time_ms, best_execution_time_ms) -> bool:
+    """Bài nộp mới có tốt hơn bài tốt nhất hiện tại (theo BEST_SUBMISSION_ORDER)"""
+    if execution_time_ms is None:
+        return False
+    return best_execution_time_ms is None or execution_time_ms < best_execution_time_ms
+
+def _insert_status_if_missing(db: Session, user_id: str, problem_id: str) -> bool:
+    """
+    Thêm dòng trạng thái (attempts = 0) nếu chưa có; trả về True nếu đã thêm.
+    Hai bài nộp đầu tiên chạy song song không vi phạm khóa duy nhất: bên
+    thua bỏ qua INSERT (MySQL chờ bên thắng commit) rồi khóa dòng đã có.
+    """
+    values = {"id": generate_uuid(), "user_id": user_id, "problem_id": problem_id, "attempts": 0, "solved": False}
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        statement = sqlite.insert(UserProblemStatus).values(**values).on_conflict_do_nothing(
+            index_elements=["user_id", "problem_id"]
+        )
+    else:
+        statement = insert(UserProblemStatus).values(**values).prefix_with("IGNORE", dialect="mysql")
+    return db.execute(statement).rowcount == 1
+
+def record_judge_result(db: Session, submission: Submission):
+    """
+    Cập nhật trạng thái giải bài của người dùng và bộ đếm của bài toán
+    sau khi một bài nộp được chấm.
+
+    Không commit: được gọi trong cùng transaction ghi kết quả chấm bài.
+    """
+    query = db.query(UserProblemStatus).filter(
+        UserProblemStatus.user_id == submission.user_id,
+        UserProblemStatus.problem_id == submission.problem_id
+    ).with_for_update()
+    status = query.first()
+
+    counters = {}
+    if status is None:
+        # FOR UPDATE không khóa được dòng chưa tồn tại: thêm (hoặc chờ bên thêm) rồi khóa
+        if _insert_status_if_missing(db, submission.user_id, submission.problem_id):
+            counters[Problem.attempted_count] = Problem.attempted_count + 1
+        status = query.one()
+
+    status.attempts += 1
+    status.last_submitted_at = submission.submitted_at
+
+    if submission.status == StatusEnum.accepted:
+        if not status.solved:
+            status.solved = True
+            status.first_accepted_at = submission.submitted_at
+            counters[Problem.solved_count] = Problem.solved_count + 1
+
+        if status.best_submission_id is None or _is_better(
+            submission.execution_time_ms, status.best_execution_time_ms
+        ):
+            status.best_submission_id = submission.id
+            status.best_execution_time_ms = submission.execution_time_ms
+
+    # Cập nhật bộ đếm bằng biểu thức trong SQL để không mất cập nhật khi chạy song song
+    if counters:
+        db.query(Problem).filter(Problem.id == submission.problem_id).update(
+            counters, synchronize_session=False
+        )
+
+    return status
+
+def rebuild_user_problem_status(db: Session, user_id: str, problem_id: str):
+    """
+    Tính lại trạng thái giải bài của một người dùng cho một bài toán từ bảng
+    submissions (dùng khi bài nộp bị xóa). Không commit.
+    """
+    accepted = Submission.status == StatusEnum.accepted
+    attempts, first_accepted_at, last_submitted_at = db.query(
+        func.count(Submission.id),
+        func.min(case((accepted, Submission.submitted_at))),
+        func.max(Submission.submitted_at)
+    ).filter(
+        Submission.user_id == user_id,
+        Submission.problem_id == problem_id,
+        Submission.status != StatusEnum.pending
+    ).one()
+
+    best = db.query(Submission.id, Submission.execution_time_ms).filter(
+        Submission.user_id == user_id,
+        Submission.problem_id == problem_id,
+        accepted
+    ).order_by(*BEST_SUBMISSION_ORDER).first()
+
+    status = db.query(UserProblemStatus).filter(
+        UserProblemStatus.user_id == user_id,
+        UserProblemStatus.problem_id == problem_id
+    ).with_for_update().first()
+
+    was_attempted = status is not None
+    was_solved = bool(status and status.solved)
+
+    counters = {}
+    if attempts == 0:
+        if status is not None:
+            db.delete(status)
+    else:
+        if status is None:
+            status = UserProblemStatus(user_id=user_id, problem_id=problem_id)
+            db.add(status)
+        status.attempts = attempts
+        status.solved = best is not None
+        status.first_accepted_at = first_accepted_at
+        status.last_submitted_at = last_submitted_at
+        status.best_submission_id = best.id if best else None
+        status.best_execution_time_ms = best.execution_time_ms if best else None
+
+    is_attempted = attempts > 0
+    is_solved = best is not None
+    if is_attempted != was_attempted:
+        counters[Problem.attempted_count] = Problem.attempted_count + (1 if is_attempted else -1)
+    if is_solved != was_solved:
+        counters[Problem.solved_count] = Problem.solved_count + (1 if is_solved else -1)
+    if counters:
+        db.query(Problem).filter(Problem.id == problem_id).update(
+            counters, synchronize_session=False
+        )
+
+def solved_problem_ids(db: Session, user_id: str, problem_ids):
+    """Tập id các bài toán (trong danh sách cho trước) mà người dùng đã giải"""
+    if not problem_ids:
+        return set()
+    rows = db.query(UserProblemStatus.problem_id).filter(
+        UserProblemStatus.user_id == user_id,
+        UserProblemStatus.problem_id.in_(problem_ids),
+        UserProblemStatus.solved == True
+    ).all()
+    return {row.problem_id for row in rows}
+
+async def is_solved_async(db, user_id: str, problem_id: str) -> bool:
+    """Như solved_problem_ids cho một bài, dùng AsyncSession"""
+    solved = await db.scalar(
+        select(UserProblemStatus.solved).where(
+            UserProblemStatus.user_id == user_id,
+            UserProblemStatus.problem_id == problem_id
+        )
+    )
+    return bool(solved)
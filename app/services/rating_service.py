@@ -0,0 +1,239 @@
+"""
+Tính rating sau cuộc thi theo thuật toán của Codeforces (Elo).
+
+Với mỗi người tham gia i có rating r_i và thứ hạng rank_i:
+- seed_i = 1 + tổng xác suất người khác thắng i, với
+  P(j thắng i) = 1 / (1 + 10^((r_i - r_j) / 400));
+- rating "xứng đáng" R_i là rating có seed bằng sqrt(rank_i x seed_i);
+- delta_i = (R_i - r_i) / 2, sau đó hiệu chỉnh để tổng delta xấp xỉ 0 và
+  nhóm rating cao nhất không được tăng chung.
+
+Thay vì so từng cặp (O(n^2) với n người), seed được tính cho mọi rating
+nguyên trên một lưới bằng một phép tích chập giữa số người theo rating và
+đường xác suất thắng: O(V^2) với V là khoảng rating (vài nghìn), không phụ
+thuộc n. Dùng NumPy nếu đã cài; không có NumPy thì tính bằng Python thuần
+(cùng kết quả, chậm hơn nhiều với cuộc thi lớn).
+
+Người tham gia được tính là người đăng ký và có ít nhất một bài nộp trong
+cuộc thi; người chưa có lịch sử rating bắt đầu từ RATING_INITIAL.
+
+Chạy tay:
+    python -m app.services.rating_service <contest_id>
+"""
+import logging
+import math
+import sys
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import exists, or_, select, update
+from sqlalchemy.orm import Session
+
+from app import events
+from app.config import settings
+from app.database import SessionLocal, generate_uuid
+from app.models.contests import Contest, ContestParticipant, RatingHistory
+from app.models.submissions import Submission
+from app.models.users import User
+from app.services import leaderboard_service
+
+try:
+    import numpy as np
+except ImportError:  # NumPy là tùy chọn
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Lưới rating được mở rộng bấy nhiêu điểm về hai phía của rating thấp/cao
+# nhất: xa hơn thì xác suất thắng/thua đã nhỏ hơn 1e-9
+GRID_MARGIN = 4000
+BATCH_SIZE = 1000
+
+def _div(a: int, b: int) -> int:
+    """Chia nguyên làm tròn về 0 (như phép chia số nguyên trong bản gốc của Codeforces)"""
+    quotient = abs(a) // abs(b)
+    return quotient if (a >= 0) == (b > 0) else -quotient
+
+def ranks_from_scores(scores: Sequence[int]) -> List[int]:
+    """Thứ hạng theo điểm giảm dần; những người bằng điểm cùng nhận hạng thấp nhất của nhóm"""
+    ordered = sorted(scores, reverse=True)
+    # Số người có điểm >= s (ordered giảm dần nên đếm qua vị trí của -s)
+    negated = [-score for score in ordered]
+    return [bisect_right(negated, -score) for score in scores]
+
+def _seed_curve_numpy(ratings, lo, hi):
+    counts = np.bincount(np.asarray(ratings) - lo, minlength=hi - lo + 1).astype(np.float64)
+    # kernel[k] = P(người có rating v thắng người có rating R) với R - v = k - (hi - lo)
+    diffs = np.arange(-(hi - lo), hi - lo + 1, dtype=np.float64)
+    kernel = 1.0 / (1.0 + np.power(10.0, diffs / 400.0))
+    # seed[R] = 1 + sum_v counts[v] * kernel[R - v]
+    return 1.0 + np.convolve(counts, kernel)[hi - lo:2 * (hi - lo) + 1]
+
+def _seed_curve_python(ratings, lo, hi):
+    counts = {}
+    for rating in ratings:
+        counts[rating] = counts.get(rating, 0) + 1
+    return [
+        1.0 + sum(count / (1.0 + 10.0 ** ((grid - rating) / 400.0)) for rating, count in counts.items())
+        for grid in range(lo, hi + 1)
+    ]
+
+def compute_deltas(ratings: Sequence[int], ranks: Sequence[int], use_numpy: Optional[bool] = None) -> List[int]:
+    """Mức thay đổi rating của từng người theo thứ tự đầu vào"""
+    n = len(ratings)
+    if n < 2:
+        return [0] * n
+    if use_numpy is None:
+        use_numpy = np is not None
+
+    lo = min(ratings) - GRID_MARGIN
+    hi = max(ratings) + GRID_MARGIN
+    if use_numpy:
+        seed = _seed_curve_numpy(ratings, lo, hi)
+        r = np.asarray(ratings)
+        # Bỏ chính mình (P(i thắng i) = 0.5) khỏi seed của i
+        own_seed = seed[r - lo] - 0.5
+        mid_rank = np.sqrt(np.asarray(ranks, dtype=np.float64) * own_seed)
+        # seed giảm dần theo R: R_i là rating lớn nhất có seed >= mid_rank
+        index = np.searchsorted(-seed, -mid_rank, side="right") - 1
+        diffs = np.clip(index, 0, None) + lo - r
+        deltas = np.sign(diffs) * (np.abs(diffs) // 2)
+        # Tổng delta xấp xỉ 0 (hơi âm để rating không lạm phát)
+        deltas = deltas + (_div(-int(deltas.sum()), n) - 1)
+        # Nhóm rating cao nhất không được tăng chung
+        top = min(n, 4 * round(math.sqrt(n)))
+        top_sum = int(deltas[np.argsort(-r, kind="stable")[:top]].sum())
+        deltas = deltas + min(max(_div(-top_sum, top), -10), 0)
+        return deltas.astype(int).tolist()
+
+    seed = _seed_curve_python(ratings, lo, hi)
+    negated = [-value for value in seed]
+    deltas = []
+    for rating, rank in zip(ratings, ranks):
+        mid_rank = math.sqrt(rank * (seed[rating - lo] - 0.5))
+        index = bisect_right(negated, -mid_rank) - 1
+        deltas.append(_div(max(index, 0) + lo - rating, 2))
+    correction = _div(-sum(deltas), n) - 1
+    deltas = [delta + correction for delta in deltas]
+    top = min(n, 4 * round(math.sqrt(n)))
+    order = sorted(range(n), key=lambda i: -ratings[i])[:top]
+    correction = min(max(_div(-sum(deltas[i] for i in order), top), -10), 0)
+    return [delta + correction for delta in deltas]
+
+def claim_contest(db: Session, contest_id: str) -> datetime:
+    """
+    Nhận việc tính rating của cuộc thi (409 nếu đã tính hoặc đang tính, 400
+    nếu chưa kết thúc), trả về thời điểm nhận dùng làm khóa của lần chạy.
+    Dùng UPDATE có điều kiện nên hai yêu cầu đồng thời chỉ một yêu cầu thắng;
+    lần nhận quá RATING_CLAIM_TIMEOUT_SECONDS (worker đã chết) được nhận lại.
+    """
+    contest = db.query(Contest.end_time).filter(Contest.id == contest_id).first()
+    if not contest:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contest not found")
+    if contest.end_time > datetime.utcnow():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Contest has not ended yet")
+    # Bỏ phần lẻ giây để so sánh bằng được với giá trị đã lưu (DATETIME của MySQL)
+    now = datetime.utcnow().replace(microsecond=0)
+    claimed = db.execute(
+        update(Contest).where(
+            Contest.id == contest_id,
+            Contest.rated_at.is_(None),
+            or_(Contest.rating_claimed_at.is_(None),
+                Contest.rating_claimed_at < now - timedelta(seconds=settings.RATING_CLAIM_TIMEOUT_SECONDS)),
+        ).values(rating_claimed_at=now).execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if not claimed:
+        rated = db.query(Contest.rated_at).filter(Contest.id == contest_id).scalar()
+        detail = "Contest is already rated" if rated is not None else "Contest rating is in progress"
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+    return now
+
+def _release_claim(db: Session, contest_id: str, claimed_at: datetime):
+    db.execute(
+        update(Contest).where(Contest.id == contest_id, Contest.rating_claimed_at == claimed_at)
+        .values(rating_claimed_at=None).execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+def apply_ratings(db: Session, contest_id: str) -> int:
+    """Tính và ghi rating mới cho người tham gia (không commit), trả về số người"""
+    rows = db.execute(
+        select(ContestParticipant.user_id, ContestParticipant.score, User.rating)
+        .join(User, User.id == ContestParticipant.user_id)
+        .where(
+            ContestParticipant.contest_id == contest_id,
+            exists().where(Submission.contest_id == contest_id, Submission.user_id == ContestParticipant.user_id),
+        )
+    ).all()
+    if not rows:
+        return 0
+    rated_before = set(db.execute(
+        select(RatingHistory.user_id).where(RatingHistory.user_id.in_([row.user_id for row in rows])).distinct()
+    ).scalars())
+    ratings = [
+        row.rating if row.user_id in rated_before and row.rating is not None else settings.RATING_INITIAL
+        for row in rows
+    ]
+    ranks = ranks_from_scores([row.score or 0 for row in rows])
+    deltas = compute_deltas(ratings, ranks)
+
+    for start in range(0, len(rows), BATCH_SIZE):
+        end = start + BATCH_SIZE
+        # UPDATE theo khóa chính hàng loạt (executemany)
+        db.execute(update(User), [
+            {"id": row.user_id, "rating": rating + delta}
+            for row, rating, delta in zip(rows[start:end], ratings[start:end], deltas[start:end])
+        ])
+        db.execute(RatingHistory.__table__.insert(), [
+            {"id": generate_uuid(), "user_id": row.user_id, "contest_id": contest_id, "rank": rank,
+             "old_rating": rating, "new_rating": rating + delta, "created_at": datetime.utcnow()}
+            for row, rating, rank, delta in zip(rows[start:end], ratings[start:end], ranks[start:end], deltas[start:end])
+        ])
+    events.publish(db, events.CONTEST_RATED, {"contest_id": contest_id, "participants": len(rows)})
+    return len(rows)
+
+def run_rating(contest_id: str, claimed_at: datetime):
+    """
+    Tính rating của cuộc thi đã được claim (chạy nền). Rating mới và dấu đã
+    tính được ghi trong một commit, chỉ khi lần nhận vẫn còn hiệu lực; lỗi
+    thì trả lại lần nhận để chạy lại.
+    """
+    db = SessionLocal()
+    try:
+        # Đánh dấu đã tính trước (khóa dòng cuộc thi): lần nhận đã hết hạn và bị
+        # worker khác nhận lại thì bỏ, không ghi rating hai lần
+        finished = db.execute(
+            update(Contest).where(
+                Contest.id == contest_id, Contest.rated_at.is_(None), Contest.rating_claimed_at == claimed_at
+            ).values(rated_at=datetime.utcnow(), rating_claimed_at=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not finished:
+            db.rollback()
+            logger.warning("Rating claim for contest %s was lost, skipping", contest_id)
+            return
+        count = apply_ratings(db, contest_id)
+        db.commit()
+        logger.info("Rated contest %s: %d participants", contest_id, count)
+    except Exception:
+        db.rollback()
+        logger.exception("Rating contest %s failed", contest_id)
+        _release_claim(db, contest_id, claimed_at)
+    else:
+        leaderboard_service.refresh(db)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    session = SessionLocal()
+    try:
+        claimed_at = claim_contest(session, sys.argv[1])
+    except HTTPException as exc:
+        sys.exit(exc.detail)
+    finally:
+        session.close()
+    run_rating(sys.argv[1], claimed_at)
@@ -0,0 +1,149 @@
+import json
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List
+
+from sqlalchemy import case, func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models.search import SearchTerm
+
+# Loại tài liệu trong chỉ mục
+PROBLEM = "problem"
+CONTEST = "contest"
+
+# Trọng số theo trường: khớp tiêu đề quan trọng hơn tag, tag hơn mô tả
+TITLE_WEIGHT = 10
+TAG_WEIGHT = 5
+DESCRIPTION_WEIGHT = 1
+
+# Từ khớp chính xác được nhân đôi điểm so với chỉ khớp tiền tố
+EXACT_MATCH_BONUS = 2
+
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def normalize_text(text: str) -> str:
+    """
+    Chuẩn hóa văn bản để tìm kiếm: chữ thường, bỏ dấu tiếng Việt
+    ("Đường đi ngắn nhất" -> "duong di ngan nhat").
+    """
+    text = text.replace("đ", "d").replace("Đ", "D")
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+def tokenize(text: str) -> List[str]:
+    """Tách văn bản đã chuẩn hóa thành các từ"""
+    if not text:
+        return []
+    return [token[:MAX_TERM_LENGTH] for token in _TOKEN_RE.findall(normalize_text(text))]
+
+def _parse_tags(tags) -> List[str]:
+    # Dữ liệu cũ có thể lưu tags dưới dạng chuỗi JSON
+    if isinstance(tags, str):
+        try:
+            tags = json.loads(tags)
+        except ValueError:
+            return [tags]
+    return list(tags or [])
+
+def _term_weights(*fields) -> Dict[str, int]:
+    """Tính trọng số từng từ từ các cặp (văn bản, trọng số trường)"""
+    weights = Counter()
+    for text, field_weight in fields:
+        for token in tokenize(text):
+            weights[token] += field_weight
+    return weights
+
+def _replace_terms(db: Session, doc_type: str, doc_id: str, weights: Dict[str, int]):
+    remove_document(db, doc_type, doc_id)
+    db.bulk_insert_mappings(SearchTerm, [
+        {"doc_type": doc_type, "term": term, "doc_id": doc_id, "weight": weight}
+        for term, weight in weights.items()
+    ])
+
+def index_problem(db: Session, problem):
+    """Cập nhật chỉ mục cho một bài toán (không commit)"""
+    weights = _term_weights(
+        (problem.title, TITLE_WEIGHT),
+        (" ".join(_parse_tags(problem.tags)), TAG_WEIGHT),
+        (problem.description, DESCRIPTION_WEIGHT),
+    )
+    _replace_terms(db, PROBLEM, problem.id, weights)
+
+def index_contest(db: Session, contest):
+    """Cập nhật chỉ mục cho một cuộc thi (không commit)"""
+    weights = _term_weights(
+        (contest.title, TITLE_WEIGHT),
+        (contest.description, DESCRIPTION_WEIGHT),
+    )
+    _replace_terms(db, CONTEST, contest.id, weights)
+
+def remove_document(db: Session, doc_type: str, doc_id: str):
+    """Xóa toàn bộ từ của một tài liệu khỏi chỉ mục (không commit)"""
+    db.query(SearchTerm).filter(
+        SearchTerm.doc_type == doc_type,
+        SearchTerm.doc_id == doc_id
+    ).delete(synchronize_session=False)
+
+def _prefix_upper_bound(prefix: str) -> str:
+    # Các từ chỉ gồm [a-z0-9] nên tăng ký tự cuối là đủ tạo cận trên
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def search_subquery(doc_type: str, query: str):
+    """
+    Subquery (doc_id, score) các tài liệu khớp với mọi từ trong chuỗi tìm kiếm.
+
+    Mỗi từ được so khớp theo tiền tố bằng điều kiện khoảng (term >= x AND
+    term < x'), dùng được clustered index của search_terms. Trả về None nếu
+    chuỗi tìm kiếm không có từ nào.
+    """
+    tokens = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not tokens:
+        return None
+
+    per_token = []
+    for i, token in enumerate(tokens):
+        if len(token) > 1:
+            match = (SearchTerm.term >= token) & (SearchTerm.term < _prefix_upper_bound(token))
+        else:
+            match = SearchTerm.term == token
+        score = SearchTerm.weight * case((SearchTerm.term == token, EXACT_MATCH_BONUS), else_=1)
+        per_token.append(
+            select(
+                SearchTerm.doc_id.label("doc_id"),
+                literal(i).label("token"),
+                func.max(score).label("score")
+            ).where(
+                SearchTerm.doc_type == doc_type,
+                match
+            ).group_by(SearchTerm.doc_id)
+        )
+
+    matches = union_all(*per_token).subquery()
+    return select(
+        matches.c.doc_id.label("doc_id"),
+        func.sum(matches.c.score).label("score")
+    ).group_by(matches.c.doc_id).having(
+        func.count(matches.c.token) == len(tokens)
+    ).subquery()
+
+def reindex_all(db: Session):
+    """Xây lại toàn bộ chỉ mục từ bảng problems và contests (không commit)"""
+    from app.models.contests import Contest
+    from app.models.problems import Problem
+
+    db.query(SearchTerm).delete(synchronize_session=False)
+    # Chỉ đọc các cột cần cho chỉ mục, theo từng lô id
+    sources = (
+        (Problem, (Problem.id, Problem.title, Problem.description, Problem.tags), index_problem),
+        (Contest, (Contest.id, Contest.title, Contest.description), index_contest),
+    )
+    for model, columns, index in sources:
+        ids = [row.id for row in db.query(model.id)]
+        for start in range(0, len(ids), 500):
+            for document in db.query(*columns).filter(model.id.in_(ids[start:start + 500])):
+                index(db, document)
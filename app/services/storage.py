@@ -0,0 +1,181 @@
+import hashlib
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.problems import TestCase
+
+CHUNK_SIZE = 1024 * 1024
+
+class FileTooLarge(Exception):
+    """Dữ liệu vượt quá kích thước cho phép"""
+
+class SampleTooLarge(Exception):
+    """Test mẫu phải đủ nhỏ để lưu trực tiếp và hiển thị trong đề bài"""
+
+@dataclass
+class StoredFile:
+    key: str
+    size: int
+    sha256: str
+    # Nội dung (chỉ có khi nhỏ hơn ngưỡng lưu trực tiếp)
+    inline: Optional[bytes] = None
+    # Bản giữ tạm (hard link) của dữ liệu, giữ đến khi metadata được commit
+    pending: Optional[str] = None
+
+class TestDataStorage:
+    """
+    Lưu dữ liệu test trên đĩa theo địa chỉ nội dung (sha256).
+
+    Dữ liệu được ghi theo từng khối vào file tạm và băm đồng thời, nên file
+    lớn không bao giờ nằm trọn trong bộ nhớ. Hai test giống nhau dùng chung
+    một file.
+
+    Một file đang có có thể bị delete_unreferenced xóa trong lúc test mới
+    dùng lại nó chưa commit. Vì vậy người ghi giữ file tạm của mình (pending)
+    đến sau khi commit rồi gọi confirm() để đặt lại file nếu đã mất; người
+    xóa đổi tên file sang chỗ khác trước, kiểm tra tham chiếu lần nữa rồi mới
+    xóa hẳn hoặc trả lại.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def save_stream(self, chunks: Iterable[bytes], max_size: Optional[int] = None,
+                    inline_limit: int = 0) -> StoredFile:
+        """Ghi dữ liệu từ các khối byte, trả về khóa (sha256) và kích thước"""
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        head = bytearray()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise FileTooLarge(f"File exceeds {max_size} bytes")
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    if size <= inline_limit:
+                        head.extend(chunk)
+            key = digest.hexdigest()
+            # Dữ liệu nhỏ được lưu trong database, không cần file trong kho
+            if size <= inline_limit:
+                os.remove(tmp_path)
+                return StoredFile(key=key, size=size, sha256=key, inline=bytes(head))
+            self._link(tmp_path, key)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return StoredFile(key=key, size=size, sha256=key, pending=tmp_path)
+
+    def _link(self, source: str, key: str):
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(source, target)
+        except FileExistsError:
+            pass
+
+    def confirm(self, *files: StoredFile):
+        """Metadata đã commit: đặt lại file nếu đã bị xóa giữa chừng, bỏ bản giữ tạm"""
+        for stored in files:
+            if stored.pending is not None:
+                self._link(stored.pending, stored.key)
+        self.discard(*files)
+
+    def discard(self, *files: StoredFile):
+        """Bỏ bản giữ tạm (metadata không được ghi)"""
+        for stored in files:
+            if stored.pending is not None and os.path.exists(stored.pending):
+                os.remove(stored.pending)
+            stored.pending = None
+
+    def save_file(self, source: BinaryIO, **kwargs) -> StoredFile:
+        """Ghi dữ liệu từ một file-like object"""
+        return self.save_stream(iter(lambda: source.read(CHUNK_SIZE), b""), **kwargs)
+
+    def read(self, key: str, start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        """Đọc một đoạn dữ liệu theo từng khối"""
+        with open(self.path(key), "rb") as f:
+            f.seek(start)
+            remaining = length
+            while remaining is None or remaining > 0:
+                chunk = f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def hide(self, key: str) -> Optional[str]:
+        """Đổi tên file ra khỏi kho (bước đầu của việc xóa), trả về đường dẫn mới"""
+        hidden = os.path.join(self.root, f".deleted-{key}-{uuid.uuid4().hex}")
+        try:
+            os.replace(self.path(key), hidden)
+        except FileNotFoundError:
+            return None
+        return hidden
+
+    def restore(self, key: str, hidden: str):
+        """Trả lại file đã đổi tên bằng hide()"""
+        os.makedirs(os.path.dirname(self.path(key)), exist_ok=True)
+        os.replace(hidden, self.path(key))
+
+def stored_keys(*files: StoredFile) -> set:
+    """Khóa của các file đã được ghi vào kho (không tính dữ liệu lưu trực tiếp)"""
+    return {stored.key for stored in files if stored.inline is None}
+
+def _referenced(db: Session, key: str) -> bool:
+    return db.query(TestCase.id).filter(
+        (TestCase.input_sha256 == key) | (TestCase.output_sha256 == key)
+    ).first() is not None
+
+def delete_unreferenced(db: Session, keys: Iterable[str]):
+    """
+    Xóa khỏi kho các file không còn test case nào (đã commit) tham chiếu.
+    Gọi sau commit: session được rollback để lần kiểm tra sau thấy dữ liệu
+    mới nhất.
+    """
+    for key in set(keys) - {None}:
+        if _referenced(db, key):
+            continue
+        hidden = test_data_storage.hide(key)
+        if hidden is None:
+            continue
+        # Test mới dùng lại file có thể vừa commit: kiểm tra lại trên snapshot mới
+        db.rollback()
+        if _referenced(db, key):
+            test_data_storage.restore(key, hidden)
+        else:
+            os.remove(hidden)
+
+def test_case_fields(stored_input: StoredFile, stored_output: StoredFile, is_sample: bool) -> dict:
+    """
+    Giá trị các cột dữ liệu của TestCase từ hai file đã lưu: dữ liệu nhỏ được
+    giữ trong database, dữ liệu lớn chỉ lưu sha256 để đọc từ kho.
+    """
+    fields = {"input_size": stored_input.size, "output_size": stored_output.size}
+    for prefix, column, stored in (("input", "input", stored_input),
+                                   ("output", "expected_output", stored_output)):
+        if stored.inline is not None:
+            fields[column] = stored.inline.decode("utf-8", errors="replace")
+            fields[f"{prefix}_sha256"] = None
+        elif is_sample:
+            raise SampleTooLarge(f"Sample tests must be at most {settings.TEST_DATA_INLINE_LIMIT} bytes")
+        else:
+            fields[column] = ""
+            fields[f"{prefix}_sha256"] = stored.sha256
+    return fields
+
+test_data_storage = TestDataStorage(settings.TEST_DATA_DIR)
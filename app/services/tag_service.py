@@ -0,0 +1,94 @@
+from typing import Iterable, List
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.cache import response_cache
+from app.models.problems import Problem, Tag, ProblemTag
+
+# Namespace cache và thời gian sống của bộ đếm facet
+FACET_CACHE_NAMESPACE = "problem-facets"
+FACET_CACHE_TTL_SECONDS = 60
+
+def normalize_tags(names: Iterable[str]) -> List[str]:
+    """Chuẩn hóa tên tag: bỏ khoảng trắng thừa, chữ thường, loại trùng (giữ thứ tự)"""
+    result = []
+    for name in names or []:
+        # Cắt theo độ dài cột trước khi so trùng: hai tên dài khác nhau ở phần
+        # bị cắt vẫn là cùng một tag
+        name = " ".join(str(name).split()).lower()[:50].rstrip()
+        if name and name not in result:
+            result.append(name)
+    return result
+
+def set_problem_tags(db: Session, problem: Problem, names: Iterable[str]):
+    """
+    Gán danh sách tag cho bài toán: cập nhật bảng problem_tags và bản sao
+    trong cột problems.tags. Không commit.
+    """
+    names = normalize_tags(names)
+
+    existing = {
+        tag.name: tag for tag in db.query(Tag).filter(Tag.name.in_(names))
+    } if names else {}
+    for name in names:
+        if name not in existing:
+            tag = Tag(name=name)
+            db.add(tag)
+            existing[name] = tag
+    db.flush()
+
+    # Giữ lại liên kết đã có, chỉ thêm mới/xóa phần khác biệt
+    current = {link.tag_id: link for link in problem.tag_links}
+    problem.tag_links = [
+        current.get(existing[name].id) or ProblemTag(tag_id=existing[name].id)
+        for name in names
+    ]
+    problem.tags = names
+
+def filter_by_tags(query, names: Iterable[str]):
+    """Lọc các bài toán có đủ tất cả các tag cho trước"""
+    names = normalize_tags(names)
+    if not names:
+        return query
+    matching = select(ProblemTag.problem_id).join(
+        Tag, Tag.id == ProblemTag.tag_id
+    ).where(
+        Tag.name.in_(names)
+    ).group_by(ProblemTag.problem_id).having(func.count() == len(names))
+    return query.filter(Problem.id.in_(matching))
+
+def get_facets(db: Session, public_only: bool):
+    """
+    Số bài toán theo từng tag và từng độ khó, có cache theo lớp quyền xem
+    (public hoặc admin).
+    """
+    key = "public" if public_only else "all"
+    cached = response_cache.get(FACET_CACHE_NAMESPACE, key)
+    if cached is not None:
+        return cached
+
+    tag_query = db.query(Tag.name, func.count(ProblemTag.problem_id)).join(
+        ProblemTag, ProblemTag.tag_id == Tag.id
+    )
+    difficulty_query = db.query(Problem.difficulty, func.count(Problem.id))
+    if public_only:
+        tag_query = tag_query.join(Problem, Problem.id == ProblemTag.problem_id).filter(Problem.is_public == True)
+        difficulty_query = difficulty_query.filter(Problem.is_public == True)
+
+    facets = {
+        "tags": [
+            {"name": name, "count": count}
+            for name, count in tag_query.group_by(Tag.name).order_by(func.count(ProblemTag.problem_id).desc(), Tag.name)
+        ],
+        "difficulties": [
+            {"name": difficulty.value, "count": count}
+            for difficulty, count in difficulty_query.group_by(Problem.difficulty)
+        ],
+    }
+    response_cache.set(FACET_CACHE_NAMESPACE, key, facets, FACET_CACHE_TTL_SECONDS)
+    return facets
+
+def invalidate_facets():
+    """Xóa cache facet sau khi bài toán thay đổi"""
+    response_cache.invalidate(FACET_CACHE_NAMESPACE)
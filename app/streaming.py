@@ -0,0 +1,81 @@
+import re
+from typing import Callable, Iterator, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Phân tích header Range (một khoảng byte), trả về (start, end) bao gồm end.
+
+    Trả về None nếu không có Range hoặc Range không đúng cú pháp (khi đó trả
+    toàn bộ nội dung), báo lỗi 416 nếu khoảng nằm ngoài dữ liệu.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # bytes=-N: N byte cuối (dữ liệu rỗng thì không có byte nào để trả)
+        length = int(last)
+        if length == 0 or size == 0:
+            raise _not_satisfiable(size)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise _not_satisfiable(size)
+    return start, end
+
+def _not_satisfiable(size: int):
+    return HTTPException(
+        status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}"}
+    )
+
+def ranged_response(
+    read: Callable[[int, int], Iterator[bytes]],
+    size: int,
+    range_header: Optional[str],
+    media_type: str = "text/plain; charset=utf-8",
+    filename: Optional[str] = None
+) -> StreamingResponse:
+    """
+    Tạo StreamingResponse hỗ trợ Range.
+
+    `read(start, length)` trả về các khối byte của đoạn dữ liệu cần gửi, nên
+    nội dung không phải nằm trọn trong bộ nhớ hay đi qua Pydantic.
+    """
+    headers = {"Accept-Ranges": "bytes"}
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    byte_range = parse_range(range_header, size)
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, status.HTTP_200_OK
+    else:
+        start, end = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    length = max(end - start + 1, 0)
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        read(start, length) if length else iter(()),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers
+    )
+
+def iter_bytes(data: bytes, start: int, length: int) -> Iterator[bytes]:
+    """Chia một đoạn của dữ liệu byte thành các khối"""
+    view = memoryview(data)[start:start + length]
+    for offset in range(0, len(view), CHUNK_SIZE):
+        yield bytes(view[offset:offset + CHUNK_SIZE])
@@ -0,0 +1,129 @@
+"""
+Ghi lại trace request thật (đã làm sạch) để phát lại khi kiểm tra hiệu năng
+(xem benchmarks/replay_trace.py).
+
+Mỗi dòng của TRACE_DIR/<pid>.jsonl là một request đã khớp route: thời điểm
+bắt đầu, method, route template, tham số đường dẫn và query, body JSON đã
+làm sạch, mã trạng thái, thời gian xử lý và loại người dùng. Không ghi
+header, token, mật khẩu, mã nguồn hay dữ liệu test:
+- giá trị của các khóa trong REDACTED_FIELDS được thay bằng REDACTED;
+- body dạng form chỉ giữ tên trường, body khác (upload) chỉ giữ content type;
+- người dùng chỉ được ghi là anonymous/user/admin kèm một khóa ẩn danh ổn
+  định (HMAC của id) để phát lại giữ đúng số người dùng khác nhau.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from contextvars import ContextVar
+from typing import Optional
+from urllib.parse import parse_qsl
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+REDACTED = "<redacted>"
+REDACTED_FIELDS = {
+    "password", "new_password", "old_password", "hashed_password", "token", "access_token",
+    "refresh_token", "secret", "code", "input", "expected_output", "email", "username", "full_name", "bio",
+}
+MAX_BODY_BYTES = 64 * 1024
+
+class RequestTrace:
+    __slots__ = ("user_class", "user_key")
+
+    def __init__(self):
+        self.user_class = "anonymous"
+        self.user_key = None
+
+    def set_user(self, user_id: str, is_admin: bool):
+        self.user_class = "admin" if is_admin else "user"
+        digest = hmac.new(settings.SECRET_KEY.encode(), user_id.encode(), hashlib.sha256)
+        self.user_key = digest.hexdigest()[:16]
+
+current: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+def note_user(principal):
+    """Gọi khi xác thực xong để trace biết loại người dùng của request"""
+    trace = current.get()
+    if trace is not None:
+        trace.set_user(principal.id, principal.is_admin)
+
+def enabled() -> bool:
+    return bool(settings.TRACE_DIR) and settings.TRACE_SAMPLE_RATE > 0
+
+def sampled() -> bool:
+    return settings.TRACE_SAMPLE_RATE >= 1 or random.random() < settings.TRACE_SAMPLE_RATE
+
+def _sanitize(value):
+    if isinstance(value, dict):
+        return {key: REDACTED if key in REDACTED_FIELDS else _sanitize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_sanitize(item) for item in value]
+    return value
+
+def sanitize_query(query_string: bytes):
+    return [
+        [key, REDACTED if key in REDACTED_FIELDS else value]
+        for key, value in parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+    ]
+
+def sanitize_body(content_type: str, body: bytes):
+    """Body đã làm sạch: {"json": ...}, {"form": [tên trường]} hoặc {"content_type": ...}"""
+    if not body:
+        return None
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type == "application/json" and len(body) <= MAX_BODY_BYTES:
+        try:
+            return {"json": _sanitize(json.loads(body))}
+        except ValueError:
+            return {"content_type": media_type}
+    if media_type == "application/x-www-form-urlencoded":
+        return {"form": [key for key, _ in parse_qsl(body.decode("latin-1"), keep_blank_values=True)]}
+    return {"content_type": media_type}
+
+def record(entry: dict):
+    if _writer is not None:
+        _queue.put(entry)
+
+# Ghi trace ra file trong một thread riêng (không chặn event loop)
+
+_writer: Optional[threading.Thread] = None
+_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+_STOP = object()
+
+def _write_loop(path: str):
+    with open(path, "a", encoding="utf-8") as f:
+        while True:
+            entry = _queue.get()
+            if entry is _STOP:
+                break
+            try:
+                f.write(json.dumps(entry, separators=(",", ":"), default=str) + "\n")
+                if _queue.empty():
+                    f.flush()
+            except Exception:
+                logger.exception("Failed to write request trace")
+
+def start_capture():
+    """Bắt đầu ghi trace (khi khởi động worker), bỏ qua nếu không đặt TRACE_DIR"""
+    global _writer
+    if not enabled() or _writer is not None:
+        return
+    os.makedirs(settings.TRACE_DIR, exist_ok=True)
+    path = os.path.join(settings.TRACE_DIR, f"{os.getpid()}.jsonl")
+    _writer = threading.Thread(target=_write_loop, args=(path,), name="trace-writer", daemon=True)
+    _writer.start()
+
+def stop_capture():
+    global _writer
+    if _writer is None:
+        return
+    _queue.put(_STOP)
+    _writer.join()
+    _writer = None
@@ -0,0 +1,164 @@
+"""
+Tải đồng thời lên các endpoint đọc nhiều đã chuyển sang async.
+
+Mở C client cùng lúc (mặc định 1000), mỗi client gửi liên tục các request
+GET cho đến hết thời gian đo, ghi lại số request/giây và p50/p95/p99 của
+từng endpoint. Endpoint đối chứng đồng bộ là GET /contests/{id}/participants
+(cùng câu truy vấn và schema với /standings nhưng chạy bằng def trong
+threadpool). Các request gửi kèm If-None-Match rỗng để luôn nhận 200.
+
+Chạy với server thật (nên dùng nhiều worker uvicorn như khi triển khai):
+    uvicorn app.main:app --workers 4 &
+    python -m benchmarks.bench_async_reads --database-url mysql+pymysql://root@localhost/bench \\
+        --base-url http://127.0.0.1:8000 --concurrency 1000 --duration 30
+
+Hoặc chạy trong cùng process (ASGI, không qua mạng) để so sánh nhanh:
+    python -m benchmarks.bench_async_reads --database-url sqlite:///bench.db --concurrency 200
+
+Database nên là bản sao dùng riêng cho benchmark, bảng sẽ được tạo lại.
+Kết quả in ra dạng JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--base-url", help="URL server đang chạy; bỏ trống để chạy ASGI trong process")
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=20, help="số giây đo cho mỗi endpoint")
+    parser.add_argument("--participants", type=int, default=200, help="số người tham gia cuộc thi")
+    parser.add_argument("--pool-size", type=int, help="ASYNC_DB_POOL_SIZE khi chạy trong process")
+    return parser.parse_args()
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 2) if values else None
+
+def seed(participants):
+    from app.database import Base, SessionLocal, engine
+    from app.models.contests import Contest, ContestParticipant
+    from app.models.problems import Problem
+    from app.models.submissions import Submission
+    from app.models.users import User
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    users = [
+        User(username=f"user{i}", email=f"user{i}@bench.local", hashed_password="x", is_active=True)
+        for i in range(participants)
+    ]
+    db.add_all(users)
+    db.flush()
+    problem = Problem(
+        title="A + B", description="Tính tổng hai số", difficulty="easy", constraints="",
+        example_input="1 2", example_output="3", is_public=True, created_by=users[0].id, tags=[]
+    )
+    now = datetime.utcnow()
+    contest = Contest(
+        title="Bench", description="", start_time=now - timedelta(hours=1),
+        end_time=now + timedelta(hours=4), is_public=True, created_by=users[0].id
+    )
+    db.add_all([problem, contest])
+    db.flush()
+    db.add_all([
+        ContestParticipant(contest_id=contest.id, user_id=user.id, score=i)
+        for i, user in enumerate(users)
+    ])
+    submission = Submission(
+        user_id=users[0].id, problem_id=problem.id, contest_id=contest.id,
+        code="print(sum(map(int, input().split())))", language="python"
+    )
+    db.add(submission)
+    db.commit()
+    fixtures = {
+        "username": users[0].username,
+        "contest_id": contest.id,
+        "problem_id": problem.id,
+        "submission_id": submission.id,
+    }
+    db.close()
+    return fixtures
+
+async def load(client, path, headers, concurrency, duration):
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                code = response.status_code
+            except Exception as exc:
+                code = type(exc).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[code] = statuses.get(code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "status_codes": statuses,
+    }
+
+async def run(args, fixtures):
+    import httpx
+
+    from app.auth.oauth2 import create_access_token
+
+    headers = {
+        "Authorization": "Bearer " + create_access_token({"sub": fixtures["username"]}),
+        "If-None-Match": "",
+    }
+    contest, problem, submission = fixtures["contest_id"], fixtures["problem_id"], fixtures["submission_id"]
+    endpoints = {
+        "sync participants": f"/api/contests/{contest}/participants",
+        "async standings": f"/api/contests/{contest}/standings",
+        "async contest status": f"/api/contests/{contest}/status",
+        "async submission": f"/api/submissions/{submission}",
+        "async problem": f"/api/problems/{problem}",
+    }
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60)
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    results = {}
+    async with client:
+        for name, path in endpoints.items():
+            # Làm nóng: kết nối, cache người dùng
+            await load(client, path, headers, min(args.concurrency, 20), 1)
+            results[name] = await load(client, path, headers, args.concurrency, args.duration)
+    return results
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    if args.pool_size:
+        os.environ["ASYNC_DB_POOL_SIZE"] = str(args.pool_size)
+
+    fixtures = seed(args.participants)
+    results = {
+        "target": args.base_url or "in-process",
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "endpoints": asyncio.run(run(args, fixtures)),
+    }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Đo chi phí xác thực mỗi request khi có và không có cache thông tin người dùng.
+
+Gọi một endpoint nhẹ có yêu cầu đăng nhập (GET /api/problems/facets, kết
+quả đã được cache nên thời gian chủ yếu là xác thực) nhiều lần với
+PRINCIPAL_CACHE_TTL_SECONDS = 0 và > 0, ghi lại độ trễ (ms) và số câu SQL
+mỗi request. Kết quả in ra dạng JSON.
+
+Chạy (database nên là bản sao dùng riêng cho benchmark, bảng sẽ được tạo lại):
+    python -m benchmarks.bench_auth --database-url mysql+pymysql://root@localhost/bench --requests 5000
+    python -m benchmarks.bench_auth --database-url sqlite:///bench.db
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=1000, help="số người dùng trong bảng users")
+    parser.add_argument("--cache-ttl", type=int, default=30)
+    return parser.parse_args()
+
+def seed(users):
+    from app.database import Base, SessionLocal, engine
+    from app.models.users import User
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    db.bulk_save_objects([
+        User(username=f"user{i}", email=f"user{i}@bench.local", hashed_password="x", is_active=True)
+        for i in range(users)
+    ])
+    db.commit()
+    db.close()
+
+def run(client, headers, requests, counter):
+    latencies = []
+    counter["statements"] = 0
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get("/api/problems/facets", headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+    latencies.sort()
+    return {
+        "mean_ms": round(statistics.fmean(latencies), 4),
+        "p50_ms": round(latencies[len(latencies) // 2], 4),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)], 4),
+        "queries_per_request": round(counter["statements"] / requests, 3),
+    }
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from app.auth.oauth2 import create_access_token
+    from app.config import settings
+    from app.database import engine
+    from app.main import app
+
+    seed(args.users)
+    counter = {"statements": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(*_):
+        counter["statements"] += 1
+
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": f"user{args.users // 2}"})}
+    # Làm nóng: kết nối, cache facet
+    run(client, headers, 50, counter)
+
+    results = {"dialect": engine.dialect.name, "requests": args.requests}
+    settings.PRINCIPAL_CACHE_TTL_SECONDS = 0
+    results["uncached"] = run(client, headers, args.requests, counter)
+    settings.PRINCIPAL_CACHE_TTL_SECONDS = args.cache_ttl
+    results["cached"] = run(client, headers, args.requests, counter)
+    results["saving_ms_per_request"] = round(results["uncached"]["mean_ms"] - results["cached"]["mean_ms"], 4)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Thông lượng đăng nhập khi nhiều người đăng nhập cùng lúc (đầu giờ thi).
+
+Chạy một đợt đăng nhập đồng thời và song song đo độ trễ của một endpoint
+không liên quan (GET /api/health) để thấy việc băm bcrypt có làm nghẽn
+phần còn lại của API hay không. Mỗi cấu hình PASSWORD_HASH_WORKERS chạy
+trong một process riêng. Kết quả in ra dạng JSON.
+
+Chạy (database nên là bản sao dùng riêng cho benchmark, bảng sẽ được tạo lại):
+    python -m benchmarks.bench_login --database-url sqlite:///bench.db --logins 200 --concurrency 32
+    python -m benchmarks.bench_login --database-url mysql+pymysql://root@localhost/bench --workers 0 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2],
+                        help="các giá trị PASSWORD_HASH_WORKERS cần so sánh (0 = băm trong threadpool của API)")
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 2) if values else None
+
+def seed(users):
+    from app.auth.utils import pwd_context
+    from app.database import Base, SessionLocal, engine
+    from app.models.users import User
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    hashed = pwd_context.hash("password")
+    db = SessionLocal()
+    db.bulk_save_objects([
+        User(username=f"user{i}", email=f"user{i}@bench.local", hashed_password=hashed, is_active=True)
+        for i in range(users)
+    ])
+    db.commit()
+    db.close()
+
+def run_single(args):
+    """Một lần đo với cấu hình lấy từ biến môi trường"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    seed(args.concurrency)
+    client = TestClient(app)
+    login_latencies, probe_latencies, statuses = [], [], {}
+    done = threading.Event()
+
+    def login(i):
+        start = time.perf_counter()
+        response = client.post("/api/auth/login", data={"username": f"user{i % args.concurrency}", "password": "password"})
+        login_latencies.append((time.perf_counter() - start) * 1000)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get("/api/health")
+            probe_latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+
+    # Làm nóng (khởi động process pool)
+    login(0)
+    login_latencies.clear()
+    statuses.clear()
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(login, range(args.logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    prober.join()
+
+    print(json.dumps({
+        "logins_per_sec": round(args.logins / elapsed, 2),
+        "login_p50_ms": percentile(login_latencies, 0.5),
+        "login_p95_ms": percentile(login_latencies, 0.95),
+        "health_p50_ms": percentile(probe_latencies, 0.5),
+        "health_p95_ms": percentile(probe_latencies, 0.95),
+        "health_max_ms": percentile(probe_latencies, 1.0),
+        "status_codes": statuses,
+    }))
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    if args.single:
+        run_single(args)
+        return
+
+    results = {"logins": args.logins, "concurrency": args.concurrency, "bcrypt_rounds": args.rounds, "runs": {}}
+    for workers in args.workers:
+        env = dict(os.environ, PASSWORD_HASH_WORKERS=str(workers))
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_login", "--single",
+             "--database-url", args.database_url, "--logins", str(args.logins),
+             "--concurrency", str(args.concurrency), "--rounds", str(args.rounds)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        results["runs"][f"workers={workers}"] = json.loads(output.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
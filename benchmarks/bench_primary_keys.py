@@ -0,0 +1,121 @@
+"""
+So sánh khóa chính CHAR(36) UUID4 với BINARY(16) UUIDv7.
+
+Tạo hai bảng có cấu trúc giống bảng submissions (khóa chính + index phụ
+(user_id, submitted_at)), insert cùng số dòng theo lô, đo tốc độ insert và
+kích thước dữ liệu/index sau khi insert. Kết quả in ra dạng JSON.
+
+Chạy (nên dùng MySQL/InnoDB để thấy khác biệt của clustered index):
+    python -m benchmarks.bench_primary_keys --database-url mysql+pymysql://root@localhost/bench --rows 200000
+    python -m benchmarks.bench_primary_keys --database-url sqlite:///bench.db
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import (
+    CHAR, Column, DateTime, Index, Integer, MetaData, Table, create_engine, text
+)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=1000)
+    return parser.parse_args()
+
+def build_tables(metadata):
+    from app.database import BinaryUUID
+
+    char_table = Table(
+        "bench_pk_char36", metadata,
+        Column("id", CHAR(36), primary_key=True),
+        Column("user_id", CHAR(36), nullable=False),
+        Column("submitted_at", DateTime, nullable=False),
+        Column("execution_time_ms", Integer),
+        Index("ix_bench_pk_char36_user_submitted", "user_id", "submitted_at"),
+    )
+    binary_table = Table(
+        "bench_pk_binary16", metadata,
+        Column("id", BinaryUUID(), primary_key=True),
+        Column("user_id", BinaryUUID(), nullable=False),
+        Column("submitted_at", DateTime, nullable=False),
+        Column("execution_time_ms", Integer),
+        Index("ix_bench_pk_binary16_user_submitted", "user_id", "submitted_at"),
+    )
+    return char_table, binary_table
+
+def insert_rows(engine, table, make_id, user_ids, rows, batch):
+    """Insert theo lô, trả về số dòng/giây"""
+    start = time.perf_counter()
+    base = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        for offset in range(0, rows, batch):
+            connection.execute(table.insert(), [
+                {
+                    "id": make_id(),
+                    "user_id": user_ids[(offset + i) % len(user_ids)],
+                    "submitted_at": base + timedelta(seconds=offset + i),
+                    "execution_time_ms": (offset + i) % 1000,
+                }
+                for i in range(min(batch, rows - offset))
+            ])
+    return rows / (time.perf_counter() - start)
+
+def table_sizes(engine, table):
+    """Kích thước dữ liệu và index (byte) của bảng"""
+    with engine.connect() as connection:
+        if engine.dialect.name == "mysql":
+            connection.execute(text(f"ANALYZE TABLE `{table.name}`"))
+            row = connection.execute(text(
+                "SELECT data_length, index_length FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() AND table_name = :name"
+            ), {"name": table.name}).one()
+            return {"data_bytes": int(row[0]), "index_bytes": int(row[1])}
+        if engine.dialect.name == "sqlite":
+            try:
+                rows = connection.execute(text(
+                    "SELECT name, SUM(pgsize) FROM dbstat WHERE name = :table OR name IN "
+                    "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table) "
+                    "GROUP BY name"
+                ), {"table": table.name}).all()
+            except Exception:
+                return {}
+            data = sum(size for name, size in rows if name == table.name)
+            return {"data_bytes": data, "index_bytes": sum(size for _, size in rows) - data}
+    return {}
+
+def main():
+    args = parse_args()
+    os.environ.setdefault("DATABASE_URL", args.database_url)
+    from app.database import generate_uuid
+
+    engine = create_engine(args.database_url)
+    metadata = MetaData()
+    char_table, binary_table = build_tables(metadata)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    users4 = [str(uuid.uuid4()) for _ in range(1000)]
+    users7 = [generate_uuid() for _ in range(1000)]
+
+    results = {
+        "dialect": engine.dialect.name,
+        "rows": args.rows,
+        "char36_uuid4": {
+            "inserts_per_sec": round(insert_rows(engine, char_table, lambda: str(uuid.uuid4()), users4, args.rows, args.batch)),
+            **table_sizes(engine, char_table),
+        },
+        "binary16_uuid7": {
+            "inserts_per_sec": round(insert_rows(engine, binary_table, generate_uuid, users7, args.rows, args.batch)),
+            **table_sizes(engine, binary_table),
+        },
+    }
+    metadata.drop_all(engine)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Chi phí tuần tự hóa response cho từng response model.
+
+Với mỗi model, dựng một danh sách đối tượng ORM (không cần database) và đo
+ba cách ra JSON:
+- jsonable_encoder: model_validate từng đối tượng, jsonable_encoder rồi
+  json.dumps (đường chung của FastAPI khi không mã hóa thẳng ra bytes);
+- dump_json: TypeAdapter(List[Model]) validate rồi dump_json trong lõi Rust
+  của Pydantic (FastAPI dùng cách này cho endpoint có response_model);
+- orjson: validate, dump_python(mode="json") rồi orjson.dumps (dùng cho
+  payload đã cache, xem app.responses.FastJSONResponse).
+Kết quả (micro giây mỗi response) in ra dạng JSON.
+
+Chạy:
+    python -m benchmarks.bench_serialization --rows 100 --standings-rows 1000
+"""
+import argparse
+import json
+import os
+import time
+import timeit
+from datetime import datetime, timedelta
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="số phần tử mỗi danh sách")
+    parser.add_argument("--standings-rows", type=int, default=1000, help="số người trong bảng xếp hạng")
+    parser.add_argument("--seconds", type=float, default=0.5, help="thời gian đo tối thiểu mỗi trường hợp")
+    return parser.parse_args()
+
+def fixtures(rows, standings_rows):
+    """(tên, response model, danh sách đối tượng ORM)"""
+    from app.database import generate_uuid
+    from app.models.contests import Contest, ContestParticipant, ContestProblem
+    from app.models.problems import DifficultyEnum, ImportStatusEnum, Problem, ProblemImportJob, TestCase
+    from app.models.submissions import LanguageEnum, StatusEnum, Submission, UserProblemStatus
+    from app.models.users import User
+    from app import schemas
+
+    now = datetime.utcnow()
+    users = [
+        User(id=generate_uuid(), username=f"user{i}", email=f"user{i}@example.com", full_name=f"User {i}",
+             bio="", created_at=now, is_active=True, is_admin=False, rating=1500 + i)
+        for i in range(max(rows, standings_rows))
+    ]
+
+    def problem(i):
+        problem_id = generate_uuid()
+        samples = [
+            TestCase(id=generate_uuid(), problem_id=problem_id, input="1 2\n", expected_output="3\n",
+                     is_sample=True, order=j, input_size=4, output_size=2)
+            for j in range(2)
+        ]
+        return Problem(
+            id=problem_id, title=f"Problem {i}", description="Tính tổng hai số nguyên a và b. " * 20,
+            difficulty=DifficultyEnum.easy, tags=["math", "implementation"], example_input="1 2", example_output="3",
+            constraints="1 <= a, b <= 10^9", is_public=True, time_limit_ms=1000, memory_limit_kb=262144,
+            created_at=now, created_by=users[0].id, solved_count=i, attempted_count=2 * i,
+            sample_test_cases=samples
+        )
+
+    problems = [problem(i) for i in range(rows)]
+    contest = Contest(
+        id=generate_uuid(), title="Contest", description="", start_time=now, end_time=now + timedelta(hours=3),
+        is_public=True, created_by=users[0].id, created_at=now
+    )
+    contest.problems = [
+        ContestProblem(id=generate_uuid(), contest_id=contest.id, problem_id=p.id, order=i, points=100, problem=p)
+        for i, p in enumerate(problems[:10])
+    ]
+    standings = [
+        ContestParticipant(id=generate_uuid(), contest_id=contest.id, user_id=user.id, joined_at=now,
+                           score=standings_rows - i, user=user)
+        for i, user in enumerate(users[:standings_rows])
+    ]
+    contest.participants = standings[:rows]
+    submissions = [
+        Submission(
+            id=generate_uuid(), user_id=users[i].id, problem_id=problems[i].id, contest_id=contest.id,
+            code="#include <cstdio>\nint main(){int a,b;scanf(\"%d%d\",&a,&b);printf(\"%d\",a+b);}\n",
+            language=LanguageEnum.cpp, status=StatusEnum.accepted, execution_time_ms=15, memory_used_kb=1024, submitted_at=now,
+            user=users[i], problem=problems[i], contest=contest
+        )
+        for i in range(rows)
+    ]
+    statuses = [
+        UserProblemStatus(user_id=users[0].id, problem_id=p.id, attempts=3, solved=True, first_accepted_at=now,
+                          best_submission_id=submissions[0].id, best_execution_time_ms=15, last_submitted_at=now)
+        for p in problems
+    ]
+    test_cases = [case for p in problems for case in p.sample_test_cases][:rows]
+    jobs = [
+        ProblemImportJob(id=generate_uuid(), created_by=users[0].id, status=ImportStatusEnum.completed, total_tests=50,
+                         processed_tests=50, problem_id=problems[0].id, created_at=now, finished_at=now)
+        for _ in range(rows)
+    ]
+
+    return [
+        ("UserResponse", schemas.UserResponse, users[:rows]),
+        ("ProblemResponse", schemas.ProblemResponse, problems),
+        ("ProblemDetailResponse", schemas.ProblemDetailResponse, problems[:1]),
+        ("TestCaseResponse", schemas.TestCaseResponse, test_cases),
+        ("TestCaseSummaryResponse", schemas.TestCaseSummaryResponse, test_cases),
+        ("ProblemImportJobResponse", schemas.ProblemImportJobResponse, jobs[:1]),
+        ("ContestResponse", schemas.ContestResponse, [contest] * rows),
+        ("ContestDetailResponse", schemas.ContestDetailResponse, [contest]),
+        ("ContestProblemResponse", schemas.ContestProblemResponse, contest.problems),
+        ("ContestParticipantResponse", schemas.ContestParticipantResponse, standings[:rows]),
+        ("ContestParticipantDetailResponse (standings)", schemas.ContestParticipantDetailResponse, standings),
+        ("SubmissionResponse", schemas.SubmissionResponse, submissions),
+        ("SubmissionSummaryResponse", schemas.SubmissionSummaryResponse, submissions),
+        ("SubmissionDetailResponse", schemas.SubmissionDetailResponse, submissions[:1]),
+        ("UserProblemStatusResponse", schemas.UserProblemStatusResponse, statuses),
+    ]
+
+def measure(fn, seconds):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs = max(1, int(seconds / max(timer.timeit(number) / number, 1e-9)))
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return round((time.perf_counter() - start) / runs * 1e6, 1)
+
+def main():
+    args = parse_args()
+
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+
+    results = {"rows": args.rows, "standings_rows": args.standings_rows, "unit": "us per response", "models": {}}
+    for name, model, objects in fixtures(args.rows, args.standings_rows):
+        adapter = TypeAdapter(List[model])
+        single = len(objects) == 1
+        payload = objects[0] if single else objects
+
+        def generic():
+            if single:
+                return json.dumps(jsonable_encoder(model.model_validate(payload)))
+            return json.dumps(jsonable_encoder([model.model_validate(obj) for obj in payload]))
+
+        def dump_json():
+            if single:
+                return model.model_validate(payload).model_dump_json()
+            return adapter.dump_json(adapter.validate_python(payload))
+
+        assert json.loads(generic()) == json.loads(dump_json()), name
+        row = {
+            "items": len(objects),
+            "jsonable_encoder": measure(generic, args.seconds),
+            "dump_json": measure(dump_json, args.seconds),
+        }
+        if orjson is not None:
+            def orjson_dump():
+                if single:
+                    return orjson.dumps(model.model_validate(payload).model_dump(mode="json"))
+                return orjson.dumps(adapter.dump_python(adapter.validate_python(payload), mode="json"))
+            row["orjson"] = measure(orjson_dump, args.seconds)
+        row["speedup"] = round(row["jsonable_encoder"] / row["dump_json"], 2)
+        results["models"][name] = row
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
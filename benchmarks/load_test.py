@@ -0,0 +1,300 @@
+"""
+Load test theo kịch bản trên dữ liệu do benchmarks.seed tạo ra.
+
+Các kịch bản (chạy lần lượt, mỗi kịch bản C client đồng thời):
+- login_storm: người tham gia cùng đăng nhập lúc mở cuộc thi;
+- contest_start: xem cuộc thi, trạng thái và đề bài của cuộc thi;
+- submission_burst: nộp bài trong cuộc thi (chấm bài chạy ngay trong request);
+- standings_polling: tải lại bảng xếp hạng, gửi kèm ETag của lần trước;
+- deep_pagination: duyệt sâu danh sách bài nộp bằng cursor và bằng skip.
+
+Kết quả là JSON (khóa đã sắp xếp) gồm số request/giây và p50/p95/p99 của
+từng endpoint, lưu bằng --output để so sánh giữa các commit (--baseline in
+ra chênh lệch so với một lần chạy trước).
+
+Chạy trong cùng process (ASGI, không qua mạng; rate limit bị tắt):
+    python -m benchmarks.seed --database-url sqlite:///bench.db --scale 0.01
+    python -m benchmarks.load_test --database-url sqlite:///bench.db --output before.json
+
+Hoặc với server thật (tắt RATE_LIMIT_* của server trước khi chạy):
+    python -m benchmarks.load_test --database-url mysql+pymysql://root@localhost/bench \\
+        --base-url http://127.0.0.1:8000 --concurrency 500 --output after.json --baseline before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+SCENARIOS = ["login_storm", "contest_start", "submission_burst", "standings_polling", "deep_pagination"]
+SUBMISSION_CODE = "print(sum(map(int, input().split())))\n"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="database đã seed (để đọc fixture)")
+    parser.add_argument("--base-url", help="URL server đang chạy; bỏ trống để chạy ASGI trong process")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000, help="số request mỗi kịch bản")
+    parser.add_argument("--pages", type=int, default=50, help="số trang mỗi lượt duyệt deep_pagination")
+    parser.add_argument("--output", help="ghi kết quả JSON ra file")
+    parser.add_argument("--baseline", help="file kết quả của lần chạy trước để so sánh")
+    return parser.parse_args()
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 2) if values else None
+
+class Recorder:
+    """Độ trễ và mã trạng thái theo tên endpoint (dạng route template)"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+
+    async def request(self, name, send):
+        start = time.perf_counter()
+        response = None
+        try:
+            response = await send()
+            code = str(response.status_code)
+        except Exception as exc:
+            code = type(exc).__name__
+        self.latencies.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+        counts = self.statuses.setdefault(name, {})
+        counts[code] = counts.get(code, 0) + 1
+        return response
+
+    def summary(self, elapsed):
+        return {
+            name: {
+                "requests": len(values),
+                "rps": round(len(values) / elapsed, 1),
+                "p50_ms": percentile(values, 0.5),
+                "p95_ms": percentile(values, 0.95),
+                "p99_ms": percentile(values, 0.99),
+                "status_codes": self.statuses[name],
+            }
+            for name, values in self.latencies.items()
+        }
+
+def load_fixtures():
+    """Cuộc thi surge, bài toán của cuộc thi, người tham gia và token của họ"""
+    from sqlalchemy import select
+
+    from app.auth.oauth2 import create_access_token
+    from app.database import SessionLocal
+    from app.models.contests import Contest, ContestParticipant, ContestProblem
+    from app.models.users import User
+    from benchmarks.seed import PASSWORD, SURGE_CONTEST_TITLE
+
+    db = SessionLocal()
+    try:
+        contest = db.execute(select(Contest).where(Contest.title == SURGE_CONTEST_TITLE)).scalars().first()
+        if contest is None:
+            sys.exit("Contest surge not found: run benchmarks.seed first")
+        problem_ids = db.execute(
+            select(ContestProblem.problem_id).where(ContestProblem.contest_id == contest.id).order_by(ContestProblem.order)
+        ).scalars().all()
+        usernames = db.execute(
+            select(User.username).join(ContestParticipant, ContestParticipant.user_id == User.id)
+            .where(ContestParticipant.contest_id == contest.id)
+        ).scalars().all()
+        admin = db.execute(select(User.username).where(User.is_admin.is_(True))).scalars().first()
+    finally:
+        db.close()
+    return {
+        "contest_id": contest.id,
+        "problem_ids": problem_ids,
+        "usernames": usernames,
+        "password": PASSWORD,
+        "tokens": {name: create_access_token({"sub": name}) for name in usernames},
+        "admin_token": create_access_token({"sub": admin}),
+    }
+
+def _auth(token):
+    return {"Authorization": f"Bearer {token}"}
+
+def login_storm(client, recorder, fixtures, args):
+    usernames = fixtures["usernames"]
+
+    async def one(i):
+        form = {"username": usernames[i % len(usernames)], "password": fixtures["password"]}
+        await recorder.request("POST /api/auth/login", lambda: client.post("/api/auth/login", data=form))
+
+    return one
+
+def contest_start(client, recorder, fixtures, args):
+    contest, problems, usernames = fixtures["contest_id"], fixtures["problem_ids"], fixtures["usernames"]
+    endpoints = [
+        ("GET /api/contests/{contest_id}", f"/api/contests/{contest}"),
+        ("GET /api/contests/{contest_id}/status", f"/api/contests/{contest}/status"),
+    ] + [("GET /api/problems/{problem_id}", f"/api/problems/{problem}") for problem in problems]
+
+    async def one(i):
+        name, path = endpoints[i % len(endpoints)]
+        headers = _auth(fixtures["tokens"][usernames[i % len(usernames)]])
+        await recorder.request(name, lambda: client.get(path, headers=headers))
+
+    return one
+
+def submission_burst(client, recorder, fixtures, args):
+    contest, problems, usernames = fixtures["contest_id"], fixtures["problem_ids"], fixtures["usernames"]
+
+    async def one(i):
+        body = {"problem_id": problems[i % len(problems)], "contest_id": contest,
+                "code": SUBMISSION_CODE, "language": "python"}
+        headers = _auth(fixtures["tokens"][usernames[i % len(usernames)]])
+        await recorder.request("POST /api/submissions/", lambda: client.post("/api/submissions/", json=body, headers=headers))
+
+    return one
+
+def standings_polling(client, recorder, fixtures, args):
+    path = f"/api/contests/{fixtures['contest_id']}/standings"
+    usernames = fixtures["usernames"]
+    etags = {}
+
+    async def one(i):
+        username = usernames[i % len(usernames)]
+        headers = _auth(fixtures["tokens"][username])
+        if username in etags:
+            headers["If-None-Match"] = etags[username]
+        response = await recorder.request(
+            "GET /api/contests/{contest_id}/standings", lambda: client.get(path, headers=headers)
+        )
+        if response is not None and response.headers.get("etag"):
+            etags[username] = response.headers["etag"]
+
+    return one
+
+def deep_pagination(client, recorder, fixtures, args):
+    from app.pagination import NEXT_CURSOR_HEADER
+
+    headers = _auth(fixtures["admin_token"])
+    limit = 100
+
+    async def cursor_walk():
+        cursor = None
+        for _ in range(args.pages):
+            params = {"limit": limit}
+            if cursor:
+                params["cursor"] = cursor
+            response = await recorder.request(
+                "GET /api/submissions/?cursor", lambda: client.get("/api/submissions/", params=params, headers=headers)
+            )
+            cursor = response.headers.get(NEXT_CURSOR_HEADER) if response is not None else None
+            if not cursor:
+                break
+
+    async def offset_walk():
+        for page in range(args.pages):
+            params = {"limit": limit, "skip": page * limit}
+            await recorder.request(
+                "GET /api/submissions/?skip", lambda: client.get("/api/submissions/", params=params, headers=headers)
+            )
+
+    # Mỗi "request" của kịch bản là một lượt duyệt args.pages trang
+    async def one(i):
+        await (cursor_walk() if i % 2 == 0 else offset_walk())
+
+    return one
+
+async def run_scenario(name, client, fixtures, args):
+    recorder = Recorder()
+    one = globals()[name](client, recorder, fixtures, args)
+    total = args.requests if name != "deep_pagination" else max(2, args.requests // args.pages)
+    queue = iter(range(total))
+
+    async def worker():
+        for i in queue:
+            await one(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(args.concurrency, total))))
+    return recorder.summary(time.perf_counter() - start)
+
+async def run(args, fixtures):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=120)
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120)
+
+    async with client:
+        return {name: await run_scenario(name, client, fixtures, args) for name in args.scenarios}
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _volumes():
+    from sqlalchemy import func, select
+
+    from app.database import SessionLocal
+    from app.models.contests import ContestParticipant
+    from app.models.problems import Problem
+    from app.models.submissions import Submission
+    from app.models.users import User
+
+    db = SessionLocal()
+    try:
+        return {
+            name: db.execute(select(func.count()).select_from(model)).scalar()
+            for name, model in [("users", User), ("problems", Problem), ("submissions", Submission),
+                                ("participants", ContestParticipant)]
+        }
+    finally:
+        db.close()
+
+def compare(results, baseline):
+    """In chênh lệch rps và p95 so với lần chạy trước (stderr)"""
+    for scenario, endpoints in results["scenarios"].items():
+        for name, row in endpoints.items():
+            old = baseline.get("scenarios", {}).get(scenario, {}).get(name)
+            if not old:
+                continue
+            delta = {
+                key: f"{(row[key] - old[key]) / old[key] * 100:+.1f}%"
+                for key in ("rps", "p95_ms") if old.get(key) and row.get(key) is not None
+            }
+            print(f"{scenario:18} {name:45} rps {delta.get('rps', '-'):>8}  p95 {delta.get('p95_ms', '-'):>8}", file=sys.stderr)
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    if not args.base_url:
+        # Mọi request đến từ cùng một "IP": rate limit sẽ chặn gần hết
+        for key in ("LOGIN_PER_IP", "REGISTER_PER_IP", "SUBMISSION_PER_USER", "SUBMISSION_PER_IP"):
+            os.environ[f"RATE_LIMIT_{key}"] = ""
+
+    fixtures = load_fixtures()
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "target": args.base_url or "in-process",
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "volumes": _volumes(),
+        },
+        "scenarios": asyncio.run(run(args, fixtures)),
+    }
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Phát lại trace request đã ghi (TRACE_DIR, xem app.tracing) lên một instance
+đã seed và so sánh độ trễ theo route với lúc ghi (hoặc với một lần phát lại
+trước).
+
+Request được gửi theo đúng khoảng cách thời gian giữa các request khi ghi,
+chia cho --speed (2 = nhanh gấp đôi, 0 = gửi liên tục không chờ). Dữ liệu
+đã làm sạch được điền lại như sau:
+- mỗi khóa người dùng ẩn danh được gán cố định cho một tài khoản của
+  database đích cùng loại (admin hoặc người dùng thường, xoay vòng);
+- mã nguồn bị ẩn được thay bằng chương trình mẫu theo ngôn ngữ, đăng nhập
+  dùng tài khoản đã gán và mật khẩu --password, các giá trị ẩn khác thay
+  bằng chuỗi duy nhất;
+- request có If-None-Match gửi kèm ETag mà người dùng đó nhận được lần
+  trước cho cùng URL;
+- request có body không phát lại được (upload file) bị bỏ qua.
+Id trong đường dẫn giữ nguyên, nên database đích nên là bản sao của
+database lúc ghi (hoặc dữ liệu seed có cùng id).
+
+Chạy:
+    python -m benchmarks.replay_trace storage/traces/*.jsonl --database-url mysql+pymysql://root@localhost/bench \\
+        --base-url http://127.0.0.1:8000 --speed 2 --output candidate.json
+    python -m benchmarks.replay_trace trace.jsonl --database-url sqlite:///bench.db --baseline previous.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import re
+import sys
+import time
+
+SAMPLE_CODE = {
+    "python": "print(sum(map(int, input().split())))\n",
+    "cpp": "#include <cstdio>\nint main(){long long a,b;scanf(\"%lld%lld\",&a,&b);printf(\"%lld\",a+b);}\n",
+    "c": "#include <stdio.h>\nint main(){long long a,b;scanf(\"%lld%lld\",&a,&b);printf(\"%lld\",a+b);return 0;}\n",
+    "pascal": "var a, b: int64;\nbegin readln(a, b); writeln(a + b); end.\n",
+}
+PATH_PARAM = re.compile(r"{(\w+)(?::\w+)?}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traces", nargs="+", help="file trace .jsonl (gộp và sắp theo thời gian)")
+    parser.add_argument("--database-url", required=True, help="database đích (để chọn tài khoản)")
+    parser.add_argument("--base-url", help="URL server đang chạy; bỏ trống để chạy ASGI trong process")
+    parser.add_argument("--speed", type=float, default=1.0, help="hệ số tốc độ, 0 = không chờ")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="số request đang chờ tối đa")
+    parser.add_argument("--password", default="password", help="mật khẩu của các tài khoản đích")
+    parser.add_argument("--limit", type=int, help="chỉ phát lại N request đầu")
+    parser.add_argument("--output", help="ghi kết quả JSON ra file")
+    parser.add_argument("--baseline", help="kết quả phát lại trước để so sánh thay cho thời gian lúc ghi")
+    return parser.parse_args()
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 2) if values else None
+
+def load_traces(paths, limit=None):
+    entries = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            entries.extend(json.loads(line) for line in f if line.strip())
+    entries.sort(key=lambda entry: entry["ts"])
+    return entries[:limit] if limit else entries
+
+class Identities:
+    """Gán khóa người dùng ẩn danh của trace cho tài khoản của database đích"""
+
+    def __init__(self, password):
+        from sqlalchemy import select
+
+        from app.database import SessionLocal
+        from app.models.users import User
+
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(User.username, User.is_admin).where(User.is_active.is_(True)).order_by(User.created_at)
+            ).all()
+        finally:
+            db.close()
+        pools = {
+            "admin": [row.username for row in rows if row.is_admin],
+            "user": [row.username for row in rows if not row.is_admin],
+        }
+        if not pools["admin"] or not pools["user"]:
+            sys.exit("Target database needs at least one admin and one regular user")
+        self._next = {name: itertools.cycle(usernames) for name, usernames in pools.items()}
+        self._assigned = {}
+        self._tokens = {}
+        self.password = password
+
+    def username(self, entry):
+        if entry["user_class"] == "anonymous":
+            return None
+        key = (entry["user_class"], entry.get("user_key"))
+        if key not in self._assigned:
+            self._assigned[key] = next(self._next[entry["user_class"]])
+        return self._assigned[key]
+
+    def next_user(self):
+        """Tài khoản thường tiếp theo (cho request đăng nhập, vốn chưa có người dùng)"""
+        return next(self._next["user"])
+
+    def headers(self, username):
+        from app.auth.oauth2 import create_access_token
+
+        if username is None:
+            return {}
+        if username not in self._tokens:
+            self._tokens[username] = create_access_token({"sub": username})
+        return {"Authorization": f"Bearer {self._tokens[username]}"}
+
+class Replayer:
+    def __init__(self, client, identities):
+        from app.tracing import REDACTED
+
+        self.client = client
+        self.identities = identities
+        self.redacted = REDACTED
+        self.etags = {}
+        self.unique = itertools.count()
+        self.latencies = {}
+        self.statuses = {}
+        self.recorded = {}
+        self.skipped = 0
+
+    def _fill(self, value, language=None):
+        if isinstance(value, dict):
+            language = value.get("language", language)
+            return {
+                key: (SAMPLE_CODE.get(language, SAMPLE_CODE["python"]) if key == "code" else f"replay{next(self.unique)}")
+                if item == self.redacted else self._fill(item, language)
+                for key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [self._fill(item, language) for item in value]
+        return value
+
+    def build(self, entry):
+        """(url, kwargs của httpx, khóa ETag) hoặc None nếu không phát lại được"""
+        body = entry.get("body") or {}
+        if "content_type" in body:
+            return None
+        url = PATH_PARAM.sub(lambda match: entry["path_params"][match.group(1)], entry["route"])
+        username = self.identities.username(entry)
+        headers = self.identities.headers(username)
+        kwargs = {"params": [(key, value) for key, value in entry.get("query", []) if value != self.redacted]}
+        if "json" in body:
+            kwargs["json"] = self._fill(body["json"])
+        elif "form" in body:
+            # Chỉ form đăng nhập có trong API: điền tài khoản đã gán
+            account = username or self.identities.next_user()
+            kwargs["data"] = {key: account if key == "username" else self.identities.password for key in body["form"]}
+        etag_key = (username, url, str(kwargs["params"]))
+        if entry.get("conditional") and etag_key in self.etags:
+            headers["If-None-Match"] = self.etags[etag_key]
+        kwargs["headers"] = headers
+        return url, kwargs, etag_key
+
+    async def send(self, entry, built):
+        url, kwargs, etag_key = built
+        name = f"{entry['method']} {entry['route']}"
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(entry["method"], url, **kwargs)
+            code = str(response.status_code)
+            if response.headers.get("etag"):
+                self.etags[etag_key] = response.headers["etag"]
+        except Exception as exc:
+            code = type(exc).__name__
+        self.latencies.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+        counts = self.statuses.setdefault(name, {})
+        counts[code] = counts.get(code, 0) + 1
+        self.recorded.setdefault(name, []).append(entry["duration_ms"])
+
+    def summary(self):
+        return {
+            name: {
+                "requests": len(values),
+                "p50_ms": percentile(values, 0.5),
+                "p95_ms": percentile(values, 0.95),
+                "p99_ms": percentile(values, 0.99),
+                "recorded_p50_ms": percentile(self.recorded[name], 0.5),
+                "recorded_p95_ms": percentile(self.recorded[name], 0.95),
+                "recorded_p99_ms": percentile(self.recorded[name], 0.99),
+                "status_codes": self.statuses[name],
+            }
+            for name, values in self.latencies.items()
+        }
+
+async def replay(args, entries):
+    import httpx
+
+    identities = Identities(args.password)
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=120)
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://replay", timeout=120)
+
+    semaphore = asyncio.Semaphore(args.max_in_flight)
+    replayer = Replayer(client, identities)
+    lag = []
+
+    async def fire(entry, built):
+        try:
+            await replayer.send(entry, built)
+        finally:
+            semaphore.release()
+
+    async with client:
+        tasks = []
+        origin = entries[0]["ts"] if entries else 0
+        start = time.perf_counter()
+        for entry in entries:
+            built = replayer.build(entry)
+            if built is None:
+                replayer.skipped += 1
+                continue
+            if args.speed > 0:
+                due = start + (entry["ts"] - origin) / args.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                lag.append(max(0.0, -delay) * 1000)
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(fire(entry, built)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "recorded_span_s": round(entries[-1]["ts"] - origin, 2) if entries else 0,
+        "skipped": replayer.skipped,
+        # Độ trễ lịch gửi: lớn nghĩa là máy chạy replay không theo kịp tốc độ yêu cầu
+        "schedule_lag_p99_ms": percentile(lag, 0.99),
+        "routes": replayer.summary(),
+    }
+
+def compare(results, baseline=None):
+    """In chênh lệch p50/p95 theo route: so với lần phát lại trước, hoặc với lúc ghi (stderr)"""
+    print(f"{'route':55} {'n':>6} {'p50':>9} {'p95':>9} {'Δp50':>8} {'Δp95':>8}", file=sys.stderr)
+    for name, row in sorted(results["routes"].items()):
+        if baseline is not None:
+            old = baseline.get("routes", {}).get(name)
+            reference = (old["p50_ms"], old["p95_ms"]) if old else (None, None)
+        else:
+            reference = (row["recorded_p50_ms"], row["recorded_p95_ms"])
+        deltas = [
+            f"{(value - ref) / ref * 100:+.0f}%" if ref else "-"
+            for value, ref in zip((row["p50_ms"], row["p95_ms"]), reference)
+        ]
+        print(f"{name:55} {row['requests']:>6} {row['p50_ms']:>9} {row['p95_ms']:>9} {deltas[0]:>8} {deltas[1]:>8}", file=sys.stderr)
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    if not args.base_url:
+        # Mọi request đến từ cùng một "IP": rate limit sẽ chặn gần hết
+        for key in ("LOGIN_PER_IP", "REGISTER_PER_IP", "SUBMISSION_PER_USER", "SUBMISSION_PER_IP"):
+            os.environ[f"RATE_LIMIT_{key}"] = ""
+    # Không ghi trace của chính lần phát lại
+    os.environ["TRACE_DIR"] = ""
+
+    entries = load_traces(args.traces, args.limit)
+    results = {
+        "meta": {"traces": args.traces, "speed": args.speed, "target": args.base_url or "in-process"},
+        **asyncio.run(replay(args, entries)),
+    }
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    compare(results, baseline)
+
+if __name__ == "__main__":
+    main()
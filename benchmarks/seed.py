@@ -0,0 +1,198 @@
+"""
+Tạo dữ liệu benchmark với khối lượng thực tế.
+
+Mặc định: 100k người dùng, 5k bài toán, 10M bài nộp trải đều trong một năm
+(phân bố lệch: một số ít người dùng và bài toán chiếm phần lớn bài nộp) và
+một cuộc thi đang diễn ra có 10k người tham gia ("Contest surge"). Dữ liệu
+sinh từ một seed cố định nên hai lần chạy cho cùng một kết quả (trừ id và
+thời gian tương đối so với lúc chạy).
+
+Mọi người dùng có mật khẩu "password"; người dùng đầu tiên (user0) là admin.
+Chỉ mục tìm kiếm và bảng trạng thái giải bài không được tạo.
+
+Chạy (database nên là bản sao dùng riêng cho benchmark, bảng sẽ được tạo lại):
+    python -m benchmarks.seed --database-url mysql+pymysql://root@localhost/bench
+    python -m benchmarks.seed --database-url sqlite:///bench.db --scale 0.01
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+DEFAULTS = {"users": 100_000, "problems": 5_000, "submissions": 10_000_000, "participants": 10_000}
+CONTEST_PROBLEMS = 8
+BATCH_SIZE = 10_000
+SURGE_CONTEST_TITLE = "Contest surge"
+PASSWORD = "password"
+TAGS = [
+    "math", "greedy", "dp", "graphs", "trees", "strings", "sorting", "binary-search",
+    "number-theory", "geometry", "implementation", "brute-force", "two-pointers",
+    "bitmasks", "combinatorics", "data-structures", "dfs", "shortest-paths", "hashing", "games",
+]
+STATUSES = [
+    ("accepted", 45), ("wrong_answer", 30), ("time_limit_exceeded", 10),
+    ("runtime_error", 8), ("compilation_error", 5), ("memory_limit_exceeded", 2),
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--scale", type=float, default=1.0, help="nhân mọi khối lượng với hệ số này")
+    for name, value in DEFAULTS.items():
+        parser.add_argument(f"--{name}", type=int, default=value)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+def _skewed(rng, count):
+    """Chỉ số trong [0, count) lệch về các giá trị nhỏ (phân bố gần Zipf)"""
+    return min(count - 1, int(count * rng.random() ** 3))
+
+def _ms(moment: datetime) -> int:
+    return int(moment.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+def _insert(connection, table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        connection.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+def seed(users, problems, submissions, participants, seed_value=42, log=None):
+    """Tạo lại bảng và sinh dữ liệu, trả về thông tin cần cho các kịch bản load test"""
+    from app.auth.utils import pwd_context
+    from app.database import Base, engine, uuid7
+    from app.models.problems import DifficultyEnum
+    from app.models.submissions import LanguageEnum, StatusEnum
+
+    log = log or (lambda message: print(message, file=sys.stderr))
+    rng = random.Random(seed_value)
+    tables = Base.metadata.tables
+    now = datetime.utcnow().replace(microsecond=0)
+    year_ago = now - timedelta(days=365)
+    participants = min(participants, users)
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    started = time.perf_counter()
+
+    with engine.begin() as connection:
+        # Người dùng (cùng một hash: băm 100k mật khẩu bcrypt mất hàng giờ)
+        hashed = pwd_context.hash(PASSWORD)
+        user_ids = []
+        rows = []
+        for i in range(users):
+            created_at = year_ago + timedelta(seconds=i * 365 * 86400 // max(users, 1))
+            user_id = str(uuid7(_ms(created_at)))
+            user_ids.append(user_id)
+            rows.append({
+                "id": user_id, "username": f"user{i}", "email": f"user{i}@example.com",
+                "hashed_password": hashed, "full_name": f"User {i}", "created_at": created_at,
+                "is_active": True, "is_admin": i == 0, "rating": int(rng.gauss(1500, 300)),
+            })
+        _insert(connection, tables["users"], rows)
+        log(f"users: {users}")
+
+        # Tag và bài toán
+        tag_ids = {name: str(uuid7(_ms(year_ago))) for name in TAGS}
+        _insert(connection, tables["tags"], [{"id": tag_id, "name": name} for name, tag_id in tag_ids.items()])
+        problem_ids, problem_rows, problem_tag_rows = [], [], []
+        difficulties = list(DifficultyEnum)
+        for i in range(problems):
+            created_at = year_ago + timedelta(seconds=i * 365 * 86400 // max(problems, 1))
+            problem_id = str(uuid7(_ms(created_at)))
+            problem_ids.append(problem_id)
+            tags = rng.sample(TAGS, rng.randint(1, 3))
+            problem_rows.append({
+                "id": problem_id, "title": f"Problem {i}",
+                "description": f"Statement of problem {i}. " * rng.randint(10, 60),
+                "difficulty": rng.choice(difficulties), "tags": tags,
+                "example_input": "1 2", "example_output": "3", "constraints": "1 <= n <= 10^5",
+                "created_at": created_at, "created_by": user_ids[0], "is_public": rng.random() < 0.95,
+                "time_limit_ms": 1000, "memory_limit_kb": 262144,
+            })
+            problem_tag_rows.extend({"problem_id": problem_id, "tag_id": tag_ids[tag]} for tag in tags)
+        _insert(connection, tables["problems"], problem_rows)
+        _insert(connection, tables["problem_tags"], problem_tag_rows)
+        _insert(connection, tables["test_cases"], [
+            {"id": str(uuid7(_ms(year_ago))), "problem_id": problem_id, "input": "1 2\n", "expected_output": "3\n",
+             "is_sample": order == 0, "order": order, "input_size": 4, "output_size": 2}
+            for problem_id in problem_ids for order in range(2)
+        ])
+        log(f"problems: {problems}")
+
+        # Cuộc thi đang diễn ra
+        contest_start = now - timedelta(minutes=5)
+        contest_id = str(uuid7(_ms(contest_start)))
+        connection.execute(tables["contests"].insert(), {
+            "id": contest_id, "title": SURGE_CONTEST_TITLE, "description": "Benchmark contest",
+            "start_time": contest_start, "end_time": now + timedelta(hours=3),
+            "created_by": user_ids[0], "is_public": True, "created_at": contest_start,
+        })
+        contest_problem_ids = rng.sample(problem_ids, min(CONTEST_PROBLEMS, problems))
+        _insert(connection, tables["contest_problems"], [
+            {"id": str(uuid7(_ms(contest_start))), "contest_id": contest_id, "problem_id": problem_id,
+             "order": order, "points": 100 * (order + 1)}
+            for order, problem_id in enumerate(contest_problem_ids)
+        ])
+        _insert(connection, tables["contest_participants"], [
+            {"id": str(uuid7(_ms(contest_start))), "contest_id": contest_id, "user_id": user_ids[i],
+             "joined_at": contest_start, "score": rng.randint(0, 36) * 100}
+            for i in range(participants)
+        ])
+        log(f"contest participants: {participants}")
+
+        # Bài nộp: theo thứ tự thời gian, phần cuối thuộc cuộc thi
+        languages = list(LanguageEnum)
+        statuses = [StatusEnum[name] for name, _ in STATUSES]
+        weights = [weight for _, weight in STATUSES]
+        contest_submissions = min(submissions, participants * 2)
+        history_span = (contest_start - year_ago).total_seconds()
+        rows = []
+        for i in range(submissions):
+            in_contest = i >= submissions - contest_submissions
+            if in_contest:
+                offset = (i - (submissions - contest_submissions)) * 300 / max(contest_submissions, 1)
+                submitted_at = contest_start + timedelta(seconds=offset)
+                user_id = user_ids[rng.randrange(participants)]
+                problem_id = rng.choice(contest_problem_ids)
+            else:
+                submitted_at = year_ago + timedelta(seconds=i * history_span / submissions)
+                user_id = user_ids[_skewed(rng, users)]
+                problem_id = problem_ids[_skewed(rng, problems)]
+            rows.append({
+                "id": str(uuid7(_ms(submitted_at))), "user_id": user_id, "problem_id": problem_id,
+                "contest_id": contest_id if in_contest else None, "code": "int main() { return 0; }\n",
+                "language": rng.choice(languages), "status": rng.choices(statuses, weights)[0],
+                "execution_time_ms": rng.randint(1, 1000), "memory_used_kb": rng.randint(1000, 65536),
+                "submitted_at": submitted_at,
+            })
+            if len(rows) == BATCH_SIZE:
+                connection.execute(tables["submissions"].insert(), rows)
+                rows = []
+                if (i + 1) % (BATCH_SIZE * 100) == 0:
+                    log(f"submissions: {i + 1}/{submissions}")
+        if rows:
+            connection.execute(tables["submissions"].insert(), rows)
+        log(f"submissions: {submissions}")
+
+    with engine.connect() as connection:
+        if engine.dialect.name == "mysql":
+            for table in Base.metadata.sorted_tables:
+                connection.exec_driver_sql(f"ANALYZE TABLE `{table.name}`")
+        elif engine.dialect.name == "sqlite":
+            connection.exec_driver_sql("ANALYZE")
+
+    return {
+        "users": users, "problems": problems, "submissions": submissions, "participants": participants,
+        "contest_id": contest_id, "contest_problem_ids": contest_problem_ids,
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    volumes = {name: max(1, int(getattr(args, name) * args.scale)) for name in DEFAULTS}
+    print(json.dumps(seed(seed_value=args.seed, **volumes), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Kiểm tra kế hoạch thực thi (EXPLAIN) của các query trong routers.
+
+Script tạo schema và dữ liệu mẫu trên một database trống, gọi các endpoint
+qua app thật, ghi lại mọi câu SELECT được sinh ra rồi chạy EXPLAIN cho từng
+câu. Nếu có câu nào quét toàn bộ bảng (full scan), endpoint nào lỗi hoặc
+không sinh câu SELECT, hoặc đi theo con trỏ của một danh sách không dừng/lặp
+lại dòng, thì thoát với mã lỗi 1, dùng được như một bước kiểm tra hồi quy
+trong CI.
+
+Chạy (chỉ trên database dùng cho kiểm thử, dữ liệu sẽ bị ghi vào):
+    python -m scripts.check_query_plans --database-url mysql+pymysql://root@localhost/plan_check
+    python -m scripts.check_query_plans --database-url sqlite:///plan_check.db
+"""
+import argparse
+import os
+import random
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+# Các bảng nhỏ, cố định mà full scan là chấp nhận được
+SMALL_TABLES = {"schema_migrations"}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="Database trống dùng để kiểm tra")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--problems", type=int, default=500)
+    parser.add_argument("--contests", type=int, default=50)
+    parser.add_argument("--submissions", type=int, default=20000)
+    parser.add_argument("--strict", action="store_true", help="Coi filesort/temp b-tree là lỗi")
+    return parser.parse_args()
+
+def seed(db, args):
+    """Sinh dữ liệu mẫu đủ lớn để optimizer ưu tiên index"""
+    from app.database import generate_uuid
+    from app.models import (
+        User, Problem, Tag, ProblemTag, Contest, ContestProblem, ContestParticipant, Submission,
+        DifficultyEnum, LanguageEnum, StatusEnum
+    )
+
+    rng = random.Random(42)
+    base = datetime(2024, 1, 1)
+
+    users = [
+        dict(id=generate_uuid(), username=f"user{i}", email=f"user{i}@example.com",
+             hashed_password="x", created_at=base + timedelta(minutes=i), is_active=True,
+             is_admin=(i == 0), rating=rng.randint(0, 3000))
+        for i in range(args.users)
+    ]
+    db.bulk_insert_mappings(User, users)
+
+    problems = [
+        dict(id=generate_uuid(), title=f"Problem {i}", description="...", difficulty=rng.choice(list(DifficultyEnum)),
+             tags=[], example_input="", example_output="", constraints="", created_by=users[0]["id"],
+             created_at=base + timedelta(minutes=i), is_public=rng.random() < 0.9)
+        for i in range(args.problems)
+    ]
+    db.bulk_insert_mappings(Problem, problems)
+
+    tags = [dict(id=generate_uuid(), name=f"tag{i}") for i in range(20)]
+    db.bulk_insert_mappings(Tag, tags)
+    db.bulk_insert_mappings(ProblemTag, [
+        dict(problem_id=problem["id"], tag_id=tag["id"])
+        for problem in problems for tag in rng.sample(tags, 2)
+    ])
+
+    contests = [
+        dict(id=generate_uuid(), title=f"Contest {i}", description="...", created_by=users[0]["id"],
+             start_time=base + timedelta(days=i), end_time=base + timedelta(days=i, hours=3),
+             created_at=base + timedelta(minutes=i), is_public=True)
+        for i in range(args.contests)
+    ]
+    db.bulk_insert_mappings(Contest, contests)
+
+    contest_problems, participants = [], []
+    for contest in contests:
+        for order, problem in enumerate(rng.sample(problems, 5)):
+            contest_problems.append(dict(id=generate_uuid(), contest_id=contest["id"], problem_id=problem["id"],
+                                         order=order, points=100))
+        for user in rng.sample(users, min(len(users), 100)):
+            participants.append(dict(id=generate_uuid(), contest_id=contest["id"], user_id=user["id"],
+                                     score=rng.randint(0, 500), joined_at=contest["start_time"]))
+    db.bulk_insert_mappings(ContestProblem, contest_problems)
+    db.bulk_insert_mappings(ContestParticipant, participants)
+
+    submissions = []
+    for i in range(args.submissions):
+        contest = rng.choice(contests) if rng.random() < 0.3 else None
+        submissions.append(dict(
+            id=generate_uuid(), user_id=rng.choice(users)["id"], problem_id=rng.choice(problems)["id"],
+            code="", language=rng.choice(list(LanguageEnum)), status=rng.choice(list(StatusEnum)),
+            execution_time_ms=rng.randint(1, 1000), memory_used_kb=rng.randint(1000, 100000),
+            submitted_at=base + timedelta(seconds=i), contest_id=contest["id"] if contest else None
+        ))
+        if i % 10 == 0:
+            # Một phần dùng CURRENT_TIMESTAMP của database (định dạng lưu khác, trùng giây)
+            del submissions[-1]["submitted_at"]
+        if len(submissions) == 5000:
+            db.bulk_insert_mappings(Submission, submissions)
+            submissions = []
+    # Người dùng mẫu có bài nộp accepted cho bài mẫu (endpoint bài nộp tốt nhất)
+    submissions.append(dict(
+        id=generate_uuid(), user_id=users[1]["id"], problem_id=problems[0]["id"], code="",
+        language=LanguageEnum.python, status=StatusEnum.accepted, execution_time_ms=1,
+        memory_used_kb=1000, submitted_at=base
+    ))
+    db.bulk_insert_mappings(Submission, submissions)
+    db.commit()
+
+    # Bảng trạng thái giải bài có kích thước thật thì optimizer mới chọn index
+    from app.services.problem_stats_service import rebuild_user_problem_status
+    for user_id, problem_id in db.query(Submission.user_id, Submission.problem_id).distinct().all():
+        rebuild_user_problem_status(db, user_id, problem_id)
+    db.commit()
+
+    from app.services.search_service import reindex_all
+    reindex_all(db)
+    db.commit()
+
+    return {
+        "admin": users[0],
+        "user": users[1],
+        "problem": problems[0],
+        "contest": contests[0],
+        "submission_user_id": users[1]["id"],
+    }
+
+def endpoints(fixtures):
+    """Các request đại diện cho query của từng router"""
+    problem_id = fixtures["problem"]["id"]
+    contest_id = fixtures["contest"]["id"]
+    user_id = fixtures["user"]["id"]
+    return [
+        ("admin", "/api/users/", {}),
+        ("admin", f"/api/users/{user_id}", {}),
+        ("user", "/api/users/leaderboard", {}),
+        ("user", "/api/users/leaderboard", {"skip": 200, "limit": 50}),
+        ("user", f"/api/users/{user_id}/rank", {}),
+        ("user", "/api/problems/", {}),
+        ("user", "/api/problems/", {"difficulty": "easy"}),
+        ("user", "/api/problems/", {"search": "problem 12"}),
+        ("user", "/api/problems/", {"tags": ["tag1", "tag2"]}),
+        ("user", "/api/problems/facets", {}),
+        ("user", f"/api/problems/{problem_id}", {}),
+        ("admin", f"/api/problems/{problem_id}/test-cases", {}),
+        ("user", "/api/contests/", {}),
+        ("user", "/api/contests/", {"search": "contest"}),
+        ("user", f"/api/contests/{contest_id}", {}),
+        ("user", f"/api/contests/{contest_id}/participants", {}),
+        ("user", f"/api/contests/{contest_id}/standings", {}),
+        ("user", f"/api/contests/{contest_id}/status", {}),
+        ("admin", "/api/submissions/", {}),
+        ("admin", "/api/submissions/", {"contest_id": contest_id, "status": "accepted"}),
+        ("user", "/api/submissions/", {"problem_id": problem_id}),
+        ("user", "/api/submissions/user/me", {}),
+        ("user", f"/api/submissions/problem/{problem_id}/best", {}),
+        ("user", f"/api/submissions/contest/{contest_id}/stats", {}),
+    ]
+
+# Danh sách phân trang theo con trỏ: đi theo X-Next-Cursor phải dừng và không lặp dòng
+CURSOR_WALKS = [
+    ("admin", "/api/users/"),
+    ("admin", "/api/problems/"),
+    ("user", "/api/contests/"),
+    ("admin", "/api/submissions/"),
+]
+MAX_WALK_PAGES = 1000
+
+def walk_cursor(client, path, headers, limit=500):
+    """Đi hết các trang của một danh sách, trả về mô tả lỗi (None nếu đúng)"""
+    from app.pagination import NEXT_CURSOR_HEADER
+
+    seen, params = set(), {"limit": limit}
+    for _ in range(MAX_WALK_PAGES):
+        response = client.get(path, params=params, headers=headers)
+        if response.status_code != 200:
+            return f"status {response.status_code}"
+        ids = [item["id"] for item in response.json()]
+        if seen.intersection(ids):
+            return f"rows repeated after {len(seen)} rows"
+        seen.update(ids)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return None
+        params = {"limit": limit, "cursor": cursor}
+    return f"no last page after {MAX_WALK_PAGES} pages"
+
+def is_derived(table):
+    """Bảng tạm sinh từ subquery (SQLite: anon_N, MySQL: <derivedN>)"""
+    return table.startswith("anon_") or table.startswith("<derived")
+
+def explain(connection, statement, parameters):
+    """Trả về danh sách (bảng, cách truy cập, full_scan, sort) cho một câu SELECT"""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        plan = []
+        for row in rows:
+            detail = row[-1]
+            words = detail.split()
+            full_scan = words[0] == "SCAN" and "USING" not in words and len(words) == 2
+            sort = "TEMP B-TREE" in detail
+            plan.append((words[1] if len(words) > 1 else "", detail, full_scan, sort))
+        return plan
+    if dialect == "mysql":
+        result = connection.exec_driver_sql("EXPLAIN " + statement, parameters)
+        plan = []
+        for row in result.mappings():
+            extra = row.get("Extra") or ""
+            access = f"type={row['type']} key={row['key']}"
+            plan.append((row["table"], access, row["type"] == "ALL", "filesort" in extra))
+        return plan
+    raise SystemExit(f"Unsupported dialect: {dialect}")
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    # Tắt cache để mọi câu truy vấn của endpoint đều được kiểm tra
+    os.environ["PRINCIPAL_CACHE_TTL_SECONDS"] = "0"
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from app.auth.oauth2 import create_access_token
+    from app.database import Base, SessionLocal, engine, get_async_engine
+    from app.main import app
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    if db.execute(Base.metadata.tables["users"].select().limit(1)).first():
+        raise SystemExit("Database is not empty, refusing to seed")
+    fixtures = seed(db, args)
+    db.close()
+
+    if engine.dialect.name == "mysql":
+        with engine.connect() as connection:
+            for table in Base.metadata.sorted_tables:
+                connection.exec_driver_sql(f"ANALYZE TABLE `{table.name}`")
+    elif engine.dialect.name == "sqlite":
+        with engine.connect() as connection:
+            connection.exec_driver_sql("ANALYZE")
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    # Các endpoint async chạy trên engine riêng
+    engines = [engine, get_async_engine().sync_engine]
+    for target in engines:
+        event.listen(target, "before_cursor_execute", capture)
+
+    tokens = {
+        "admin": create_access_token({"sub": fixtures["admin"]["username"]}),
+        "user": create_access_token({"sub": fixtures["user"]["username"]}),
+    }
+    client = TestClient(app, raise_server_exceptions=False)
+
+    # Lỗi server (raise_server_exceptions=False) hoặc endpoint không chạy câu
+    # SELECT nào thì kế hoạch không được kiểm tra: coi là lỗi
+    queries, request_failures = [], []
+    for role, path, params in endpoints(fixtures):
+        captured.clear()
+        response = client.get(path, params=params, headers={"Authorization": f"Bearer {tokens[role]}"})
+        if not 200 <= response.status_code < 300:
+            request_failures.append(f"FAIL {path} {params}: status {response.status_code}")
+        elif not captured:
+            request_failures.append(f"FAIL {path} {params}: no SELECT captured")
+        queries.extend((path, statement, parameters) for statement, parameters in captured)
+
+    for target in engines:
+        event.remove(target, "before_cursor_execute", capture)
+
+    walk_failures = []
+    for role, path in CURSOR_WALKS:
+        error = walk_cursor(client, path, {"Authorization": f"Bearer {tokens[role]}"})
+        if error:
+            walk_failures.append(f"FAIL cursor walk {path}: {error}")
+
+    failures = defaultdict(list)
+    with engine.connect() as connection:
+        for path, statement, parameters in queries:
+            for table, access, full_scan, sort in explain(connection, statement, parameters):
+                if table in SMALL_TABLES or is_derived(table):
+                    continue
+                if full_scan or (args.strict and sort):
+                    failures[path].append(f"{table}: {access}\n      {' '.join(statement.split())}")
+
+    print(f"Checked {len(queries)} statements from {len(endpoints(fixtures))} endpoints")
+    print(f"Walked {len(CURSOR_WALKS)} cursor-paginated lists")
+    if not failures and not walk_failures and not request_failures:
+        print("OK: no full table scans")
+        return 0
+
+    for failure in request_failures + walk_failures:
+        print(failure)
+    for path, problems in failures.items():
+        print(f"FAIL {path}")
+        for problem in problems:
+            print(f"    {problem}")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Cấu hình chung cho các test: database SQLite và thư mục dữ liệu tạm, tắt
+các worker nền. Biến môi trường phải được đặt trước khi import app.
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="coding-platform-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_tmp}/test.db",
+    TEST_DATA_DIR=os.path.join(_tmp, "test_data"),
+    METRICS_DIR="",
+    TRACE_DIR="",
+    RATE_LIMIT_BACKEND="memory",
+    EVENT_SINK_PATH=os.path.join(_tmp, "events.jsonl"),
+    CACHE_BACKEND="memory",
+    EVENT_RELAY_ENABLED="false",
+    EMAIL_DISPATCHER_ENABLED="false",
+    PASSWORD_HASH_WORKERS="0",
+    BCRYPT_ROUNDS="4",
+)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth.oauth2 import create_access_token
+from app.auth.utils import get_password_hash
+from app.cache import response_cache
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models.users import User
+
+@pytest.fixture
+def db():
+    """Session trên schema mới tạo cho mỗi test"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    response_cache.backend.clear()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def client(db):
+    return TestClient(app)
+
+@pytest.fixture
+def admin_headers(db):
+    db.add(User(username="admin", email="admin@example.com", hashed_password=get_password_hash("password"),
+                is_active=True, is_admin=True))
+    db.commit()
+    return {"Authorization": "Bearer " + create_access_token({"sub": "admin"})}
@@ -0,0 +1,71 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.database import generate_uuid
+from app.models.emails import EmailMessage, EmailStatusEnum
+from app.models.events import EventStatusEnum, OutboxEvent
+from app.services import email_dispatcher, event_relay
+
+Outbox = namedtuple("Outbox", "worker timeout make pending claimed")
+
+def _relay():
+    yield Outbox(
+        event_relay.Relay(event_relay.NullTransport()), event_relay.CLAIM_TIMEOUT,
+        lambda **values: OutboxEvent(topic="test", payload={}, **values),
+        EventStatusEnum.pending, EventStatusEnum.relaying,
+    )
+
+def _dispatcher():
+    dispatcher = email_dispatcher.Dispatcher()
+    try:
+        yield Outbox(
+            dispatcher, email_dispatcher.CLAIM_TIMEOUT,
+            lambda **values: EmailMessage(to_email="a@example.com", template="welcome", context={}, **values),
+            EmailStatusEnum.pending, EmailStatusEnum.sending,
+        )
+    finally:
+        dispatcher.close()
+
+@pytest.fixture(params=[_relay, _dispatcher], ids=["event_relay", "email_dispatcher"])
+def outbox(request):
+    yield from request.param()
+
+def test_claim_expiry(db, outbox):
+    worker, timeout, make, pending, claimed = outbox
+    now = datetime.utcnow()
+    held, lost = generate_uuid(), generate_uuid()
+    due = make(status=pending, next_attempt_at=now - timedelta(seconds=1))
+    later = make(status=pending, next_attempt_at=now + timedelta(hours=1))
+    fresh = make(status=claimed, next_attempt_at=now, claim_token=held, claimed_at=now - timedelta(seconds=5))
+    stale = make(status=claimed, next_attempt_at=now, claim_token=lost,
+                 claimed_at=now - timeout - timedelta(seconds=5))
+    db.add_all([due, later, fresh, stale])
+    db.commit()
+    due_id, stale_id, fresh_id = due.id, stale.id, fresh.id
+
+    rows = worker.claim(db)
+    assert {row.id for row in rows} == {due_id, stale_id}
+    assert len({row.claim_token for row in rows}) == 1
+    assert all(row.status == claimed and row.claim_token != lost for row in rows)
+
+    # Claim vừa nhận chưa hết hạn nên worker khác không lấy lại được
+    assert worker.claim(db) == []
+
+    db.expire_all()
+    assert db.get(type(fresh), fresh_id).claim_token == held
+
+def test_claim_after_timeout(db, outbox):
+    worker, timeout, make, pending, claimed = outbox
+    db.add(make(status=pending, next_attempt_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+    (first,) = worker.claim(db)
+    token = first.claim_token
+
+    # Worker đã nhận bị treo: lùi claimed_at quá CLAIM_TIMEOUT
+    first.claimed_at = datetime.utcnow() - timeout - timedelta(seconds=1)
+    db.commit()
+    (second,) = worker.claim(db)
+    assert second.id == first.id
+    assert second.claim_token != token
@@ -0,0 +1,73 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.users import User
+from app.pagination import decode_cursor, encode_cursor
+from app.routers.users import USER_KEYSET
+from app.services.leaderboard_service import LEADERBOARD_KEYSET
+
+def _raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+def _walk(keyset, query, limit):
+    """Đi theo con trỏ đến hết danh sách, trả về id theo thứ tự trang"""
+    ids, cursor = [], None
+    for _ in range(100):
+        page = keyset.paginate(query, 0, limit, cursor).all()
+        ids.extend(row.id for row in page)
+        cursor = keyset.next_cursor(page, limit)
+        if cursor is None:
+            return ids
+    pytest.fail("cursor walk did not terminate")
+
+def test_cursor_round_trip():
+    values = [datetime(2024, 5, 6, 7, 8, 9, 123456), 42, "abc"]
+    assert decode_cursor(encode_cursor(values), [datetime, int, str]) == values
+
+@pytest.mark.parametrize("cursor", [
+    "!!!",
+    _raw_cursor({"dt": "2024-01-01T00:00:00"}),
+    _raw_cursor([{"dt": "2024-01-01T00:00:00"}]),
+    _raw_cursor([{"dt": "2024-01-01T00:00:00"}, "id", "extra"]),
+    _raw_cursor([{"x": 1}, "id"]),
+    _raw_cursor([{"dt": "not a date"}, "id"]),
+    _raw_cursor(["2024-01-01", "id"]),
+    _raw_cursor([{"dt": "2024-01-01T00:00:00"}, 5]),
+])
+def test_invalid_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor, [datetime, str])
+    assert excinfo.value.status_code == 400
+
+def test_ties_are_broken_by_id(db):
+    # Cùng created_at (ghi từ Python) và cùng giây CURRENT_TIMESTAMP của database
+    tied = datetime(2024, 1, 1)
+    for i in range(5):
+        db.add(User(username=f"tied{i}", email=f"tied{i}@example.com", hashed_password="x", created_at=tied))
+    for i in range(5):
+        db.add(User(username=f"now{i}", email=f"now{i}@example.com", hashed_password="x"))
+    db.commit()
+
+    expected = [row.id for row in USER_KEYSET.order_by(db.query(User.id)).all()]
+    for limit in (1, 2, 3):
+        assert _walk(USER_KEYSET, db.query(User), limit) == expected
+    tied_ids = [user.id for user in db.query(User).filter(User.created_at == tied)]
+    assert expected[:5] == sorted(tied_ids)
+
+def test_descending_ties(db):
+    for i, rating in enumerate([1500, 1800, 1500, 1500, 1200, 1800]):
+        db.add(User(username=f"u{i}", email=f"u{i}@example.com", hashed_password="x", rating=rating))
+    db.commit()
+
+    ids = _walk(LEADERBOARD_KEYSET, db.query(User), 2)
+    rows = {user.id: user.rating for user in db.query(User)}
+    assert len(ids) == len(set(ids)) == 6
+    assert ids == sorted(ids, key=lambda id: (rows[id], id), reverse=True)
+
+def test_invalid_cursor_over_http(client, admin_headers):
+    response = client.get("/api/users/", params={"cursor": _raw_cursor([1, 2])}, headers=admin_headers)
+    assert response.status_code == 400
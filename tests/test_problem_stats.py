@@ -0,0 +1,83 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.problems import DifficultyEnum, Problem
+from app.models.submissions import LanguageEnum, StatusEnum, Submission, UserProblemStatus
+from app.models.users import User
+from app.services.problem_stats_service import rebuild_user_problem_status, record_judge_result
+
+STATUS_FIELDS = ("attempts", "solved", "first_accepted_at", "best_submission_id",
+                 "best_execution_time_ms", "last_submitted_at")
+
+def _snapshot(db):
+    db.expire_all()
+    statuses = {
+        (row.user_id, row.problem_id): tuple(getattr(row, field) for field in STATUS_FIELDS)
+        for row in db.query(UserProblemStatus)
+    }
+    counters = {row.id: (row.attempted_count, row.solved_count) for row in db.query(Problem)}
+    return statuses, counters
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_matches_rebuild(db, seed):
+    rng = random.Random(seed)
+    users = [User(username=f"u{i}", email=f"u{i}@example.com", hashed_password="x") for i in range(3)]
+    problems = [
+        Problem(title=f"p{i}", description="d", difficulty=DifficultyEnum.easy,
+                example_input="", example_output="", constraints="")
+        for i in range(3)
+    ]
+    db.add_all(users + problems)
+    db.flush()
+
+    # Ít mốc thời gian và thời gian chạy để có nhiều bài nộp bằng nhau
+    start = datetime(2024, 1, 1)
+    for _ in range(60):
+        db.add(Submission(
+            user_id=rng.choice(users).id, problem_id=rng.choice(problems).id, code="", language=LanguageEnum.cpp,
+            submitted_at=start + timedelta(seconds=rng.randrange(10)),
+        ))
+    db.flush()
+
+    # Chấm theo thứ tự nộp, giống hàng đợi chấm bài
+    for submission in db.query(Submission).order_by(Submission.submitted_at, Submission.id):
+        submission.status = rng.choice([StatusEnum.accepted, StatusEnum.accepted, StatusEnum.wrong_answer,
+                                        StatusEnum.time_limit_exceeded, StatusEnum.compilation_error])
+        submission.execution_time_ms = rng.choice([None, 10, 20, 30])
+        record_judge_result(db, submission)
+        db.flush()
+    incremental = _snapshot(db)
+
+    db.query(UserProblemStatus).delete()
+    db.query(Problem).update({Problem.attempted_count: 0, Problem.solved_count: 0})
+    for user in users:
+        for problem in problems:
+            rebuild_user_problem_status(db, user.id, problem.id)
+    db.flush()
+
+    assert _snapshot(db) == incremental
+
+def test_rebuild_after_delete_updates_counters(db):
+    user = User(username="u", email="u@example.com", hashed_password="x")
+    problem = Problem(title="p", description="d", difficulty=DifficultyEnum.easy,
+                      example_input="", example_output="", constraints="")
+    db.add_all([user, problem])
+    db.flush()
+    submission = Submission(user_id=user.id, problem_id=problem.id, code="", language=LanguageEnum.cpp,
+                            status=StatusEnum.accepted, execution_time_ms=5, submitted_at=datetime(2024, 1, 1))
+    db.add(submission)
+    db.flush()
+    record_judge_result(db, submission)
+    db.flush()
+    db.refresh(problem)
+    assert (problem.attempted_count, problem.solved_count) == (1, 1)
+
+    db.delete(submission)
+    db.flush()
+    rebuild_user_problem_status(db, user.id, problem.id)
+    db.flush()
+    db.refresh(problem)
+    assert (problem.attempted_count, problem.solved_count) == (0, 0)
+    assert db.query(UserProblemStatus).count() == 0
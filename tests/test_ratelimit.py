@@ -0,0 +1,61 @@
+import pytest
+
+from app import ratelimit
+from app.ratelimit import MemoryStore, parse_limit
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock)
+    return clock
+
+def test_parse_limit():
+    assert parse_limit("10/minute") == (10, 10 / 60)
+    assert parse_limit("") is None
+    for spec in ("10/fortnight", "x/minute", "0/second"):
+        with pytest.raises(ValueError):
+            parse_limit(spec)
+
+def test_refill(clock):
+    store = MemoryStore()
+    assert store.take("k", 2, 1.0) == 0
+    assert store.take("k", 2, 1.0) == 0
+    assert store.take("k", 2, 1.0) == pytest.approx(1.0)
+    # Lần bị từ chối không tiêu token: nửa giây sau chỉ còn chờ nửa giây
+    clock.now += 0.5
+    assert store.take("k", 2, 1.0) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert store.take("k", 2, 1.0) == 0
+    # Nạp lại không vượt quá dung lượng
+    clock.now += 100
+    assert [store.take("k", 2, 1.0) for _ in range(3)][:2] == [0, 0]
+    assert store.take("other", 2, 1.0) == 0
+
+def test_prune_drops_full_buckets(clock):
+    store = MemoryStore()
+    store.PRUNE_EVERY = 4
+    store.take("a", 5, 1.0)
+    store.take("b", 5, 1.0)
+    clock.now += 100
+    store.take("c", 5, 1.0)
+    assert set(store._buckets) == {"a", "b", "c"}
+    store.take("c", 5, 1.0)
+    # a và b đã nạp đầy lại nên bị xóa, c vẫn đang thiếu token
+    assert set(store._buckets) == {"c"}
+
+def test_max_buckets_evicts_least_recently_used(clock):
+    store = MemoryStore()
+    store.MAX_BUCKETS = 3
+    for key in ("k0", "k1", "k2", "k3"):
+        store.take(key, 5, 1.0)
+    assert list(store._buckets) == ["k1", "k2", "k3"]
+    store.take("k1", 5, 1.0)
+    store.take("k4", 5, 1.0)
+    assert list(store._buckets) == ["k3", "k1", "k4"]
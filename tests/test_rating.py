@@ -0,0 +1,70 @@
+import math
+import random
+
+import pytest
+
+from app.services import rating_service
+from app.services.rating_service import compute_deltas, ranks_from_scores
+
+PATHS = [False] + ([True] if rating_service.np is not None else [])
+
+def _trunc_div(a, b):
+    # Phép chia số nguyên của Java
+    quotient = abs(a) // abs(b)
+    return quotient if (a >= 0) == (b > 0) else -quotient
+
+def _reference_deltas(ratings, ranks):
+    """Cài đặt O(n^2) theo thuật toán gốc của Codeforces (tìm nhị phân trên [1, 8000))"""
+    def win_probability(a, b):
+        return 1.0 / (1.0 + 10.0 ** ((b - a) / 400.0))
+
+    def seed_of(rating, skip=None):
+        return 1.0 + sum(win_probability(other, rating) for j, other in enumerate(ratings) if j != skip)
+
+    n = len(ratings)
+    deltas = []
+    for i, (rating, rank) in enumerate(zip(ratings, ranks)):
+        mid_rank = math.sqrt(rank * seed_of(rating, skip=i))
+        left, right = 1, 8000
+        while right - left > 1:
+            mid = (left + right) // 2
+            if seed_of(mid) < mid_rank:
+                right = mid
+            else:
+                left = mid
+        deltas.append(_trunc_div(left - rating, 2))
+    inc = _trunc_div(-sum(deltas), n) - 1
+    deltas = [delta + inc for delta in deltas]
+    top = min(n, 4 * round(math.sqrt(n)))
+    order = sorted(range(n), key=lambda i: -ratings[i])[:top]
+    inc = min(max(_trunc_div(-sum(deltas[i] for i in order), top), -10), 0)
+    return [delta + inc for delta in deltas]
+
+def test_ranks_from_scores_ties_take_lowest_rank():
+    assert ranks_from_scores([300, 200, 200, 100]) == [1, 3, 3, 4]
+    assert ranks_from_scores([5, 5, 5]) == [3, 3, 3]
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+def test_two_equal_players(use_numpy):
+    # Seed 1.5 cho cả hai; rating cần đạt 1859 và 1595; delta thô 179 và 47,
+    # trừ 114 để tổng về xấp xỉ 0
+    assert compute_deltas([1500, 1500], [1, 2], use_numpy=use_numpy) == [65, -67]
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+def test_single_player_unchanged(use_numpy):
+    assert compute_deltas([1500], [1], use_numpy=use_numpy) == [0]
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_reference(use_numpy, seed):
+    rng = random.Random(seed)
+    n = rng.randrange(3, 40)
+    ratings = rng.sample(range(1000, 3000), n)
+    ranks = ranks_from_scores([rng.randrange(10) for _ in range(n)])
+    assert compute_deltas(ratings, ranks, use_numpy=use_numpy) == _reference_deltas(ratings, ranks)
+
+def test_better_rank_never_loses_more():
+    ratings = [1500] * 10
+    deltas = compute_deltas(ratings, list(range(1, 11)), use_numpy=False)
+    assert deltas == sorted(deltas, reverse=True)
+    assert sum(deltas) <= 0
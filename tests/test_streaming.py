@@ -0,0 +1,64 @@
+import pytest
+from fastapi import HTTPException
+
+from app.models.problems import DifficultyEnum, Problem, TestCase as TestCaseModel
+from app.streaming import parse_range
+
+@pytest.mark.parametrize("header, size, expected", [
+    (None, 10, None),
+    ("bytes=0-3", 10, (0, 3)),
+    ("bytes=4-", 10, (4, 9)),
+    ("bytes=8-100", 10, (8, 9)),
+    ("bytes=-3", 10, (7, 9)),
+    ("bytes=-100", 10, (0, 9)),
+    # Cú pháp không hỗ trợ: trả toàn bộ nội dung
+    ("bytes=-", 10, None),
+    ("bytes=0-1,4-5", 10, None),
+    ("items=0-1", 10, None),
+])
+def test_parse_range(header, size, expected):
+    assert parse_range(header, size) == expected
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=10-", 10),
+    ("bytes=5-2", 10),
+    ("bytes=-0", 10),
+    ("bytes=-5", 0),
+    ("bytes=0-", 0),
+])
+def test_parse_range_not_satisfiable(header, size):
+    with pytest.raises(HTTPException) as excinfo:
+        parse_range(header, size)
+    assert excinfo.value.status_code == 416
+    assert excinfo.value.headers["Content-Range"] == f"bytes */{size}"
+
+@pytest.fixture
+def input_url(db, admin_headers):
+    problem = Problem(title="p", description="d", difficulty=DifficultyEnum.easy,
+                      example_input="", example_output="", constraints="")
+    db.add(problem)
+    db.flush()
+    test_case = TestCaseModel(problem_id=problem.id, input="0123456789", expected_output="", is_sample=True,
+                             order=1, input_size=10)
+    db.add(test_case)
+    db.commit()
+    return f"/api/problems/{problem.id}/test-cases/{test_case.id}/input"
+
+def test_suffix_range_response(client, admin_headers, input_url):
+    response = client.get(input_url, headers={**admin_headers, "Range": "bytes=-4"})
+    assert response.status_code == 206
+    assert response.content == b"6789"
+    assert response.headers["Content-Range"] == "bytes 6-9/10"
+    assert response.headers["Content-Length"] == "4"
+
+def test_full_response_without_range(client, admin_headers, input_url):
+    response = client.get(input_url, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.content == b"0123456789"
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+@pytest.mark.parametrize("header", ["bytes=-0", "bytes=10-"])
+def test_unsatisfiable_range_response(client, admin_headers, input_url, header):
+    response = client.get(input_url, headers={**admin_headers, "Range": header})
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == "bytes */10"